@@ -0,0 +1,53 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+
+from .models import Address, User
+
+FIRST_NAMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela', 'João']
+LAST_NAMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Almeida', 'Ferreira', 'Rocha']
+CITIES = [('São Paulo', 'SP'), ('Rio de Janeiro', 'RJ'), ('Belo Horizonte', 'MG'), ('Curitiba', 'PR'),
+          ('Porto Alegre', 'RS'), ('Salvador', 'BA'), ('Recife', 'PE'), ('Fortaleza', 'CE')]
+
+BENCH_USER_PREFIX = 'bench-user-'
+
+
+def bench_user_email(number):
+    return f'{BENCH_USER_PREFIX}{number}@example.com'
+
+
+def seed_users(users, addresses=2, password='bench', batch_size=2000, seed=0, stdout=None):
+    """Completa até ``users`` usuários sintéticos (bench-user-<n>), cada um com ``addresses`` endereços
+
+    A senha é a mesma para todos e é calculada uma vez: o hash custa dezenas
+    de milissegundos por usuário.
+    """
+    rng = random.Random(seed)
+    hashed = make_password(password)
+    existing = User.objects.filter(username__startswith=BENCH_USER_PREFIX).count()
+    created = 0
+    while existing + created < users:
+        numbers = range(existing + created, min(existing + created + batch_size, users))
+        batch = User.objects.bulk_create([
+            User(
+                username=f'{BENCH_USER_PREFIX}{number}', email=bench_user_email(number), password=hashed,
+                first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+            )
+            for number in numbers
+        ])
+        # Bancos sem RETURNING não preenchem a chave primária no bulk_create
+        if batch and batch[0].pk is None:
+            batch = list(User.objects.filter(username__in=[user.username for user in batch]))
+        address_objs = []
+        for user in batch:
+            for _ in range(addresses):
+                city, state = rng.choice(CITIES)
+                address_objs.append(Address(
+                    user=user, street=f'Rua {rng.choice(LAST_NAMES)}, {rng.randrange(1, 3000)}',
+                    city=city, state=state, zip_code=f'{rng.randrange(10000, 99999)}-{rng.randrange(1000):03d}',
+                ))
+        Address.objects.bulk_create(address_objs)
+        created += len(batch)
+        if stdout:
+            stdout.write(f'{existing + created}/{users} usuários')
+    return created
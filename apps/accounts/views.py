@@ -1,9 +1,34 @@
-from django.shortcuts import render
+from django.contrib.auth import login
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.forms import AuthenticationForm
+from django.shortcuts import redirect, render
 from django.http import HttpResponse
+from django.utils.http import url_has_allowed_host_and_scheme
+
+from apps.cart.storage import get_cart
+from apps.orders.views import order_list, recent_orders
 
 
 def login_view(request):
-    return HttpResponse("Login - Em desenvolvimento")
+    if request.user.is_authenticated:
+        return redirect('core:home')
+
+    form = AuthenticationForm(request, data=request.POST or None)
+    if request.method == 'POST' and form.is_valid():
+        # login() troca a chave da sessão, então o carrinho anônimo é localizado antes
+        anonymous_cart = get_cart(request)
+        user = form.get_user()
+        login(request, user)
+        anonymous_cart.merge_into(user)
+        request._cart = None
+
+        next_url = request.POST.get('next') or request.GET.get('next')
+        if not (next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()},
+                                                             require_https=request.is_secure())):
+            next_url = 'core:home'
+        return anonymous_cart.save(redirect(next_url))
+
+    return render(request, 'accounts/login.html', {'form': form, 'next': request.GET.get('next', '')})
 
 
 def register_view(request):
@@ -14,8 +39,12 @@ def logout_view(request):
     return HttpResponse("Logout - Em desenvolvimento")
 
 
+@login_required
 def profile_view(request):
-    return HttpResponse("Perfil - Em desenvolvimento")
+    context = {
+        'recent_orders': recent_orders(request.user),
+    }
+    return render(request, 'accounts/profile.html', context)
 
 
 def address_list(request):
@@ -23,4 +52,4 @@ def address_list(request):
 
 
 def order_history(request):
-    return HttpResponse("Histórico de pedidos - Em desenvolvimento")
+    return order_list(request)
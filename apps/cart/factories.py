@@ -0,0 +1,42 @@
+import random
+from datetime import timedelta
+
+from django.utils import timezone
+
+from apps.products.factories import product_pool
+
+from .models import Cart, CartItem, Coupon
+
+
+def seed_carts(users, items=3, batch_size=2000, seed=0, stdout=None):
+    """Cria um carrinho com ``items`` produtos para cada usuário da lista que ainda não tem carrinho"""
+    rng = random.Random(seed)
+    pool = product_pool()
+    if not pool:
+        return 0
+    with_cart = set(Cart.objects.filter(user__isnull=False).values_list('user_id', flat=True))
+    pending = [user_id for user_id in users if user_id not in with_cart]
+    created = 0
+    for start in range(0, len(pending), batch_size):
+        carts = Cart.objects.bulk_create([Cart(user_id=user_id) for user_id in pending[start:start + batch_size]])
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product_id=product_id, quantity=rng.randint(1, 3))
+            for cart in carts
+            for product_id in rng.sample(pool, min(items, len(pool)))
+        ])
+        created += len(carts)
+        if stdout:
+            stdout.write(f'{created}/{len(pending)} carrinhos')
+    return created
+
+
+def make_coupon(**fields):
+    """Cria um cupom de R$ 10 válido desde ontem até amanhã para os testes"""
+    now = timezone.now()
+    fields.setdefault('code', 'PROMO')
+    fields.setdefault('description', 'Cupom de teste')
+    fields.setdefault('discount_type', 'fixed')
+    fields.setdefault('discount_value', 10)
+    fields.setdefault('valid_from', now - timedelta(days=1))
+    fields.setdefault('valid_until', now + timedelta(days=1))
+    return Coupon.objects.create(**fields)
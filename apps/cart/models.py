@@ -1,7 +1,19 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
 import uuid
 
+from apps.products.models import current_price_expression
+
+CART_SUMMARY_CACHE_TIMEOUT = 60 * 15
+
+COUPON_CACHE_TIMEOUT = 60 * 60
+
 
 class Cart(models.Model):
     """Modelo para carrinho de compras"""
@@ -14,28 +26,78 @@ class Cart(models.Model):
     class Meta:
         verbose_name = 'Carrinho'
         verbose_name_plural = 'Carrinhos'
+        indexes = [
+            models.Index(fields=['session_key'], name='cart_session_idx'),
+            models.Index(fields=['updated_at'], name='cart_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Carrinho {self.id}"
 
+    @staticmethod
+    def summary_cache_key(cart_id):
+        return f'cart:summary:{cart_id}'
+
+    @classmethod
+    def invalidate_summary(cls, cart_id):
+        """Remove o resumo do carrinho do cache"""
+        cache.delete(cls.summary_cache_key(cart_id))
+
+    def get_summary(self, refresh=False):
+        """Retorna total de itens, subtotal e peso do carrinho calculados em uma única consulta"""
+        if not refresh and getattr(self, '_summary', None) is not None:
+            return self._summary
+
+        key = self.summary_cache_key(self.pk)
+        summary = None if refresh else cache.get(key)
+        if summary is None:
+            unit_price = current_price_expression('product__')
+            totals = self.items.aggregate(
+                total_items=Coalesce(Sum('quantity'), 0),
+                subtotal=Coalesce(
+                    Sum(unit_price * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+                    Value(Decimal('0.00')),
+                    output_field=DecimalField(max_digits=12, decimal_places=2),
+                ),
+                total_weight=Coalesce(
+                    Sum(F('product__weight') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=3)),
+                    Value(Decimal('0.000')),
+                    output_field=DecimalField(max_digits=12, decimal_places=3),
+                ),
+            )
+            summary = {
+                'total_items': totals['total_items'],
+                'subtotal': Decimal(totals['subtotal']).quantize(Decimal('0.01')),
+                'total_weight': Decimal(totals['total_weight']).quantize(Decimal('0.001')),
+            }
+            cache.set(key, summary, CART_SUMMARY_CACHE_TIMEOUT)
+
+        self._summary = summary
+        return summary
+
     @property
     def total_items(self):
         """Retorna o total de itens no carrinho"""
-        return sum(item.quantity for item in self.items.all())
+        return self.get_summary()['total_items']
 
     @property
     def subtotal(self):
         """Retorna o subtotal do carrinho"""
-        return sum(item.total_price for item in self.items.all())
+        return self.get_summary()['subtotal']
 
     @property
     def total_weight(self):
         """Retorna o peso total do carrinho"""
-        return sum(item.total_weight for item in self.items.all())
+        return self.get_summary()['total_weight']
 
     def clear(self):
-        """Remove todos os itens do carrinho"""
+        """Remove todos os itens do carrinho
+
+        Os sinais dos itens marcam o carrinho como usado uma única vez e
+        invalidam o resumo em cache.
+        """
         self.items.all().delete()
+        self._summary = None
 
 
 class CartItem(models.Model):
@@ -97,9 +159,58 @@ class Coupon(models.Model):
     def __str__(self):
         return self.code
 
+    @staticmethod
+    def cache_key(code):
+        return f'cart:coupon:{code}'
+
+    @classmethod
+    def get_cached(cls, code):
+        """Retorna o cupom ativo com esse código, ou None, consultando o banco só na primeira vez"""
+        code = code.strip()
+        key = cls.cache_key(code)
+        coupon = cache.get(key)
+        if coupon is None:
+            coupon = cls.objects.filter(code=code, is_active=True, valid_until__gte=timezone.now()).first()
+            timeout = COUPON_CACHE_TIMEOUT
+            if coupon is not None:
+                # Não guarda o cupom além do fim da validade
+                timeout = min(timeout, max(int((coupon.valid_until - timezone.now()).total_seconds()), 1))
+            cache.set(key, coupon or False, timeout)
+        return coupon or None
+
+    def redeem(self):
+        """Registra um uso do cupom se ainda houver saldo; retorna False se esgotado ou inválido
+
+        O limite é verificado no próprio UPDATE, então usos simultâneos nunca
+        ultrapassam usage_limit.
+        """
+        now = timezone.now()
+        updated = Coupon.objects.filter(
+            Q(usage_limit__isnull=True) | Q(used_count__lt=F('usage_limit')),
+            pk=self.pk,
+            is_active=True,
+            valid_from__lte=now,
+            valid_until__gte=now,
+        ).update(used_count=F('used_count') + 1)
+        if updated:
+            self.used_count += 1
+            return True
+
+        # Só um cupom esgotado é marcado no cache, para que as próximas validações não consultem o banco;
+        # inativo ou fora da validade, a falha pode vir de uma instância desatualizada
+        usage = Coupon.objects.filter(pk=self.pk).values_list('used_count', 'usage_limit').first()
+        if usage is not None and usage[1] is not None and usage[0] >= usage[1]:
+            self.used_count, self.usage_limit = usage
+            cache.set(self.cache_key(self.code), self, COUPON_CACHE_TIMEOUT)
+        return False
+
+    def release(self):
+        """Devolve um uso do cupom, por exemplo quando o pedido não é concluído"""
+        Coupon.objects.filter(pk=self.pk, used_count__gt=0).update(used_count=F('used_count') - 1)
+        cache.delete(self.cache_key(self.code))
+
     def is_valid(self, cart_total=0):
         """Verifica se o cupom é válido"""
-        from django.utils import timezone
         now = timezone.now()
         
         if not self.is_active:
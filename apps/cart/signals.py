@@ -0,0 +1,67 @@
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.core.transactions import on_commit_once
+from apps.products.models import Product
+from .models import Cart, CartItem, Coupon
+from .utils import badge_cache_key, schedule_cart_badge_refresh
+
+
+def _deleting_cart(origin):
+    """Se os itens estão sendo apagados junto com o próprio carrinho"""
+    return isinstance(origin, Cart) or (isinstance(origin, QuerySet) and origin.model is Cart)
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def invalidate_cart_summary(sender, instance, origin=None, **kwargs):
+    """Invalida o resumo em cache quando um item é adicionado, alterado ou removido"""
+    if _deleting_cart(origin):
+        return
+    Cart.invalidate_summary(instance.cart_id)
+    schedule_cart_badge_refresh(instance.cart_id)
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def touch_cart(sender, instance, origin=None, **kwargs):
+    """Marca o carrinho como usado: a limpeza de carrinhos abandonados se guia por updated_at
+
+    Uma vez por transação: limpar ou juntar carrinhos altera vários itens de uma vez.
+    """
+    if _deleting_cart(origin):
+        return
+    if on_commit_once(f'cart:touch:{instance.cart_id}'):
+        Cart.objects.filter(pk=instance.cart_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Product)
+def invalidate_carts_with_product(sender, instance, created, **kwargs):
+    """Invalida os resumos e o cabeçalho dos carrinhos que contêm um produto com preço ou peso alterado
+
+    As chaves são removidas após o commit, para que uma leitura concorrente não
+    grave de novo no cache os valores antigos.
+    """
+    if created:
+        return
+    keys = []
+    for cart_id, user_id, session_key in Cart.objects.filter(items__product_id=instance.pk).values_list(
+            'pk', 'user_id', 'session_key'):
+        keys.append(Cart.summary_cache_key(cart_id))
+        if user_id or session_key:
+            keys.append(badge_cache_key(user_id, session_key))
+    if keys:
+        transaction.on_commit(partial(cache.delete_many, keys))
+
+
+@receiver(post_save, sender=Coupon)
+@receiver(post_delete, sender=Coupon)
+def invalidate_coupon(sender, instance, **kwargs):
+    """Remove o cupom do cache quando ele é alterado no admin"""
+    cache.delete(Coupon.cache_key(instance.code))
@@ -0,0 +1,312 @@
+import json
+import uuid
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+
+from apps.products.models import Product
+from .models import Cart, CartItem
+from .utils import EMPTY_BADGE, aget_cart_badge, get_cart_badge, merge_cart_items, merge_session_cart
+
+CART_COOKIE_NAME = 'cart'
+CART_COOKIE_SALT = 'apps.cart.storage'
+CART_COOKIE_MAX_AGE = 60 * 60 * 24 * 30
+CART_COOKIE_MAX_ITEMS = 50
+
+
+def get_cart(request):
+    """Retorna o carrinho da requisição no modo de armazenamento ativo
+
+    Usuários autenticados sempre usam o banco. Visitantes anônimos usam o cookie
+    assinado quando CART_STORAGE = 'cookie', sem gravar nada no banco até o login.
+    """
+    cart = getattr(request, '_cart', None)
+    if cart is None:
+        user = getattr(request, 'user', None)
+        if (user is not None and user.is_authenticated) or getattr(settings, 'CART_STORAGE', 'cookie') != 'cookie':
+            cart = DatabaseCart(request)
+        else:
+            cart = CookieCart(request)
+        request._cart = cart
+    return cart
+
+
+def cart_badge(request):
+    """Retorna o resumo do carrinho do cabeçalho sem consultar o banco para carrinhos em cookie"""
+    cart = get_cart(request)
+    if isinstance(cart, CookieCart):
+        return cart.badge()
+    return get_cart_badge(request)
+
+
+async def acart_badge(request):
+    """Versão assíncrona de cart_badge; request.user já deve estar carregado"""
+    cart = get_cart(request)
+    if isinstance(cart, CookieCart):
+        return cart.badge()
+    return await aget_cart_badge(request)
+
+
+class BaseCart:
+    """Interface comum aos modos de armazenamento do carrinho"""
+
+    def __init__(self, request):
+        self.request = request
+
+    def quantities(self):
+        """Retorna um dicionário {product_id: quantidade}"""
+        raise NotImplementedError
+
+    def set_quantity(self, product, quantity):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def merge_into(self, user):
+        """Junta este carrinho anônimo ao carrinho do usuário que acabou de entrar"""
+        raise NotImplementedError
+
+    def save(self, response):
+        """Grava o estado do carrinho na resposta, quando necessário"""
+        return response
+
+    def add(self, product, quantity=1):
+        """Adiciona unidades de um produto, limitadas ao estoque livre"""
+        current = self.quantities().get(product.pk, 0)
+        return self.set_quantity(product, current + quantity)
+
+    def update(self, product, quantity):
+        """Define a quantidade de um produto; zero remove o item"""
+        return self.set_quantity(product, quantity)
+
+    def remove(self, product):
+        """Remove um produto do carrinho"""
+        return self.set_quantity(product, 0)
+
+    def lines(self):
+        """Retorna os itens com produto, quantidade e totais, em uma consulta"""
+        quantities = self.quantities()
+        return self._build_lines(quantities, self._products(quantities))
+
+    # Versões assíncronas usadas pelas views async. Por padrão rodam a versão
+    # síncrona em uma thread; CookieCart não faz E/S e as sobrescreve.
+
+    async def aquantities(self):
+        return await sync_to_async(self.quantities)()
+
+    async def aset_quantity(self, product, quantity):
+        return await sync_to_async(self.set_quantity)(product, quantity)
+
+    async def aclear(self):
+        await sync_to_async(self.clear)()
+
+    async def asave(self, response):
+        return await sync_to_async(self.save)(response)
+
+    async def aadd(self, product, quantity=1):
+        current = (await self.aquantities()).get(product.pk, 0)
+        return await self.aset_quantity(product, current + quantity)
+
+    async def aupdate(self, product, quantity):
+        return await self.aset_quantity(product, quantity)
+
+    async def aremove(self, product):
+        return await self.aset_quantity(product, 0)
+
+    async def alines(self):
+        quantities = await self.aquantities()
+        return self._build_lines(quantities, [product async for product in self._products(quantities)])
+
+    @staticmethod
+    def _products(quantities):
+        return Product.objects.for_listing().filter(pk__in=list(quantities)).order_by('name')
+
+    @staticmethod
+    def _build_lines(quantities, products):
+        return [
+            {
+                'product': product,
+                'quantity': quantities[product.pk],
+                'unit_price': product.current_price,
+                'total_price': product.current_price * quantities[product.pk],
+            }
+            for product in products
+        ]
+
+    def get_summary(self, lines=None):
+        """Retorna total de itens, subtotal e peso do carrinho"""
+        if lines is None:
+            lines = self.lines()
+        return {
+            'total_items': sum(line['quantity'] for line in lines),
+            'subtotal': sum((line['total_price'] for line in lines), Decimal('0.00')),
+            'total_weight': sum(
+                ((line['product'].weight or 0) * line['quantity'] for line in lines), Decimal('0.000')
+            ),
+        }
+
+    def __len__(self):
+        return len(self.quantities())
+
+    @staticmethod
+    def _clamp(product, quantity):
+        return max(min(int(quantity), product.available_quantity), 0)
+
+
+class DatabaseCart(BaseCart):
+    """Carrinho gravado nos modelos Cart e CartItem"""
+
+    def __init__(self, request):
+        super().__init__(request)
+        self._cart = None
+        # Guardada na criação porque login() troca a chave da sessão
+        self.session_key = request.session.session_key
+
+    @property
+    def user(self):
+        user = getattr(self.request, 'user', None)
+        return user if user is not None and user.is_authenticated else None
+
+    def get_model(self, create=False):
+        """Retorna o Cart do usuário ou da sessão, criando se pedido"""
+        if self._cart is None and (self.user is not None or self.session_key):
+            if self.user is not None:
+                carts = Cart.objects.filter(user=self.user)
+            else:
+                carts = Cart.objects.filter(session_key=self.session_key, user__isnull=True)
+            self._cart = carts.order_by('-updated_at').first()
+        if self._cart is None and create:
+            if self.user is not None:
+                self._cart = Cart.objects.create(user=self.user)
+            else:
+                if not self.request.session.session_key:
+                    self.request.session.save()
+                self.session_key = self.request.session.session_key
+                self._cart = Cart.objects.create(session_key=self.session_key)
+        return self._cart
+
+    def quantities(self):
+        cart = self.get_model()
+        if cart is None:
+            return {}
+        return dict(cart.items.values_list('product_id', 'quantity'))
+
+    def set_quantity(self, product, quantity):
+        quantity = self._clamp(product, quantity)
+        if quantity == 0:
+            cart = self.get_model()
+            if cart is not None:
+                cart.items.filter(product=product).delete()
+            return 0
+        CartItem.objects.update_or_create(cart=self.get_model(create=True), product=product,
+                                          defaults={'quantity': quantity})
+        return quantity
+
+    def clear(self):
+        cart = self.get_model()
+        if cart is not None:
+            cart.clear()
+
+    def get_summary(self, lines=None):
+        cart = self.get_model()
+        if cart is None:
+            return super().get_summary([])
+        return cart.get_summary()
+
+    def merge_into(self, user):
+        cart = merge_session_cart(self.session_key, user)
+        self._cart = None
+        return cart
+
+
+class CookieCart(BaseCart):
+    """Carrinho de visitante anônimo guardado em um cookie assinado
+
+    O cookie guarda só {uuid: quantidade} e o resumo do cabeçalho, então navegar
+    com itens no carrinho não custa nenhuma gravação no banco.
+    """
+
+    def __init__(self, request):
+        super().__init__(request)
+        self.modified = False
+        self._badge = EMPTY_BADGE
+        self._items = {}
+        try:
+            data = json.loads(request.get_signed_cookie(
+                CART_COOKIE_NAME, salt=CART_COOKIE_SALT, max_age=CART_COOKIE_MAX_AGE,
+            ))
+            self._items = {uuid.UUID(key): int(value) for key, value in data['i'].items() if int(value) > 0}
+            self._badge = {'total_items': int(data['n']), 'total_price': Decimal(data['t'])}
+        except (KeyError, ValueError, TypeError, AttributeError, ArithmeticError, signing.BadSignature):
+            # Cookie ausente, expirado ou adulterado: começa vazio
+            self._items = {}
+            self._badge = EMPTY_BADGE
+
+    def quantities(self):
+        return dict(self._items)
+
+    def set_quantity(self, product, quantity):
+        quantity = self._clamp(product, quantity)
+        if quantity == 0:
+            self._items.pop(product.pk, None)
+        elif product.pk in self._items or len(self._items) < CART_COOKIE_MAX_ITEMS:
+            self._items[product.pk] = quantity
+        else:
+            return self._items.get(product.pk, 0)
+        self.modified = True
+        return quantity
+
+    def clear(self):
+        if self._items:
+            self._items = {}
+            self.modified = True
+
+    def badge(self):
+        return self._badge
+
+    def merge_into(self, user):
+        cart = merge_cart_items(user, self._items)
+        self.clear()
+        return cart
+
+    async def aquantities(self):
+        return self.quantities()
+
+    async def aset_quantity(self, product, quantity):
+        return self.set_quantity(product, quantity)
+
+    async def aclear(self):
+        self.clear()
+
+    def save(self, response):
+        if not self.modified:
+            return response
+        return self._store(response, self.get_summary() if self._items else None)
+
+    async def asave(self, response):
+        if not self.modified:
+            return response
+        return self._store(response, self.get_summary(await self.alines()) if self._items else None)
+
+    def _store(self, response, summary):
+        """Grava o cookie com os itens e o resumo, ou o remove se o carrinho ficou vazio"""
+        self.modified = False
+        if summary is None:
+            self._badge = EMPTY_BADGE
+            response.delete_cookie(CART_COOKIE_NAME)
+            return response
+
+        self._badge = {'total_items': summary['total_items'], 'total_price': summary['subtotal']}
+        payload = json.dumps({
+            'i': {product_id.hex: quantity for product_id, quantity in self._items.items()},
+            'n': summary['total_items'],
+            't': str(summary['subtotal']),
+        }, separators=(',', ':'))
+        response.set_signed_cookie(
+            CART_COOKIE_NAME, payload, salt=CART_COOKIE_SALT, max_age=CART_COOKIE_MAX_AGE,
+            httponly=True, samesite='Lax', secure=self.request.is_secure(),
+        )
+        return response
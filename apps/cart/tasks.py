@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+
+from .utils import purge_abandoned_carts, purge_expired_sessions
+
+
+@shared_task
+def purge_stale_carts():
+    """Apaga carrinhos anônimos abandonados e sessões vencidas"""
+    batch_size = settings.CART_PURGE_BATCH_SIZE
+    pause = settings.CART_PURGE_PAUSE
+    purged = purge_abandoned_carts(timedelta(days=settings.CART_ABANDONED_DAYS), batch_size, pause)
+    purged['sessions'] = purge_expired_sessions(batch_size, pause)
+    return purged
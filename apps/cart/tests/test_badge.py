@@ -0,0 +1,61 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.cart import utils
+from apps.cart.models import Cart, CartItem
+from apps.cart.utils import badge_cache_key
+from apps.products.factories import make_product
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+class Rollback(Exception):
+    pass
+
+
+def badge_items(cart):
+    return cache.get(badge_cache_key(session_key=cart.session_key))['total_items']
+
+
+def test_badge_is_refreshed_once_per_transaction(monkeypatch):
+    cart = Cart.objects.create(session_key='cabecalho')
+    products = [make_product() for _ in range(3)]
+    refreshed = []
+    original = utils.refresh_cart_badge
+    monkeypatch.setattr(utils, 'refresh_cart_badge', lambda cart_id: refreshed.append(cart_id) or original(cart_id))
+    with transaction.atomic():
+        for product in products:
+            CartItem.objects.create(cart=cart, product=product, quantity=1)
+    assert refreshed == [cart.pk]
+    assert badge_items(cart) == 3
+
+
+def test_badge_is_refreshed_after_rolled_back_change():
+    cart = Cart.objects.create(session_key='cabecalho')
+    CartItem.objects.create(cart=cart, product=make_product(), quantity=1)
+    assert badge_items(cart) == 1
+
+    with pytest.raises(Rollback), transaction.atomic():
+        CartItem.objects.create(cart=cart, product=make_product(), quantity=1)
+        raise Rollback
+
+    CartItem.objects.create(cart=cart, product=make_product(), quantity=4)
+    assert badge_items(cart) == 5
+
+
+def test_price_change_refreshes_badge(rf):
+    product = make_product(price=Decimal('10.00'))
+    cart = Cart.objects.create(session_key='cabecalho')
+    CartItem.objects.create(cart=cart, product=product, quantity=2)
+    request = rf.get('/')
+    request.session = SimpleNamespace(session_key='cabecalho')
+    assert utils.get_cart_badge(request)['total_price'] == Decimal('20.00')
+
+    product.price = Decimal('12.50')
+    product.save()
+
+    assert utils.get_cart_badge(request)['total_price'] == Decimal('25.00')
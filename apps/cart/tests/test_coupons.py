@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.cart.factories import make_coupon
+from apps.cart.models import Coupon
+from apps.core.testing import run_concurrently
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_redemptions_never_exceed_usage_limit():
+    make_coupon(usage_limit=20)
+    redeemed = []
+
+    def redeem():
+        for _ in range(5):
+            if Coupon.get_cached('PROMO').redeem():
+                redeemed.append(1)
+
+    run_concurrently(redeem, 8)
+
+    assert len(redeemed) == 20
+    assert Coupon.objects.get().used_count == 20
+    assert Coupon.get_cached('PROMO').is_valid(100) == (False, 'Cupom esgotado')
+
+
+@pytest.mark.django_db
+def test_cached_coupon_lookup_skips_database():
+    make_coupon()
+    Coupon.get_cached('PROMO')
+    Coupon.get_cached('INEXISTENTE')
+    with CaptureQueriesContext(connection) as queries:
+        assert Coupon.get_cached('PROMO').is_valid(100) == (True, 'Cupom válido')
+        assert Coupon.get_cached('INEXISTENTE') is None
+    assert len(queries) == 0
+
+
+@pytest.mark.django_db
+def test_release_returns_a_use():
+    coupon = make_coupon(usage_limit=1)
+    assert coupon.redeem()
+    assert not Coupon.get_cached('PROMO').redeem()
+    coupon.release()
+    assert Coupon.get_cached('PROMO').redeem()
+
+
+@pytest.mark.django_db
+def test_failed_redeem_of_inactive_coupon_is_not_cached_as_exhausted():
+    make_coupon(usage_limit=5)
+    coupon = Coupon.get_cached('PROMO')
+    Coupon.objects.update(valid_until=timezone.now() - timedelta(minutes=1))
+
+    assert not coupon.redeem()
+    assert Coupon.get_cached('PROMO').used_count == 0
@@ -0,0 +1,63 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.accounts.models import User
+from apps.cart.models import Cart, CartItem
+from apps.cart.utils import merge_cart_items, merge_session_cart
+from apps.products.factories import make_product
+
+pytestmark = pytest.mark.django_db
+
+
+def carts_to_merge(items, session_key):
+    """Carrinho anônimo com ``items`` produtos e carrinho do usuário com o primeiro deles"""
+    user = User.objects.create_user(username=session_key, email=f'{session_key}@example.com', password='senha')
+    products = [make_product(stock_quantity=5) for _ in range(items)]
+    source = Cart.objects.create(session_key=session_key)
+    target = Cart.objects.create(user=user)
+    CartItem.objects.bulk_create([CartItem(cart=source, product=product, quantity=3) for product in products])
+    CartItem.objects.create(cart=target, product=products[0], quantity=4)
+    return user, products, target
+
+
+@pytest.mark.parametrize('items', [2, 30])
+def test_merge_session_cart(items):
+    session_key = f'sessao-{items}'
+    user, products, target = carts_to_merge(items, session_key)
+
+    assert merge_session_cart(session_key, user) == target
+    assert not Cart.objects.filter(session_key=session_key).exists()
+    quantities = dict(CartItem.objects.filter(cart=target).values_list('product_id', 'quantity'))
+    assert len(quantities) == items
+    # 4 + 3 unidades do produto repetido, limitadas ao estoque de 5
+    assert quantities[products[0].pk] == 5
+    assert quantities[products[1].pk] == 3
+
+
+def test_merge_session_cart_query_count_does_not_grow_with_cart_size():
+    counts = []
+    for items in (2, 30):
+        user, _, _ = carts_to_merge(items, f'sessao-{items}')
+        with CaptureQueriesContext(connection) as queries:
+            merge_session_cart(f'sessao-{items}', user)
+        counts.append(len(queries))
+    assert counts[0] == counts[1]
+
+
+def test_merge_cart_items_query_count_does_not_grow_with_cart_size():
+    counts = []
+    for items in (2, 30):
+        user = User.objects.create_user(username=f'cookie-{items}', email=f'cookie-{items}@example.com')
+        quantities = {make_product(stock_quantity=5).pk: 2 for _ in range(items)}
+        with CaptureQueriesContext(connection) as queries:
+            cart = merge_cart_items(user, quantities)
+        counts.append(len(queries))
+        assert CartItem.objects.filter(cart=cart).count() == items
+    assert counts[0] == counts[1]
+
+
+def test_merge_without_session_cart_does_nothing():
+    user = User.objects.create_user(username='sem-carrinho', email='sem-carrinho@example.com')
+    assert merge_session_cart('inexistente', user) is None
+    assert not Cart.objects.filter(user=user).exists()
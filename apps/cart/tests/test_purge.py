@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+import pytest
+from django.db import transaction
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.cart import utils
+from apps.cart.models import Cart, CartItem
+from apps.cart.utils import purge_abandoned_carts
+from apps.products.factories import make_product
+from apps.products.inventory import reserve_stock
+from apps.products.models import StockReservation
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def abandoned():
+    """25 carrinhos anônimos com um item cada, sem alteração há 40 dias"""
+    product = make_product(stock_quantity=100)
+    carts = [Cart.objects.create(session_key=f'sessao-{index}') for index in range(25)]
+    CartItem.objects.bulk_create([CartItem(cart=cart, product=product) for cart in carts])
+    Cart.objects.update(updated_at=timezone.now() - timedelta(days=40))
+    return carts
+
+
+def test_purge_deletes_old_anonymous_carts_in_batches(abandoned):
+    user_cart = Cart.objects.create(user=User.objects.create_user(username='cliente', email='cliente@example.com'))
+    fresh = Cart.objects.create(session_key='recente')
+    Cart.objects.filter(pk=user_cart.pk).update(updated_at=timezone.now() - timedelta(days=40))
+    reservation = reserve_stock(make_product(), 1, cart=abandoned[0])
+
+    assert purge_abandoned_carts(timedelta(days=30), batch_size=7, pause=0) == {'carts': 25, 'items': 25}
+    assert set(Cart.objects.all()) == {user_cart, fresh}
+    assert StockReservation.objects.get(pk=reservation.pk).cart_id is None
+
+
+def test_item_change_keeps_cart_from_purge(abandoned):
+    item = CartItem.objects.filter(cart=abandoned[0]).get()
+    item.quantity = 2
+    item.save()
+
+    assert purge_abandoned_carts(timedelta(days=30), pause=0)['carts'] == 24
+    assert list(Cart.objects.all()) == [abandoned[0]]
+
+
+def test_cart_used_after_batch_read_is_kept(abandoned, monkeypatch):
+    class UseCartBeforeDelete:
+        """Usa um dos carrinhos do lote quando a transação do DELETE começa, depois da leitura do lote"""
+        used = False
+
+        def __getattr__(self, name):
+            return getattr(transaction, name)
+
+        def atomic(self):
+            if not self.used:
+                self.used = True
+                CartItem.objects.create(cart=abandoned[1], product=make_product())
+            return transaction.atomic()
+
+    monkeypatch.setattr(utils, 'transaction', UseCartBeforeDelete())
+    assert purge_abandoned_carts(timedelta(days=30), pause=0) == {'carts': 24, 'items': 24}
+    assert CartItem.objects.filter(cart=abandoned[1]).count() == 2
+
+
+def test_clear_touches_cart_once(abandoned, django_assert_num_queries):
+    cart = abandoned[0]
+    CartItem.objects.bulk_create([CartItem(cart=cart, product=make_product()) for _ in range(9)])
+    Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now() - timedelta(days=40))
+    cart = Cart.objects.get(pk=cart.pk)
+
+    # Leitura e remoção dos itens e uma única marcação do carrinho
+    with django_assert_num_queries(3):
+        cart.clear()
+
+    assert not CartItem.objects.filter(cart=cart).exists()
+    assert purge_abandoned_carts(timedelta(days=30), pause=0)['carts'] == 24
@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.cart.models import Cart, CartItem
+from apps.products.factories import make_product
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def cart():
+    cart = Cart.objects.create(session_key='resumo')
+    for index in range(50):
+        product = make_product(price=Decimal('10.00'), sale_price=Decimal('8.00') if index % 2 else None,
+                               weight=Decimal('1.500'))
+        CartItem.objects.create(cart=cart, product=product, quantity=2)
+    return Cart.objects.get(pk=cart.pk)
+
+
+def test_summary_uses_one_query_on_miss(cart):
+    Cart.invalidate_summary(cart.pk)
+    with CaptureQueriesContext(connection) as queries:
+        assert cart.total_items == 100
+        assert cart.subtotal == Decimal('900.00')
+        assert cart.total_weight == Decimal('150.000')
+    assert len(queries) == 1
+
+
+def test_summary_uses_no_query_on_cache_hit(cart):
+    cart.get_summary()
+    cached = Cart.objects.get(pk=cart.pk)
+    with CaptureQueriesContext(connection) as queries:
+        assert cached.total_items == 100
+        assert cached.subtotal == Decimal('900.00')
+    assert len(queries) == 0
+
+
+def test_summary_is_invalidated_when_items_change(cart):
+    cart.get_summary()
+    CartItem.objects.filter(cart=cart).first().delete()
+    assert Cart.objects.get(pk=cart.pk).total_items == 98
@@ -1,12 +1,16 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, views_async
 
 app_name = 'cart'
 
+# No deploy ASGI as alterações do carrinho são servidas pelas views async
+mutations = views_async if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
     path('', views.cart_view, name='view'),
-    path('add/<uuid:product_id>/', views.add_to_cart, name='add'),
-    path('remove/<uuid:product_id>/', views.remove_from_cart, name='remove'),
-    path('update/<uuid:product_id>/', views.update_cart, name='update'),
-    path('clear/', views.clear_cart, name='clear'),
+    path('add/<uuid:product_id>/', mutations.add_to_cart, name='add'),
+    path('remove/<uuid:product_id>/', mutations.remove_from_cart, name='remove'),
+    path('update/<uuid:product_id>/', mutations.update_cart, name='update'),
+    path('clear/', mutations.clear_cart, name='clear'),
 ]
@@ -0,0 +1,249 @@
+import time
+from decimal import Decimal
+from functools import partial
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from apps.core.transactions import on_commit_once
+from apps.products.models import Product, StockReservation
+from .models import Cart, CartItem
+
+CART_BADGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+CART_PURGE_STATS_KEY = 'cart:purge:stats'
+
+EMPTY_BADGE = {'total_items': 0, 'total_price': Decimal('0.00')}
+
+
+def badge_cache_key(user_id=None, session_key=None):
+    """Retorna a chave do resumo do carrinho para um usuário ou sessão"""
+    if user_id:
+        return f'cart:badge:user:{user_id}'
+    return f'cart:badge:session:{session_key}'
+
+
+def get_cart_badge(request):
+    """Retorna o resumo do carrinho exibido no cabeçalho, lido do cache"""
+    user = getattr(request, 'user', None)
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    session_key = request.session.session_key if hasattr(request, 'session') else None
+    if not user_id and not session_key:
+        return EMPTY_BADGE
+
+    key = badge_cache_key(user_id, session_key)
+    badge = cache.get(key)
+    if badge is None:
+        carts = Cart.objects.filter(user_id=user_id) if user_id else Cart.objects.filter(session_key=session_key)
+        cart = carts.order_by('-updated_at').first()
+        badge = _badge_from_cart(cart) if cart else EMPTY_BADGE
+        cache.set(key, badge, CART_BADGE_CACHE_TIMEOUT)
+    return badge
+
+
+async def aget_cart_badge(request):
+    """Versão assíncrona de get_cart_badge; request.user já deve estar carregado"""
+    user = getattr(request, 'user', None)
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    session_key = request.session.session_key if hasattr(request, 'session') else None
+    if not user_id and not session_key:
+        return EMPTY_BADGE
+
+    key = badge_cache_key(user_id, session_key)
+    badge = await cache.aget(key)
+    if badge is None:
+        carts = Cart.objects.filter(user_id=user_id) if user_id else Cart.objects.filter(session_key=session_key)
+        cart = await carts.order_by('-updated_at').afirst()
+        badge = await sync_to_async(_badge_from_cart)(cart) if cart else EMPTY_BADGE
+        await cache.aset(key, badge, CART_BADGE_CACHE_TIMEOUT)
+    return badge
+
+
+def refresh_cart_badge(cart_id):
+    """Recalcula o resumo do carrinho e grava no cache do dono (write-through)"""
+    cart = Cart.objects.filter(pk=cart_id).only('id', 'user_id', 'session_key').first()
+    if cart is None or not (cart.user_id or cart.session_key):
+        return
+    cache.set(badge_cache_key(cart.user_id, cart.session_key), _badge_from_cart(cart, refresh=True),
+              CART_BADGE_CACHE_TIMEOUT)
+
+
+def schedule_cart_badge_refresh(cart_id, using=None):
+    """Agenda a atualização do resumo para o fim da transação, uma vez por carrinho"""
+    on_commit_once(f'cart:badge:{cart_id}', partial(refresh_cart_badge, cart_id), using=using)
+
+
+def merge_session_cart(session_key, user):
+    """Move os itens do carrinho anônimo da sessão para o carrinho do usuário
+
+    Roda em um número fixo de consultas, qualquer que seja o tamanho do carrinho:
+    a leitura das quantidades somadas por produto, um upsert em lote no
+    carrinho do usuário, a remoção do carrinho de origem (com seus itens) e o
+    ajuste das quantidades ao estoque disponível. Retorna o carrinho do usuário,
+    ou None se não havia nada a juntar.
+    """
+    if not session_key:
+        return None
+
+    with transaction.atomic():
+        source_ids = list(
+            Cart.objects.filter(session_key=session_key, user__isnull=True).values_list('id', flat=True)
+        )
+        if not source_ids:
+            return None
+
+        target = _user_cart(user)
+        quantities = dict(
+            CartItem.objects.filter(cart_id__in=source_ids).order_by().values('product_id')
+            .annotate(total=Sum('quantity')).values_list('product_id', 'total')
+        )
+        _add_items(target, quantities)
+        StockReservation.objects.filter(cart_id__in=source_ids).update(cart=target)
+        # Os itens saem em cascata; os sinais deles ignoram carrinhos que estão sendo apagados
+        Cart.objects.filter(id__in=source_ids).delete()
+        _clamp_to_stock(target)
+
+    cache.delete(badge_cache_key(session_key=session_key))
+    Cart.invalidate_summary(target.pk)
+    schedule_cart_badge_refresh(target.pk)
+    return target
+
+
+def merge_cart_items(user, quantities):
+    """Soma um dicionário {product_id: quantidade} ao carrinho do usuário com um único upsert
+
+    Usado para gravar o carrinho guardado em cookie no login. Produtos que não
+    existem mais são ignorados. Retorna o carrinho do usuário, ou None se não
+    havia itens.
+    """
+    if not quantities:
+        return None
+
+    with transaction.atomic():
+        product_ids = list(Product.objects.filter(pk__in=list(quantities)).values_list('pk', flat=True))
+        if not product_ids:
+            return None
+
+        target = _user_cart(user)
+        _add_items(target, {product_id: quantities[product_id] for product_id in product_ids})
+        _clamp_to_stock(target)
+
+    Cart.invalidate_summary(target.pk)
+    schedule_cart_badge_refresh(target.pk)
+    return target
+
+
+def purge_abandoned_carts(max_age, batch_size=500, pause=0.1):
+    """Apaga em lotes os carrinhos anônimos sem alteração há mais de ``max_age``
+
+    Os lotes seguem a ordem da chave primária e cada um roda na sua própria
+    transação curta, com uma pausa entre eles para não segurar bloqueios.
+    Retorna {'carts': ..., 'items': ...} com o total apagado.
+    """
+    cutoff = timezone.now() - max_age
+    purged = {'carts': 0, 'items': 0}
+    last_pk = None
+    while True:
+        queryset = Cart.objects.filter(user__isnull=True, updated_at__lt=cutoff).order_by('pk')
+        if last_pk is not None:
+            queryset = queryset.filter(pk__gt=last_pk)
+        batch = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1]
+
+        with transaction.atomic():
+            # A idade é conferida de novo com os carrinhos bloqueados: um carrinho usado desde a leitura
+            # do lote fica. Itens e vínculos com reservas saem junto com o carrinho
+            abandoned = Cart.objects.select_for_update().filter(
+                pk__in=batch, user__isnull=True, updated_at__lt=cutoff,
+            )
+            _, deleted = abandoned.delete()
+            purged['carts'] += deleted.get(Cart._meta.label, 0)
+            purged['items'] += deleted.get(CartItem._meta.label, 0)
+
+        if len(batch) < batch_size:
+            break
+        time.sleep(pause)
+
+    stats = cache.get(CART_PURGE_STATS_KEY) or {'carts': 0, 'items': 0}
+    cache.set(CART_PURGE_STATS_KEY, {
+        'carts': stats['carts'] + purged['carts'],
+        'items': stats['items'] + purged['items'],
+        'last_run': timezone.now().isoformat(),
+        'last_purged': purged,
+    }, None)
+    return purged
+
+
+def purge_expired_sessions(batch_size=500, pause=0.1):
+    """Apaga as sessões vencidas em lotes, ou delega ao backend quando ele não usa o banco"""
+    engine = import_module(settings.SESSION_ENGINE)
+    if not hasattr(engine.SessionStore, 'get_model_class'):
+        engine.SessionStore.clear_expired()
+        return 0
+
+    model = engine.SessionStore.get_model_class()
+    purged = 0
+    while True:
+        keys = list(
+            model.objects.filter(expire_date__lt=timezone.now()).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not keys:
+            break
+        purged += model.objects.filter(pk__in=keys).delete()[0]
+        if len(keys) < batch_size:
+            break
+        time.sleep(pause)
+    return purged
+
+
+def _user_cart(user):
+    cart = Cart.objects.filter(user=user).order_by('-updated_at').first()
+    if cart is None:
+        cart = Cart.objects.create(user=user)
+    return cart
+
+
+def _add_items(cart, quantities):
+    """Soma as quantidades {product_id: quantidade} aos itens do carrinho com um único upsert
+
+    Os itens existentes são bloqueados e lidos antes, porque o upsert grava a
+    quantidade final.
+    """
+    existing = dict(
+        CartItem.objects.select_for_update().filter(cart=cart, product_id__in=list(quantities))
+        .values_list('product_id', 'quantity')
+    )
+    CartItem.objects.bulk_create(
+        [
+            CartItem(cart=cart, product_id=product_id, quantity=existing.get(product_id, 0) + quantity)
+            for product_id, quantity in quantities.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['cart', 'product'],
+        update_fields=['quantity'],
+    )
+
+
+def _clamp_to_stock(cart):
+    """Limita as quantidades do carrinho ao estoque livre em um único UPDATE"""
+    available = Product.objects.filter(pk=OuterRef('product_id')).values(
+        available=F('stock_quantity') - F('reserved_quantity')
+    )
+    CartItem.objects.filter(
+        cart=cart,
+        quantity__gt=F('product__stock_quantity') - F('product__reserved_quantity'),
+        product__stock_quantity__gt=F('product__reserved_quantity'),
+    ).update(quantity=Subquery(available))
+    Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now())
+
+
+def _badge_from_cart(cart, refresh=False):
+    summary = cart.get_summary(refresh=refresh)
+    return {'total_items': summary['total_items'], 'total_price': summary['subtotal']}
@@ -1,22 +1,68 @@
-from django.shortcuts import render
-from django.http import HttpResponse
+from django.contrib import messages
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
+
+from apps.products.models import Product
+from .storage import get_cart
 
 
 def cart_view(request):
-    return HttpResponse("Carrinho - Em desenvolvimento")
+    cart = get_cart(request)
+    lines = cart.lines()
+    context = {
+        'lines': lines,
+        'summary': cart.get_summary(lines),
+    }
+    return render(request, 'cart/cart.html', context)
 
 
+@require_POST
 def add_to_cart(request, product_id):
-    return HttpResponse(f"Adicionar produto {product_id} ao carrinho - Em desenvolvimento")
+    product = get_object_or_404(Product.objects.active(), pk=product_id)
+    cart = get_cart(request)
+    current = cart.quantities().get(product.pk, 0)
+    quantity = cart.add(product, _quantity(request, default=1))
+    if quantity <= current:
+        messages.warning(request, f'Não há mais unidades disponíveis de {product.name}.')
+    return cart.save(_redirect_back(request))
 
 
+@require_POST
 def remove_from_cart(request, product_id):
-    return HttpResponse(f"Remover produto {product_id} do carrinho - Em desenvolvimento")
+    product = get_object_or_404(Product, pk=product_id)
+    cart = get_cart(request)
+    cart.remove(product)
+    return cart.save(redirect('cart:view'))
 
 
+@require_POST
 def update_cart(request, product_id):
-    return HttpResponse(f"Atualizar produto {product_id} no carrinho - Em desenvolvimento")
+    product = get_object_or_404(Product, pk=product_id)
+    cart = get_cart(request)
+    requested = _quantity(request, default=0)
+    if cart.update(product, requested) < requested:
+        messages.warning(request, f'Quantidade de {product.name} ajustada ao estoque disponível.')
+    return cart.save(redirect('cart:view'))
 
 
+@require_POST
 def clear_cart(request):
-    return HttpResponse("Limpar carrinho - Em desenvolvimento")
+    cart = get_cart(request)
+    cart.clear()
+    return cart.save(redirect('cart:view'))
+
+
+def _quantity(request, default):
+    try:
+        return max(int(request.POST.get('quantity', default)), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+def _redirect_back(request):
+    next_url = request.POST.get('next') or request.META.get('HTTP_REFERER')
+    if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()},
+                                                    require_https=request.is_secure()):
+        return redirect(next_url)
+    return redirect('cart:view')
@@ -0,0 +1,62 @@
+"""Alterações do carrinho para o deploy ASGI (ASYNC_VIEWS ligado)
+
+Mesmo comportamento de views.py. O carrinho em cookie dos visitantes não faz
+E/S além da consulta do produto; o carrinho no banco usa as versões async de
+BaseCart, que rodam as gravações em uma thread.
+"""
+from django.contrib import messages
+from django.http import Http404
+from django.shortcuts import redirect
+
+from apps.core.async_utils import aload_user, async_require_POST
+from apps.products.models import Product
+from .storage import get_cart
+from .views import _quantity, _redirect_back
+
+
+async def _aget_product_or_404(queryset, product_id):
+    try:
+        return await queryset.aget(pk=product_id)
+    except Product.DoesNotExist:
+        raise Http404('No Product matches the given query.')
+
+
+async def _get_cart(request):
+    await aload_user(request)
+    return get_cart(request)
+
+
+@async_require_POST
+async def add_to_cart(request, product_id):
+    product = await _aget_product_or_404(Product.objects.active(), product_id)
+    cart = await _get_cart(request)
+    current = (await cart.aquantities()).get(product.pk, 0)
+    quantity = await cart.aadd(product, _quantity(request, default=1))
+    if quantity <= current:
+        messages.warning(request, f'Não há mais unidades disponíveis de {product.name}.')
+    return await cart.asave(_redirect_back(request))
+
+
+@async_require_POST
+async def remove_from_cart(request, product_id):
+    product = await _aget_product_or_404(Product.objects.all(), product_id)
+    cart = await _get_cart(request)
+    await cart.aremove(product)
+    return await cart.asave(redirect('cart:view'))
+
+
+@async_require_POST
+async def update_cart(request, product_id):
+    product = await _aget_product_or_404(Product.objects.all(), product_id)
+    cart = await _get_cart(request)
+    requested = _quantity(request, default=0)
+    if await cart.aupdate(product, requested) < requested:
+        messages.warning(request, f'Quantidade de {product.name} ajustada ao estoque disponível.')
+    return await cart.asave(redirect('cart:view'))
+
+
+@async_require_POST
+async def clear_cart(request):
+    cart = await _get_cart(request)
+    await cart.aclear()
+    return await cart.asave(redirect('cart:view'))
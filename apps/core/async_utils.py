@@ -0,0 +1,67 @@
+"""Utilitários para views async
+
+No Django 4.2 os decoradores de views (condition, require_POST) só aceitam
+funções síncronas e request.user é carregado de forma preguiçosa pelo ORM
+síncrono. Estas versões permitem que as views async rodem inteiras no loop de
+eventos, sem passar por uma thread a cada requisição.
+"""
+import datetime
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotAllowed
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+async def aload_user(request):
+    """Carrega request.user em uma thread para que os acessos seguintes não consultem o banco"""
+    user = getattr(request, 'user', None)
+    if user is not None:
+        await sync_to_async(lambda: user.is_authenticated)()
+    return user
+
+
+def async_require_POST(func):
+    """Equivalente async de require_POST"""
+    @wraps(func)
+    async def inner(request, *args, **kwargs):
+        if request.method != 'POST':
+            return HttpResponseNotAllowed(['POST'])
+        return await func(request, *args, **kwargs)
+    return inner
+
+
+def async_condition(etag_func=None, last_modified_func=None):
+    """Equivalente async de django.views.decorators.http.condition
+
+    ``etag_func`` e ``last_modified_func`` são corrotinas com a mesma
+    assinatura da view. request.user é carregado antes delas.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def inner(request, *args, **kwargs):
+            await aload_user(request)
+            res_etag = await etag_func(request, *args, **kwargs) if etag_func else None
+            res_etag = quote_etag(res_etag) if res_etag is not None else None
+            res_last_modified = None
+            if last_modified_func:
+                dt = await last_modified_func(request, *args, **kwargs)
+                if dt:
+                    if not timezone.is_aware(dt):
+                        dt = timezone.make_aware(dt, datetime.timezone.utc)
+                    res_last_modified = int(dt.timestamp())
+
+            response = get_conditional_response(request, etag=res_etag, last_modified=res_last_modified)
+            if response is None:
+                response = await func(request, *args, **kwargs)
+
+            if request.method in ('GET', 'HEAD'):
+                if res_last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(res_last_modified)
+                if res_etag:
+                    response.headers.setdefault('ETag', res_etag)
+            return response
+        return inner
+    return decorator
@@ -0,0 +1,47 @@
+"""Backends de cache que contam acertos e faltas (apps.core.metrics)"""
+import re
+
+from django.core.cache.backends import locmem, redis
+
+from apps.core.metrics import CACHE_REQUESTS
+
+_MISSING = object()
+
+# Prefixo estável da chave ('catalog:version', 'cart:badge', 'template.cache'), sem ids nem hashes
+_PREFIX_RE = re.compile(r'[^:.]+(?:[:.][^:.]+)?')
+
+
+def key_prefix(key):
+    match = _PREFIX_RE.match(str(key))
+    return match.group() if match else ''
+
+
+class CacheMetricsMixin:
+    """Conta cada leitura de get, get_many e get_or_set como hit ou miss, pelo prefixo da chave"""
+    _metrics_in_get_many = False
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if not self._metrics_in_get_many:
+            CACHE_REQUESTS.inc(prefix=key_prefix(key), result='miss' if value is _MISSING else 'hit')
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        # O get_many padrão chama get chave a chave: a contagem fica aqui
+        self._metrics_in_get_many = True
+        try:
+            found = super().get_many(keys, version)
+        finally:
+            self._metrics_in_get_many = False
+        for key in keys:
+            CACHE_REQUESTS.inc(prefix=key_prefix(key), result='hit' if key in found else 'miss')
+        return found
+
+
+class LocMemCache(CacheMetricsMixin, locmem.LocMemCache):
+    pass
+
+
+class RedisCache(CacheMetricsMixin, redis.RedisCache):
+    pass
@@ -0,0 +1,7 @@
+from django.db.backends.postgresql import base
+
+from apps.core.connections import ConnectionMetricsMixin
+
+
+class DatabaseWrapper(ConnectionMetricsMixin, base.DatabaseWrapper):
+    """PostgreSQL com métricas de conexão (apps.core.connections)"""
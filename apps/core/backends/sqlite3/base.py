@@ -0,0 +1,7 @@
+from django.db.backends.sqlite3 import base
+
+from apps.core.connections import ConnectionMetricsMixin
+
+
+class DatabaseWrapper(ConnectionMetricsMixin, base.DatabaseWrapper):
+    """SQLite com métricas de conexão (apps.core.connections)"""
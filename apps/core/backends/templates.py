@@ -0,0 +1,37 @@
+"""Backend de templates que mede a renderização (apps.core.metrics)"""
+import time
+from contextvars import ContextVar
+
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+from apps.core.metrics import TEMPLATE_SECONDS
+
+_rendering = ContextVar('template_rendering', default=False)
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        # Templates renderizados dentro de outro (render_to_string em uma tag) já contam no de fora
+        if _rendering.get():
+            return super().render(context, request)
+        token = _rendering.set(True)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            TEMPLATE_SECONDS.observe(time.perf_counter() - started, template=self.origin.template_name or 'string')
+            _rendering.reset(token)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """DjangoTemplates com a renderização de cada template de página medida por nome"""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
@@ -0,0 +1,47 @@
+"""Utilitários dos comandos de benchmark que sobem o servidor e medem latências"""
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.core.management.base import CommandError
+
+# Comando e ambiente de cada deploy; porta e número de workers são acrescentados por start_server
+SERVERS = {
+    'wsgi': (['gunicorn', 'treinamais.wsgi:application'], {'ASYNC_VIEWS': 'False'}),
+    'asgi': (['gunicorn', 'treinamais.asgi:application', '--worker-class', 'uvicorn.workers.UvicornWorker'],
+             {'ASYNC_VIEWS': 'True'}),
+}
+
+
+def start_server(name, workers, extra_env=None):
+    """Sobe o deploy ``name`` de SERVERS em uma porta livre; retorna (processo, url) quando aceita conexões"""
+    command, server_env = SERVERS[name]
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    env = {**os.environ, **server_env, **(extra_env or {})}
+    server = subprocess.Popen(
+        [sys.executable, '-m', *command, '--bind', f'127.0.0.1:{port}', '--workers', str(workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise CommandError(f'O servidor {name} não iniciou (gunicorn e uvicorn estão instalados?)')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server, f'http://127.0.0.1:{port}'
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise CommandError(f'O servidor {name} não respondeu em 30s')
+
+
+def percentile(ordered, fraction):
+    """Percentil pelo posto mais próximo de uma lista já ordenada (mesmo critério em todos os benchmarks)"""
+    if not ordered:
+        return 0
+    return ordered[max(math.ceil(len(ordered) * fraction) - 1, 0)]
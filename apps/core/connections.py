@@ -0,0 +1,105 @@
+"""Ciclo de vida e métricas das conexões persistentes com o banco
+
+As conexões ficam abertas entre requisições e tarefas por até CONN_MAX_AGE
+segundos. O Django fecha a conexão no fim do ciclo (request_finished, ou o
+task_postrun do Celery) se ela passou da idade ou teve erro, e com
+CONN_HEALTH_CHECKS testa a conexão reaproveitada antes da primeira consulta do
+ciclo seguinte.
+
+Os backends em apps.core.backends acrescentam a esse ciclo a contagem de
+conexões abertas, reaproveitadas e fechadas (por motivo) e o tempo gasto
+abrindo conexões, que é o tempo que a requisição espera antes da primeira
+consulta. Os números são por processo: ver connection_stats().
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+_stats = defaultdict(lambda: defaultdict(float))
+_stats_lock = threading.Lock()
+
+
+def record(alias, name, value=1):
+    with _stats_lock:
+        _stats[alias][name] += value
+
+
+def record_connect(alias, seconds):
+    with _stats_lock:
+        stats = _stats[alias]
+        stats['opened'] += 1
+        stats['connect_seconds'] += seconds
+        stats['connect_seconds_max'] = max(stats['connect_seconds_max'], seconds)
+
+
+def connection_stats():
+    """Retorna, por alias, as contagens de conexões e os tempos de abertura deste processo
+
+    Chaves: opened, reused, closed_<motivo> (age, error, unhealthy, state,
+    explicit), connect_seconds e connect_seconds_max.
+    """
+    with _stats_lock:
+        return {alias: dict(stats) for alias, stats in _stats.items()}
+
+
+def reset_connection_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class ConnectionMetricsMixin:
+    """Mixin do DatabaseWrapper que mede o ciclo de vida das conexões
+
+    Um ciclo vai de um close_if_unusable_or_obsolete ao seguinte (uma requisição
+    ou uma tarefa). A primeira consulta do ciclo conta como reuso quando
+    encontra a conexão do ciclo anterior aberta e saudável.
+    """
+    _metrics_checked_out = False
+    _close_reason = None
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        elapsed = time.perf_counter() - started
+        record_connect(self.alias, elapsed)
+        logger.debug('Conexão %s aberta em %.1fms', self.alias, elapsed * 1000)
+
+    def _cursor(self, name=None):
+        if self._metrics_checked_out:
+            return super()._cursor(name)
+        self._metrics_checked_out = True
+        previous = self.connection
+        cursor = super()._cursor(name)
+        if previous is not None and self.connection is previous:
+            record(self.alias, 'reused')
+        return cursor
+
+    def close_if_health_check_failed(self):
+        self._close_reason = 'unhealthy'
+        try:
+            super().close_if_health_check_failed()
+        finally:
+            self._close_reason = None
+
+    def close_if_unusable_or_obsolete(self):
+        self._metrics_checked_out = False
+        if self.connection is not None:
+            if self.errors_occurred:
+                self._close_reason = 'error'
+            elif self.close_at is not None and time.monotonic() >= self.close_at:
+                self._close_reason = 'age'
+            else:
+                self._close_reason = 'state'
+        try:
+            super().close_if_unusable_or_obsolete()
+        finally:
+            self._close_reason = None
+
+    def close(self):
+        was_open = self.connection is not None
+        super().close()
+        if was_open and self.connection is None:
+            record(self.alias, f'closed_{self._close_reason or "explicit"}')
@@ -1,18 +1,23 @@
+from apps.cart.storage import cart_badge
+from apps.products.cache import get_category_tree, get_version
+
+
 def cart(request):
     """Context processor para o carrinho"""
+    badge = cart_badge(request)
     return {
-        'cart_total_items': 3,
-        'cart_total_price': 1299.70,
+        'cart_total_items': badge['total_items'],
+        'cart_total_price': badge['total_price'],
     }
 
 
 def categories(request):
-    """Context processor para categorias"""
+    """Context processor para categorias
+
+    A árvore é passada sem ser chamada: o template só a monta quando o fragmento
+    do cabeçalho ou do rodapé (chaveado por categories_version) não está no cache.
+    """
     return {
-        'main_categories': [
-            {'name': 'Musculação', 'slug': 'musculacao'},
-            {'name': 'Cardio', 'slug': 'cardio'},
-            {'name': 'Acessórios', 'slug': 'acessorios'},
-            {'name': 'Suplementos', 'slug': 'suplementos'},
-        ]
+        'main_categories': get_category_tree,
+        'categories_version': get_version('categories'),
     }
@@ -0,0 +1,191 @@
+import asyncio
+import itertools
+import re
+import socket
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from apps.core.benchmark import percentile, start_server
+from apps.products.models import Category, Product
+
+CSRF_COOKIE_RE = re.compile(rb'^set-cookie:\s*csrftoken=([^;\r\n]+)', re.IGNORECASE | re.MULTILINE)
+
+
+class Command(BaseCommand):
+    help = ('Compara requisições por segundo e latência p99 dos deploys WSGI (workers síncronos) '
+            'e ASGI (uvicorn + views async) sob carga de clientes lentos')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', help='Deploy WSGI já em execução (senão o benchmark sobe um gunicorn)')
+        parser.add_argument('--asgi-url', help='Deploy ASGI já em execução (senão o benchmark sobe um gunicorn)')
+        parser.add_argument('--workers', type=int, default=2, help='Processos de cada servidor iniciado')
+        parser.add_argument('--clients', type=int, default=100, help='Clientes simultâneos')
+        parser.add_argument('--duration', type=float, default=10.0, help='Segundos de carga em cada deploy')
+        parser.add_argument('--slow-client-delay', type=float, default=0.05,
+                            help='Pausa do cliente entre cada pedaço enviado ou lido (segundos)')
+        parser.add_argument('--chunk-size', type=int, default=4096, help='Bytes lidos por vez da resposta')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Tempo máximo de uma requisição')
+
+    def handle(self, *args, **options):
+        routes = self.routes()
+        self.stdout.write(f'{options["clients"]} clientes, {options["duration"]:.0f}s por deploy, '
+                          f'pausa de {options["slow_client_delay"] * 1000:.0f}ms por pedaço')
+
+        results = {}
+        for name in ('wsgi', 'asgi'):
+            url = options[f'{name}_url']
+            server = None
+            if not url:
+                server, url = start_server(name, options['workers'])
+            try:
+                bench = Bench(urlsplit(url), routes, options)
+                asyncio.run(bench.warm_up())
+                results[name] = asyncio.run(bench.run())
+            finally:
+                if server is not None:
+                    server.terminate()
+                    server.wait(10)
+            self.report(name, results[name])
+
+        wsgi, asgi = results['wsgi'], results['asgi']
+        if wsgi['rps'] and asgi['p99']:
+            self.stdout.write(self.style.SUCCESS(
+                f'ASGI: {asgi["rps"] / wsgi["rps"]:.1f}x requisições por segundo, '
+                f'p99 {wsgi["p99"] / asgi["p99"]:.1f}x menor'
+            ))
+
+    def routes(self):
+        """Rotas exercitadas: listagem, categoria, detalhe, busca e inclusão no carrinho"""
+        product = Product.objects.active().values('pk', 'slug').first()
+        if product is None:
+            raise CommandError('Nenhum produto ativo: importe o catálogo antes do benchmark')
+        routes = [
+            ('GET', reverse('products:list')),
+            ('GET', reverse('products:detail', args=[product['slug']])),
+            ('GET', reverse('products:search') + '?q=' + product['slug'].split('-')[0]),
+            ('POST', reverse('cart:add', args=[product['pk']])),
+        ]
+        category = Category.objects.filter(is_active=True).values_list('slug', flat=True).first()
+        if category:
+            routes.insert(1, ('GET', reverse('products:category', args=[category])))
+        return routes
+
+    def report(self, name, result):
+        self.stdout.write(
+            f'{name.upper():<5} {result["requests"]:6d} req  {result["rps"]:7.1f} req/s   '
+            f'p50 {result["p50"]:7.1f}ms   p95 {result["p95"]:7.1f}ms   p99 {result["p99"]:7.1f}ms   '
+            f'{result["errors"]} erros'
+        )
+
+
+class Bench:
+    """Gerador de carga com clientes lentos sobre conexões TCP diretas
+
+    Cada cliente envia a requisição em pedaços e lê a resposta aos poucos, com
+    uma pausa entre eles, como um celular em rede ruim. Um worker síncrono fica
+    preso ao cliente durante todo esse tempo; um worker ASGI atende outros.
+    """
+
+    def __init__(self, url, routes, options):
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.routes = routes
+        self.clients = options['clients']
+        self.duration = options['duration']
+        self.delay = options['slow_client_delay']
+        self.chunk_size = options['chunk_size']
+        self.timeout = options['timeout']
+        self.csrf_token = None
+
+    async def warm_up(self):
+        """Carrega índices e templates nos workers e obtém um token CSRF para os POSTs"""
+        for _ in range(3):
+            for method, path in self.routes:
+                if method == 'GET':
+                    await self.fetch(method, path, slow=False)
+        for method, path in self.routes:
+            if method == 'GET':
+                _, head = await self.fetch(method, path, slow=False)
+                match = CSRF_COOKIE_RE.search(head)
+                if match:
+                    self.csrf_token = match.group(1).decode()
+                    break
+
+    async def run(self):
+        latencies, errors = [], 0
+        deadline = time.monotonic() + self.duration
+        routes = itertools.cycle(self.routes)
+
+        async def client():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                method, path = next(routes)
+                started = time.perf_counter()
+                try:
+                    status, _ = await asyncio.wait_for(self.fetch(method, path), self.timeout)
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    status = None
+                if status in (200, 302):
+                    latencies.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(client() for _ in range(self.clients)))
+        elapsed = time.monotonic() - started
+
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'rps': len(latencies) / elapsed,
+            'p50': statistics.median(latencies) if latencies else 0,
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+        }
+
+    def build_request(self, method, path):
+        """Retorna a requisição HTTP em pedaços: linha inicial, cabeçalhos e corpo"""
+        headers = [f'Host: {self.host}:{self.port}', 'Connection: close', 'User-Agent: bench_concurrency']
+        body = b''
+        if method == 'POST':
+            body = b'quantity=1'
+            headers += ['Content-Type: application/x-www-form-urlencoded', f'Content-Length: {len(body)}']
+            if self.csrf_token:
+                headers += [f'Cookie: csrftoken={self.csrf_token}', f'X-CSRFToken: {self.csrf_token}']
+        return [
+            f'{method} {path} HTTP/1.1\r\n'.encode(),
+            ('\r\n'.join(headers) + '\r\n\r\n').encode(),
+            body,
+        ]
+
+    async def fetch(self, method, path, slow=True):
+        """Envia a requisição e lê a resposta inteira; retorna (status, cabeçalhos)"""
+        sock = socket.socket()
+        sock.setblocking(False)
+        if slow:
+            # Janela de recepção pequena: o servidor só consegue enviar à medida que o cliente lê
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.chunk_size)
+        try:
+            await asyncio.get_running_loop().sock_connect(sock, (self.host, self.port))
+        except OSError:
+            sock.close()
+            raise
+        reader, writer = await asyncio.open_connection(sock=sock, limit=self.chunk_size)
+        try:
+            for part in filter(None, self.build_request(method, path)):
+                writer.write(part)
+                await writer.drain()
+                if slow:
+                    await asyncio.sleep(self.delay)
+            head = await reader.readuntil(b'\r\n\r\n')
+            while await reader.read(self.chunk_size):
+                if slow:
+                    await asyncio.sleep(self.delay)
+        finally:
+            writer.close()
+        return int(head.split(b' ', 2)[1]), head
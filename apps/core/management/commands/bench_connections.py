@@ -0,0 +1,72 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.test import Client
+from django.urls import reverse
+
+from apps.core.connections import ConnectionMetricsMixin, connection_stats, reset_connection_stats
+from apps.products.models import Product
+
+
+class Command(BaseCommand):
+    help = ('Compara a latência das requisições abrindo uma conexão por requisição (CONN_MAX_AGE=0) '
+            'e reaproveitando conexões persistentes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requisições por página em cada modo')
+        parser.add_argument('--max-age', type=int, default=60, help='CONN_MAX_AGE do modo persistente')
+
+    def handle(self, *args, **options):
+        if not isinstance(connections[DEFAULT_DB_ALIAS], ConnectionMetricsMixin):
+            raise CommandError('O banco default não usa um backend de apps.core.backends: sem métricas de conexão')
+        slug = Product.objects.active().values_list('slug', flat=True).first()
+        if slug is None:
+            raise CommandError('Nenhum produto ativo: importe o catálogo antes do benchmark')
+        urls = [reverse('products:list'), reverse('products:detail', args=[slug])]
+
+        original = {conn.alias: conn.settings_dict['CONN_MAX_AGE'] for conn in connections.all()}
+        try:
+            for label, max_age in (('conexão nova', 0), ('persistente', options['max_age'])):
+                self.run(label, max_age, urls, options['requests'])
+        finally:
+            for conn in connections.all():
+                conn.close()
+                conn.settings_dict['CONN_MAX_AGE'] = original[conn.alias]
+
+    def run(self, label, max_age, urls, requests):
+        for conn in connections.all():
+            conn.close()
+            conn.settings_dict['CONN_MAX_AGE'] = max_age
+        client = Client()
+        for url in urls:
+            client.get(url)  # carrega índices e templates fora da medição
+        reset_connection_stats()
+
+        timings = []
+        for _ in range(requests):
+            for url in urls:
+                # O cliente de testes não dispara o ciclo de conexões do handler: refeito aqui
+                close_old_connections()
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+                close_old_connections()
+                if response.status_code != 200:
+                    raise CommandError(f'{url} respondeu {response.status_code}')
+
+        timings.sort()
+        self.stdout.write(
+            f'{label:<14} p50 {statistics.median(timings):6.2f}ms   '
+            f'p95 {timings[int(len(timings) * 0.95) - 1]:6.2f}ms'
+        )
+        for alias, stats in connection_stats().items():
+            opened = int(stats.get('opened', 0))
+            average = stats.get('connect_seconds', 0) / opened * 1000 if opened else 0
+            self.stdout.write(
+                f'    {alias}: {opened} abertas ({average:.2f}ms em média, '
+                f'máx {stats.get("connect_seconds_max", 0) * 1000:.2f}ms), '
+                f'{int(stats.get("reused", 0))} reaproveitadas, '
+                f'{int(sum(v for k, v in stats.items() if k.startswith("closed_")))} fechadas'
+            )
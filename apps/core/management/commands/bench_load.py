@@ -0,0 +1,486 @@
+import http.cookiejar
+import json
+import random
+import re
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from apps.accounts.factories import BENCH_USER_PREFIX, seed_users
+from apps.accounts.models import Address, User
+from apps.cart.factories import seed_carts
+from apps.cart.models import Cart, CartItem
+from apps.core.benchmark import SERVERS, percentile, start_server
+from apps.orders.factories import seed_orders
+from apps.orders.models import Order
+from apps.products.cache import bump_version
+from apps.products.factories import PRODUCT_WORDS, seed_catalog, seed_images
+from apps.products.models import Brand, Category, Product, ProductImage
+from apps.products.search import build_search_index
+
+# (nome da URL, método, peso no sorteio, visitante: 'any', 'user' ou 'anonymous')
+ROUTES = [
+    ('core:home', 'GET', 10, 'any'),
+    ('products:list', 'GET', 15, 'any'),
+    ('products:category', 'GET', 10, 'any'),
+    ('products:brand', 'GET', 5, 'any'),
+    ('products:search', 'GET', 8, 'any'),
+    ('products:detail', 'GET', 20, 'any'),
+    ('cart:view', 'GET', 6, 'any'),
+    ('cart:add', 'POST', 5, 'any'),
+    ('cart:update', 'POST', 2, 'any'),
+    ('cart:remove', 'POST', 2, 'any'),
+    ('cart:clear', 'POST', 1, 'any'),
+    ('orders:list', 'GET', 2, 'user'),
+    ('orders:detail', 'GET', 2, 'user'),
+    ('orders:status', 'GET', 1, 'user'),
+    ('orders:checkout', 'GET', 1, 'user'),
+    ('accounts:profile', 'GET', 2, 'user'),
+    ('accounts:addresses', 'GET', 1, 'user'),
+    ('accounts:order_history', 'GET', 1, 'user'),
+    ('accounts:login', 'GET', 2, 'anonymous'),
+    ('accounts:register', 'GET', 1, 'anonymous'),
+    ('accounts:logout', 'GET', 1, 'anonymous'),
+]
+
+# Rotas de treinamais/urls.py que ficam fora da carga, por nome ou namespace
+SKIPPED_ROUTES = {
+    'admin': 'painel administrativo',
+    'core:metrics': 'endpoint interno, usado para contar as consultas',
+}
+
+BENCH_PASSWORD = 'bench'
+
+OK_STATUSES = {200, 301, 302, 303, 304}
+
+METRIC_LINE_RE = re.compile(r'^(\w+)\{(.*)\} (\S+)$')
+METRIC_LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+class Command(BaseCommand):
+    help = ('Semeia um catálogo sintético na escala pedida (produtos, imagens, usuários com endereços, '
+            'carrinhos e pedidos), exercita todas as rotas com clientes simultâneos e grava vazão, '
+            'latências p50/p95/p99 e consultas por rota em JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10_000,
+                            help='Quantidade mínima de produtos (ex.: 10000, 100000, 1000000)')
+        parser.add_argument('--users', type=int, default=1_000, help='Quantidade mínima de usuários sintéticos')
+        parser.add_argument('--addresses', type=int, default=2, help='Endereços por usuário novo')
+        parser.add_argument('--images-per-product', type=int, default=1, help='Imagens dos produtos sem imagem')
+        parser.add_argument('--cart-items', type=int, default=3, help='Itens no carrinho de cada usuário')
+        parser.add_argument('--orders-per-user', type=int, default=2, help='Pedidos de cada usuário')
+        parser.add_argument('--no-seed', action='store_true', help='Usa os dados já existentes no banco')
+        parser.add_argument('--seed', type=int, default=0, help='Semente dos dados e da sequência de requisições')
+
+        parser.add_argument('--url', help='Servidor já em execução, sobre o mesmo banco (senão sobe um gunicorn)')
+        parser.add_argument('--server', choices=sorted(SERVERS), default='wsgi', help='Deploy iniciado')
+        parser.add_argument('--workers', type=int, default=2, help='Processos do servidor iniciado')
+        parser.add_argument('--debug', action='store_true',
+                            help='Servidor iniciado com DEBUG=True (padrão: modo de produção)')
+        parser.add_argument('--clients', type=int, default=8, help='Clientes simultâneos')
+        parser.add_argument('--anonymous-share', type=float, default=0.5, help='Fração de clientes sem login')
+        parser.add_argument('--duration', type=float, default=30.0, help='Segundos de carga medida')
+        parser.add_argument('--warmup-rounds', type=int, default=2,
+                            help='Passadas não medidas por todas as rotas de cada cliente')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Tempo máximo de uma requisição')
+
+        parser.add_argument('--output', default='bench-load.json', help='Arquivo JSON com os resultados')
+        parser.add_argument('--baseline', help='Resultado anterior: falha se alguma rota piorar além dos limites')
+        parser.add_argument('--max-regression', type=float, default=0.25,
+                            help='Piora máxima do p95 de uma rota em relação ao baseline (fração)')
+        parser.add_argument('--max-query-increase', type=float, default=0.5,
+                            help='Aumento máximo de consultas por requisição de uma rota')
+
+    def handle(self, *args, **options):
+        if not options['no_seed']:
+            self.seed(options)
+        dataset = Dataset.load(options['clients'])
+        uncovered = self.uncovered_routes()
+        if uncovered:
+            self.stderr.write(f'Rotas sem cenário no benchmark: {", ".join(uncovered)}')
+
+        server = None
+        url = options['url']
+        flush_interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0)
+        if not url:
+            flush_interval = 0.5
+            server, url = start_server(options['server'], options['workers'], {
+                'METRICS_DIR': tempfile.mkdtemp(prefix='bench-load-metrics-'),
+                'METRICS_FLUSH_INTERVAL': str(flush_interval),
+                'DEBUG': str(options['debug']),
+            })
+        try:
+            clients = self.clients(url, dataset, options)
+            self.stdout.write(f'{len(clients)} clientes, {options["duration"]:.0f}s de carga em {url}')
+            run_clients(clients, lambda client: client.warm_up(options['warmup_rounds']))
+            # Espera as threads dos workers gravarem as métricas antes de cada leitura
+            time.sleep(flush_interval * 2 + 0.5)
+            before = scrape(url, options['timeout'])
+            started = time.monotonic()
+            deadline = started + options['duration']
+            run_clients(clients, lambda client: client.run(deadline))
+            elapsed = time.monotonic() - started
+            time.sleep(flush_interval * 2 + 0.5)
+            after = scrape(url, options['timeout'])
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(10)
+
+        if before is None or after is None:
+            self.stderr.write(f'{url}/metrics inacessível: resultados sem contagem de consultas')
+        result = self.build_result(clients, elapsed, view_stats(before, after), uncovered, options)
+        regressions = self.compare(result, options) if options['baseline'] else []
+        result['regressions'] = regressions
+        with open(options['output'], 'w') as fp:
+            json.dump(result, fp, indent=2, ensure_ascii=False)
+
+        self.report(result)
+        self.stdout.write(self.style.SUCCESS(f'Resultados gravados em {options["output"]}'))
+        if regressions:
+            raise CommandError('Regressões em relação ao baseline:\n' + '\n'.join(regressions))
+
+    def seed(self, options):
+        missing = options['products'] - Product.objects.count()
+        if missing > 0:
+            self.stdout.write(f'Semeando {missing} produtos...')
+            seed_catalog(missing, seed=options['seed'], stdout=self.stdout)
+        if options['images_per_product']:
+            seed_images(options['images_per_product'], stdout=self.stdout)
+        seed_users(options['users'], options['addresses'], BENCH_PASSWORD, seed=options['seed'], stdout=self.stdout)
+        user_ids = list(User.objects.filter(username__startswith=BENCH_USER_PREFIX).values_list('pk', flat=True))
+        seed_carts(user_ids, options['cart_items'], seed=options['seed'], stdout=self.stdout)
+        seed_orders(user_ids, options['orders_per_user'], seed=options['seed'], stdout=self.stdout)
+
+        # As gravações em lote não disparam sinais: avisa os índices do catálogo
+        for namespace in ('catalog', 'search', 'facets', 'categories'):
+            bump_version(namespace)
+        index = build_search_index()
+        index.save(settings.SEARCH_INDEX_PATH)
+        self.stdout.write(f'Índice de busca com {len(index)} produtos gravado em {settings.SEARCH_INDEX_PATH}')
+
+    def uncovered_routes(self):
+        """Rotas nomeadas de treinamais/urls.py sem cenário em ROUTES nem motivo em SKIPPED_ROUTES"""
+        covered = {name for name, *_ in ROUTES}
+        return sorted(
+            name for name in url_names(get_resolver())
+            if name not in covered and name not in SKIPPED_ROUTES and name.split(':')[0] not in SKIPPED_ROUTES
+        )
+
+    def clients(self, url, dataset, options):
+        users = iter(dataset.users)
+        clients = []
+        for index in range(options['clients']):
+            rng = random.Random(options['seed'] * 1000 + index)
+            user = None
+            if index >= round(options['clients'] * options['anonymous_share']):
+                user = next(users, None)
+                if user is None:
+                    raise CommandError('Usuários sintéticos insuficientes: aumente --users ou --anonymous-share')
+            clients.append(VirtualClient(url, rng, dataset, user, options['timeout']))
+        return clients
+
+    def build_result(self, clients, elapsed, stats, uncovered, options):
+        latencies, errors = defaultdict(list), defaultdict(int)
+        for client in clients:
+            for name, samples in client.latencies.items():
+                latencies[name] += samples
+            for name, count in client.errors.items():
+                errors[name] += count
+
+        routes = {}
+        for name, method, *_ in ROUTES:
+            samples = sorted(latencies.get(name, []))
+            if not samples and not errors.get(name):
+                continue
+            view = stats.get(name) if stats is not None else None
+            routes[name] = {
+                'method': method,
+                'requests': len(samples),
+                'errors': errors.get(name, 0),
+                **summarize(samples, elapsed),
+                'queries_per_request': view and round(view['queries'] / view['requests'], 2),
+                'db_ms_per_request': view and round(view['db_seconds'] * 1000 / view['requests'], 2),
+            }
+        samples = sorted(sample for route in latencies.values() for sample in route)
+        return {
+            'created_at': timezone.now().isoformat(),
+            'git_commit': git_commit(),
+            'config': {
+                key: options[key]
+                for key in ('url', 'server', 'workers', 'debug', 'clients', 'anonymous_share', 'duration',
+                            'warmup_rounds', 'seed')
+            },
+            'dataset': {
+                'products': Product.objects.count(),
+                'categories': Category.objects.count(),
+                'brands': Brand.objects.count(),
+                'product_images': ProductImage.objects.count(),
+                'users': User.objects.count(),
+                'addresses': Address.objects.count(),
+                'carts': Cart.objects.count(),
+                'cart_items': CartItem.objects.count(),
+                'orders': Order.objects.count(),
+            },
+            'totals': {
+                'requests': len(samples),
+                'errors': sum(errors.values()),
+                **summarize(samples, elapsed),
+            },
+            'routes': routes,
+            'skipped_routes': SKIPPED_ROUTES,
+            'uncovered_routes': uncovered,
+        }
+
+    def compare(self, result, options):
+        with open(options['baseline']) as fp:
+            baseline = json.load(fp)
+        regressions = []
+        for name, route in result['routes'].items():
+            previous = baseline.get('routes', {}).get(name)
+            if not previous:
+                continue
+            if previous['p95_ms'] and route['p95_ms'] > previous['p95_ms'] * (1 + options['max_regression']):
+                regressions.append(f'{name}: p95 {previous["p95_ms"]:.1f}ms -> {route["p95_ms"]:.1f}ms')
+            queries, previous_queries = route['queries_per_request'], previous.get('queries_per_request')
+            if (queries is not None and previous_queries is not None
+                    and queries > previous_queries + options['max_query_increase']):
+                regressions.append(f'{name}: {previous_queries} -> {queries} consultas por requisição')
+        return regressions
+
+    def report(self, result):
+        self.stdout.write(f'{"rota":<24} {"req":>6} {"req/s":>7} {"p50":>8} {"p95":>8} {"p99":>8} '
+                          f'{"consultas":>9} {"erros":>6}')
+        rows = [*result['routes'].items(), ('total', result['totals'])]
+        for name, route in rows:
+            queries = route.get('queries_per_request')
+            self.stdout.write(
+                f'{name:<24} {route["requests"]:6d} {route["rps"]:7.1f} {route["p50_ms"]:7.1f}ms '
+                f'{route["p95_ms"]:7.1f}ms {route["p99_ms"]:7.1f}ms '
+                f'{"-" if queries is None else f"{queries:.1f}":>9} {route["errors"]:6d}'
+            )
+
+
+class Dataset:
+    """Amostra dos dados semeados de onde os clientes sorteiam os argumentos das rotas"""
+
+    def __init__(self, categories, brands, products, users):
+        self.categories = categories
+        self.brands = brands
+        self.products = products
+        self.users = users
+
+    @classmethod
+    def load(cls, clients, sample=2000):
+        products = list(Product.objects.active().order_by('-created_at', '-id').values_list('pk', 'slug')[:sample])
+        if not products:
+            raise CommandError('Nenhum produto ativo: rode sem --no-seed ou importe o catálogo')
+        users = list(User.objects.filter(username__startswith=BENCH_USER_PREFIX)
+                     .order_by('pk').values_list('pk', 'email')[:clients])
+        orders = defaultdict(list)
+        for user_id, order_id in Order.objects.filter(user_id__in=[pk for pk, _ in users]).values_list('user_id', 'pk'):
+            orders[user_id].append(str(order_id))
+        return cls(
+            categories=list(Category.objects.filter(is_active=True).values_list('slug', flat=True)),
+            brands=list(Brand.objects.filter(is_active=True).values_list('slug', flat=True)),
+            products=[(str(pk), slug) for pk, slug in products],
+            users=[{'email': email, 'orders': orders[pk]} for pk, email in users],
+        )
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Mede cada requisição isoladamente: redirecionamentos voltam como resposta"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class VirtualClient:
+    """Um visitante com seus próprios cookies (sessão, carrinho, CSRF) e sua sequência de rotas"""
+
+    def __init__(self, base_url, rng, dataset, user, timeout):
+        self.base_url = base_url
+        self.rng = rng
+        self.dataset = dataset
+        self.user = user
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), NoRedirect)
+        self.cart = []
+        self.routes = [route for route in ROUTES if route[3] in ('any', 'user' if user else 'anonymous')]
+        if user and not user['orders']:
+            self.routes = [route for route in self.routes if route[0] not in ('orders:detail', 'orders:status')]
+        self.weights = [route[2] for route in self.routes]
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def request(self, method, path, data=None):
+        """Envia a requisição e lê a resposta inteira; retorna o status"""
+        body = urllib.parse.urlencode(data or {}).encode() if method == 'POST' else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        if method == 'POST':
+            request.add_header('Content-Type', 'application/x-www-form-urlencoded')
+            request.add_header('X-CSRFToken', self.csrf_token())
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code
+
+    def warm_up(self, rounds):
+        """Obtém o token CSRF, faz login e passa pelas rotas para carregar índices e caches dos workers"""
+        self.request('GET', reverse('accounts:login'))
+        if self.user:
+            status = self.request('POST', reverse('accounts:login'),
+                                  {'username': self.user['email'], 'password': BENCH_PASSWORD})
+            if status != 302:
+                raise CommandError(f'Login de {self.user["email"]} falhou ({status})')
+        for _ in range(rounds):
+            for name, method, *_ in self.routes:
+                self.request(method, *self.target(name))
+
+    def run(self, deadline):
+        while time.monotonic() < deadline:
+            name, method, *_ = self.rng.choices(self.routes, self.weights)[0]
+            path, data = self.target(name)
+            started = time.perf_counter()
+            try:
+                status = self.request(method, path, data)
+            except OSError:
+                status = None
+            if status in OK_STATUSES:
+                self.latencies[name].append((time.perf_counter() - started) * 1000)
+            else:
+                self.errors[name] += 1
+
+    def target(self, name):
+        """Sorteia os argumentos da rota; retorna (caminho, dados do POST)"""
+        rng, dataset = self.rng, self.dataset
+        if name == 'products:category':
+            return reverse(name, args=[rng.choice(dataset.categories)]), None
+        if name == 'products:brand':
+            return reverse(name, args=[rng.choice(dataset.brands)]), None
+        if name == 'products:detail':
+            return reverse(name, args=[rng.choice(dataset.products)[1]]), None
+        if name == 'products:search':
+            return f'{reverse(name)}?q={urllib.parse.quote(rng.choice(PRODUCT_WORDS))}', None
+        if name == 'cart:add':
+            product_id = rng.choice(dataset.products)[0]
+            self.cart.append(product_id)
+            return reverse(name, args=[product_id]), {'quantity': 1}
+        if name in ('cart:update', 'cart:remove'):
+            product_id = rng.choice(self.cart) if self.cart else rng.choice(dataset.products)[0]
+            if name == 'cart:remove' and product_id in self.cart:
+                self.cart.remove(product_id)
+            return reverse(name, args=[product_id]), {'quantity': 2}
+        if name == 'cart:clear':
+            self.cart.clear()
+        if name in ('orders:detail', 'orders:status'):
+            return reverse(name, args=[rng.choice(self.user['orders'])]), None
+        return reverse(name), None
+
+
+def run_clients(clients, target):
+    errors = []
+
+    def run(client):
+        try:
+            target(client)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def url_names(resolver, namespace=None):
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            inner = pattern.namespace or namespace
+            if namespace and pattern.namespace:
+                inner = f'{namespace}:{pattern.namespace}'
+            yield from url_names(pattern, inner)
+        elif pattern.name:
+            yield f'{namespace}:{pattern.name}' if namespace else pattern.name
+
+
+def scrape(url, timeout):
+    """Lê /metrics do servidor; retorna {(métrica, view): valor} ou None se inacessível"""
+    try:
+        with urllib.request.urlopen(f'{url}/metrics', timeout=timeout) as response:
+            text = response.read().decode()
+    except (OSError, urllib.error.HTTPError):
+        return None
+    values = {}
+    for line in text.splitlines():
+        match = METRIC_LINE_RE.match(line)
+        if not match:
+            continue
+        labels = dict(METRIC_LABEL_RE.findall(match.group(2)))
+        if 'view' in labels and 'le' not in labels:
+            key = match.group(1), labels['view']
+            values[key] = values.get(key, 0) + float(match.group(3))
+    return values
+
+
+def view_stats(before, after):
+    """Requisições, consultas e tempo no banco de cada view durante a carga medida"""
+    if before is None or after is None:
+        return None
+    stats = {}
+    for (metric, view), value in after.items():
+        if metric != 'django_http_request_db_seconds_count':
+            continue
+        requests = value - before.get((metric, view), 0)
+        if requests <= 0:
+            continue
+
+        def delta(name):
+            return after.get((name, view), 0) - before.get((name, view), 0)
+
+        stats[view] = {
+            'requests': requests,
+            'queries': delta('django_http_request_queries_total'),
+            'db_seconds': delta('django_http_request_db_seconds_sum'),
+        }
+    return stats
+
+
+def summarize(samples, elapsed):
+    return {
+        'rps': round(len(samples) / elapsed, 2) if elapsed else 0,
+        'mean_ms': round(statistics.fmean(samples), 2) if samples else 0,
+        'p50_ms': round(statistics.median(samples), 2) if samples else 0,
+        'p95_ms': round(percentile(samples, 0.95), 2),
+        'p99_ms': round(percentile(samples, 0.99), 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,70 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.template import engines
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.products.models import Brand, Category, Product
+
+
+class Command(BaseCommand):
+    help = 'Mede a renderização de cada tipo de página com templates frios e compilados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Requisições por página')
+
+    def handle(self, *args, **options):
+        cached = any(hasattr(loader, 'reset') for loader in engines['django'].engine.template_loaders)
+        if not cached:
+            self.stdout.write(self.style.WARNING(
+                'Loader sem cache (DEBUG ligado): as colunas fria e compilada devem ficar iguais'
+            ))
+        client = Client()
+        for label, url in self.page_urls():
+            cold = self.measure(client, url, options['requests'], reset_templates=True)
+            warm = self.measure(client, url, options['requests'], reset_templates=False)
+            self.stdout.write(
+                f'{label:<20} frio p50 {cold[0]:6.2f}ms   compilado p50 {warm[0]:6.2f}ms '
+                f'p95 {warm[1]:6.2f}ms   {warm[2]:.0f} consultas'
+            )
+
+    def page_urls(self):
+        urls = [('home', reverse('core:home')), ('produtos', reverse('products:list'))]
+        category = Category.objects.filter(is_active=True).values_list('slug', flat=True).first()
+        if category:
+            urls.append(('categoria', reverse('products:category', args=[category])))
+        brand = Brand.objects.values_list('slug', flat=True).first()
+        if brand:
+            urls.append(('marca', reverse('products:brand', args=[brand])))
+        product = Product.objects.active().values_list('slug', flat=True).first()
+        if product:
+            urls.append(('produto', reverse('products:detail', args=[product])))
+            urls.append(('busca', reverse('products:search') + '?q=' + product.split('-')[0]))
+        urls += [('carrinho', reverse('cart:view')), ('login', reverse('accounts:login'))]
+        return urls
+
+    def measure(self, client, url, requests, reset_templates):
+        client.get(url)
+        timings = []
+        queries = 0
+        for _ in range(requests):
+            if reset_templates:
+                self.reset_template_cache()
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'{url} respondeu {response.status_code}')
+            queries += len(ctx)
+        timings.sort()
+        return statistics.median(timings), timings[int(len(timings) * 0.95) - 1], queries / requests
+
+    def reset_template_cache(self):
+        for loader in engines['django'].engine.template_loaders:
+            if hasattr(loader, 'reset'):
+                loader.reset()
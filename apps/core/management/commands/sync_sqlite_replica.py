@@ -0,0 +1,35 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ('Copia o banco SQLite principal para as réplicas SQLite locais, simulando a replicação '
+            '(entre duas execuções a réplica fica defasada, como uma réplica atrasada)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', action='append', dest='aliases',
+                            help='Réplica a atualizar (padrão: todas em DATABASE_REPLICAS)')
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or settings.DATABASE_REPLICAS
+        if not aliases:
+            raise CommandError('Nenhuma réplica configurada (defina DATABASE_REPLICA_PATH)')
+
+        source = self.sqlite_path(DEFAULT_DB_ALIAS)
+        for alias in aliases:
+            target = self.sqlite_path(alias)
+            connections[alias].close()
+            with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+                src.backup(dst)
+            self.stdout.write(self.style.SUCCESS(f'{alias}: copiado de {source}'))
+
+    def sqlite_path(self, alias):
+        if alias not in settings.DATABASES:
+            raise CommandError(f'Banco {alias} não configurado')
+        config = settings.DATABASES[alias]
+        if config['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError(f'{alias} não é SQLite: use a replicação do próprio banco')
+        return str(config['NAME'])
@@ -0,0 +1,295 @@
+"""Métricas da aplicação no formato de texto do Prometheus
+
+O middleware registra a latência de toda requisição por view (nome da URL),
+método e status, o tempo gasto no banco e o número de consultas. O backend de
+cache conta acertos e faltas por prefixo de chave e o backend de templates
+mede a renderização de cada template de página. Os números ficam na memória
+do processo, protegidos por um lock, sem custo de E/S por requisição.
+
+Com vários workers do gunicorn cada processo grava um retrato dos seus números
+em METRICS_DIR/<pid>.json: uma thread do processo grava a cada
+METRICS_FLUSH_INTERVAL segundos, se algo mudou, e de novo ao sair. A view
+/metrics soma os arquivos de todos os processos, inclusive os de workers já
+encerrados, para que os contadores nunca voltem atrás. O diretório deve
+começar vazio a cada deploy (tmpfs no docker-compose.prod.yml).
+"""
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from .connections import connection_stats
+from .routers import query_counts
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_registry = {}
+
+_counters = defaultdict(float)
+_histograms = {}
+_lock = threading.Lock()
+_pid = os.getpid()
+_dirty = False
+_flusher = None
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry[name] = self
+
+    def _key(self, labels):
+        return self.name, tuple(str(labels[label]) for label in self.labelnames)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            _check_fork()
+            _counters[key] += amount
+            _mark_dirty()
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            _check_fork()
+            data = _histograms.get(key)
+            if data is None:
+                data = _histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[0][i] += 1
+                    break
+            data[1] += value
+            data[2] += 1
+            _mark_dirty()
+
+
+def _mark_dirty():
+    global _dirty
+    _dirty = True
+
+
+def _latency_buckets():
+    return getattr(settings, 'METRICS_LATENCY_BUCKETS', DEFAULT_BUCKETS)
+
+
+REQUEST_SECONDS = Histogram(
+    'django_http_request_duration_seconds', 'Latência das requisições por view, método e status',
+    ('view', 'method', 'status'), _latency_buckets(),
+)
+REQUEST_DB_SECONDS = Histogram(
+    'django_http_request_db_seconds', 'Tempo no banco por requisição', ('view',), _latency_buckets(),
+)
+REQUEST_QUERIES = Counter('django_http_request_queries_total', 'Consultas feitas pelas requisições', ('view',))
+CACHE_REQUESTS = Counter(
+    'django_cache_requests_total', 'Leituras do cache por prefixo de chave e resultado (hit/miss)',
+    ('prefix', 'result'),
+)
+TEMPLATE_SECONDS = Histogram(
+    'django_template_render_seconds', 'Renderização dos templates de página (sem contar os aninhados)',
+    ('template',), _latency_buckets(),
+)
+
+# Números já mantidos por processo em outros módulos, copiados para o retrato a cada gravação
+DB_QUERIES = Counter('django_db_queries_total', 'Consultas por banco', ('alias',))
+DB_CONNECTIONS_OPENED = Counter('django_db_connections_opened_total', 'Conexões abertas', ('alias',))
+DB_CONNECTIONS_REUSED = Counter(
+    'django_db_connections_reused_total', 'Ciclos que reaproveitaram a conexão anterior', ('alias',),
+)
+DB_CONNECTIONS_CLOSED = Counter('django_db_connections_closed_total', 'Conexões fechadas', ('alias', 'reason'))
+DB_CONNECT_SECONDS = Counter('django_db_connect_seconds_total', 'Tempo gasto abrindo conexões', ('alias',))
+
+
+def _check_fork():
+    """Descarta os números herdados do processo pai (gunicorn --preload); chamado com o lock"""
+    global _pid, _dirty, _flusher
+    if os.getpid() != _pid:
+        _pid = os.getpid()
+        _dirty = False
+        _flusher = None
+        _counters.clear()
+        _histograms.clear()
+
+
+def _collected():
+    """Contadores cumulativos do processo mantidos em routers e connections"""
+    counters = {}
+    for alias, total in query_counts().items():
+        counters[DB_QUERIES._key({'alias': alias})] = total
+    for alias, stats in connection_stats().items():
+        for key, value in stats.items():
+            if key == 'opened':
+                counters[DB_CONNECTIONS_OPENED._key({'alias': alias})] = value
+            elif key == 'reused':
+                counters[DB_CONNECTIONS_REUSED._key({'alias': alias})] = value
+            elif key == 'connect_seconds':
+                counters[DB_CONNECT_SECONDS._key({'alias': alias})] = value
+            elif key.startswith('closed_'):
+                counters[DB_CONNECTIONS_CLOSED._key({'alias': alias, 'reason': key[len('closed_'):]})] = value
+    return counters
+
+
+def snapshot():
+    """Retrato dos números deste processo, no formato gravado em METRICS_DIR"""
+    global _dirty
+    collected = _collected()
+    with _lock:
+        _check_fork()
+        _dirty = False
+        counters = {**_counters, **collected}
+        histograms = {key: [list(data[0]), data[1], data[2]] for key, data in _histograms.items()}
+    return {
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, list(labels), *data] for (name, labels), data in histograms.items()],
+    }
+
+
+def _metrics_dir():
+    return getattr(settings, 'METRICS_DIR', '') or None
+
+
+def flush():
+    """Grava o retrato do processo em METRICS_DIR/<pid>.json"""
+    directory = _metrics_dir()
+    if directory is None:
+        return
+    data = snapshot()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    temporary = f'{path}.{threading.get_ident()}.tmp'
+    with open(temporary, 'w') as fp:
+        json.dump(data, fp)
+    os.replace(temporary, path)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0))
+        if _dirty:
+            flush()
+
+
+def start_flusher():
+    """Inicia, uma vez por processo, a thread que grava o retrato a cada METRICS_FLUSH_INTERVAL segundos
+
+    Chamada pelo middleware: só processos que atendem requisições gravam
+    arquivos, os comandos de manage.py ficam de fora.
+    """
+    global _flusher
+    if (_flusher is not None and _pid == os.getpid()) or _metrics_dir() is None:
+        return
+    with _lock:
+        _check_fork()
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True)
+            _flusher.start()
+
+
+@atexit.register
+def _flush_at_exit():
+    if _flusher is not None and _dirty:
+        flush()
+
+
+def _snapshots():
+    """Retratos de todos os processos: os arquivos de METRICS_DIR, ou só este processo"""
+    directory = _metrics_dir()
+    if directory is None:
+        return [snapshot()]
+    flush()
+    snapshots = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as fp:
+                snapshots.append(json.load(fp))
+        except (OSError, ValueError):
+            continue  # processo gravando ou arquivo de outra versão
+    return snapshots
+
+
+def collect():
+    """Soma os retratos dos processos: ({(nome, labels): valor}, {(nome, labels): [buckets, soma, total]})"""
+    counters = defaultdict(float)
+    histograms = {}
+    for data in _snapshots():
+        for name, labels, value in data.get('counters', []):
+            if isinstance(_registry.get(name), Counter):
+                counters[name, tuple(labels)] += value
+        for name, labels, buckets, total, count in data.get('histograms', []):
+            metric = _registry.get(name)
+            if not isinstance(metric, Histogram) or len(buckets) != len(metric.buckets):
+                continue  # buckets mudaram entre versões
+            key = name, tuple(labels)
+            merged = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+            merged[1] += total
+            merged[2] += count
+    return counters, histograms
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if math.isinf(value):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render():
+    """Métricas somadas de todos os processos no formato de texto do Prometheus"""
+    counters, histograms = collect()
+    lines = []
+    for name, metric in sorted(_registry.items()):
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        if isinstance(metric, Counter):
+            for (sample, labels), value in sorted(counters.items()):
+                if sample == name:
+                    lines.append(f'{name}{_labels(metric.labelnames, labels)} {_number(value)}')
+            continue
+        for (sample, labels), (buckets, total, count) in sorted(histograms.items()):
+            if sample != name:
+                continue
+            cumulative = 0
+            for bound, observed in zip(metric.buckets, buckets):
+                cumulative += observed
+                le = _labels(metric.labelnames, labels, [('le', _number(bound))])
+                lines.append(f'{name}_bucket{le} {cumulative}')
+            lines.append(f'{name}_bucket{_labels(metric.labelnames, labels, [("le", "+Inf")])} {count}')
+            lines.append(f'{name}_sum{_labels(metric.labelnames, labels)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(metric.labelnames, labels)} {count}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,118 @@
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from . import metrics
+from .querybudget import QueryBudgetExceeded, get_budget, record_endpoint, record_queries
+from .routers import count_queries, pin_cookie_active, pin_scope, set_pin_cookie
+
+logger = logging.getLogger('apps.core.querybudget')
+
+
+def _endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unresolved'
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Registra latência, tempo no banco e consultas de toda requisição por view (apps.core.metrics)"""
+
+    def finish(request, response, started, log):
+        view = _endpoint_name(request)
+        metrics.REQUEST_SECONDS.observe(
+            time.perf_counter() - started, view=view, method=request.method, status=response.status_code,
+        )
+        metrics.REQUEST_DB_SECONDS.observe(log.db_seconds, view=view)
+        metrics.REQUEST_QUERIES.inc(log.count, view=view)
+        metrics.start_flusher()
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            started = time.perf_counter()
+            with record_queries(group_shapes=False) as log:
+                response = await get_response(request)
+            return finish(request, response, started, log)
+    else:
+        def middleware(request):
+            started = time.perf_counter()
+            with record_queries(group_shapes=False) as log:
+                response = get_response(request)
+            return finish(request, response, started, log)
+    return middleware
+
+
+@sync_and_async_middleware
+def replica_pinning_middleware(get_response):
+    """Lê do banco principal depois que a sessão escreve, pelo resto da requisição e por REPLICA_PIN_SECONDS
+
+    Em DEBUG a resposta traz as consultas da requisição por banco no cabeçalho X-DB-Queries.
+    """
+
+    def finish(request, response, scope, counter):
+        if scope.written:
+            set_pin_cookie(response, request)
+        if settings.DEBUG:
+            response.headers['X-DB-Queries'] = ', '.join(f'{alias}={n}' for alias, n in sorted(counter.items()))
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            with pin_scope(pin_cookie_active(request)) as scope, count_queries() as counter:
+                response = await get_response(request)
+            return finish(request, response, scope, counter)
+    else:
+        def middleware(request):
+            with pin_scope(pin_cookie_active(request)) as scope, count_queries() as counter:
+                response = get_response(request)
+            return finish(request, response, scope, counter)
+    return middleware
+
+
+@sync_and_async_middleware
+def query_budget_middleware(get_response):
+    """Registra as consultas por endpoint e aponta orçamentos estourados e N+1 suspeitos
+
+    Em DEBUG ou com QUERY_BUDGET_RAISE toda requisição é registrada; em produção
+    só a fração QUERY_BUDGET_SAMPLE_RATE.
+    """
+    raise_on_violation = getattr(settings, 'QUERY_BUDGET_RAISE', False)
+    record_all = settings.DEBUG or raise_on_violation
+    sample_rate = getattr(settings, 'QUERY_BUDGET_SAMPLE_RATE', 0)
+
+    def sampled():
+        return record_all or random.random() < sample_rate
+
+    def finish(request, response, log):
+        url_name = _endpoint_name(request)
+        record_endpoint(url_name, log)
+        logger.info('endpoint=%s status=%s queries=%d db_ms=%.1f',
+                    url_name, response.status_code, log.count, log.db_seconds * 1000)
+        problems = log.violations(get_budget(url_name))
+        if problems:
+            message = f'{request.method} {request.path} ({url_name}): ' + '; '.join(problems)
+            if raise_on_violation:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not sampled():
+                return await get_response(request)
+            with record_queries(capture_stack=record_all) as log:
+                response = await get_response(request)
+            return finish(request, response, log)
+    else:
+        def middleware(request):
+            if not sampled():
+                return get_response(request)
+            with record_queries(capture_stack=record_all) as log:
+                response = get_response(request)
+            return finish(request, response, log)
+    return middleware
@@ -0,0 +1,145 @@
+"""Orçamento de consultas por endpoint e detecção de N+1
+
+Cada endpoint (nome da URL, ex.: ``products:list``) pode declarar em
+QUERY_BUDGETS quantas consultas uma requisição pode fazer. O registro agrupa
+as consultas pelo formato do SQL (literais e listas de IN normalizados): o
+mesmo formato repetido QUERY_N_PLUS_ONE_THRESHOLD vezes ou mais na mesma
+requisição é um N+1 suspeito, como um laço que acessa ``item.product`` sem
+select_related.
+
+O middleware registra toda requisição em DEBUG e uma amostra
+(QUERY_BUDGET_SAMPLE_RATE) em produção, sempre com o número de consultas e o
+tempo no banco. Com QUERY_BUDGET_RAISE ligado (testes) uma violação levanta
+QueryBudgetExceeded; apps.core.testing.query_budget faz o mesmo para um bloco.
+"""
+import os
+import re
+import threading
+import time
+import traceback
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_recorders = ContextVar('query_recorders', default=())
+
+_endpoint_stats = defaultdict(lambda: {'requests': 0, 'queries': 0, 'db_seconds': 0.0})
+_endpoint_stats_lock = threading.Lock()
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?|NULL)\s*,?)+\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+_TRANSACTION_RE = re.compile(r'^(?:BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b', re.IGNORECASE)
+
+_PROJECT_ROOT = str(settings.BASE_DIR)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def normalize_sql(sql):
+    """Reduz o SQL ao seu formato: sem literais e com listas de IN de qualquer tamanho iguais"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def _call_site():
+    """Retorna o ponto do código do projeto que disparou a consulta (arquivo:linha em função)"""
+    for frame in reversed(traceback.extract_stack()):
+        if (frame.filename.startswith(_PROJECT_ROOT) and frame.filename != __file__
+                and os.sep + 'site-packages' + os.sep not in frame.filename):
+            return f'{os.path.relpath(frame.filename, _PROJECT_ROOT)}:{frame.lineno} em {frame.name}'
+    return None
+
+
+class QueryLog:
+    """Consultas registradas em uma requisição ou bloco"""
+
+    def __init__(self, capture_stack=False, group_shapes=True):
+        self.capture_stack = capture_stack
+        self.group_shapes = group_shapes
+        self.count = 0
+        self.db_seconds = 0.0
+        self.shapes = Counter()
+        self.call_sites = {}
+
+    def add(self, sql, seconds):
+        self.count += 1
+        self.db_seconds += seconds
+        if not self.group_shapes:
+            return
+        shape = normalize_sql(sql)
+        self.shapes[shape] += 1
+        if self.capture_stack and shape not in self.call_sites:
+            self.call_sites[shape] = _call_site()
+
+    def suspected_n_plus_one(self, threshold=None):
+        """Retorna [(formato, repetições)] dos formatos repetidos a partir do limite
+
+        Comandos de transação e savepoints se repetem a cada atomic() e não contam.
+        """
+        threshold = threshold or getattr(settings, 'QUERY_N_PLUS_ONE_THRESHOLD', 5)
+        return [
+            (shape, n) for shape, n in self.shapes.most_common()
+            if n >= threshold and not _TRANSACTION_RE.match(shape)
+        ]
+
+    def violations(self, budget=None, threshold=None):
+        """Retorna as mensagens de orçamento estourado e de N+1 suspeito"""
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f'{self.count} consultas, orçamento de {budget}')
+        for shape, n in self.suspected_n_plus_one(threshold):
+            site = self.call_sites.get(shape)
+            problems.append(f'N+1 suspeito: {n}x {shape[:200]}' + (f' ({site})' if site else ''))
+        return problems
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper instalado em toda conexão: entrega a consulta aos registros ativos"""
+    recorders = _recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        for log in recorders:
+            log.add(sql, elapsed)
+
+
+@contextmanager
+def record_queries(capture_stack=False, group_shapes=True):
+    """Registra as consultas feitas dentro do bloco; sem ``group_shapes`` só conta e mede o tempo"""
+    log = QueryLog(capture_stack, group_shapes)
+    token = _recorders.set((*_recorders.get(), log))
+    try:
+        yield log
+    finally:
+        _recorders.reset(token)
+
+
+def get_budget(url_name):
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    return budgets.get(url_name, getattr(settings, 'QUERY_BUDGET_DEFAULT', None))
+
+
+def record_endpoint(url_name, log):
+    with _endpoint_stats_lock:
+        stats = _endpoint_stats[url_name]
+        stats['requests'] += 1
+        stats['queries'] += log.count
+        stats['db_seconds'] += log.db_seconds
+
+
+def endpoint_stats():
+    """Retorna, por endpoint, requisições amostradas, consultas e tempo no banco deste processo"""
+    with _endpoint_stats_lock:
+        return {name: dict(stats) for name, stats in _endpoint_stats.items()}
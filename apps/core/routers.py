@@ -0,0 +1,149 @@
+"""Roteamento entre o banco principal e as réplicas de leitura
+
+Leituras dos modelos do catálogo feitas por requisições vão para uma das
+réplicas em DATABASE_REPLICAS; escritas e todas as outras leituras (carrinho,
+pedidos, contas) vão para o principal. Dentro de uma transação tudo é lido do
+principal, assim como fora de uma requisição (tarefas do Celery, comandos) e
+nos blocos marcados com read_from_primary(): sincronização dos índices e
+importação, que não podem trabalhar sobre uma réplica atrasada.
+
+Read-your-writes: o escopo aberto pelo middleware (ou por uma tarefa do
+Celery) registra se houve escrita. Depois da primeira escrita o resto do
+escopo lê do principal, e o middleware grava um cookie que mantém a sessão no
+principal por REPLICA_PIN_SECONDS, tempo suficiente para a réplica alcançar.
+"""
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_MODELS = {'products.product', 'products.category', 'products.brand', 'products.productimage'}
+
+# Escritas que não afetam o que o visitante lê do catálogo e não fixam o principal
+PIN_EXEMPT_MODELS = {'sessions.session'}
+
+PIN_COOKIE_NAME = 'db_pin'
+
+_scope = ContextVar('db_pin_scope', default=None)
+_primary = ContextVar('db_read_primary', default=False)
+
+_totals = Counter()
+_totals_lock = threading.Lock()
+_counters = ContextVar('db_query_counters', default=())
+
+
+class PinScope:
+    """Estado de read-your-writes de uma requisição ou tarefa"""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.written = False
+
+
+@contextmanager
+def pin_scope(pinned=False):
+    """Abre um escopo de read-your-writes; ``pinned`` já começa lendo do principal"""
+    scope = PinScope(pinned)
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+@contextmanager
+def read_from_primary():
+    """Lê tudo do principal dentro do bloco (também como decorador), sem abrir um novo escopo"""
+    token = _primary.set(True)
+    try:
+        yield
+    finally:
+        _primary.reset(token)
+
+
+def is_pinned():
+    """Indica se as leituras devem ir ao principal: fora de um escopo só as requisições usam réplicas"""
+    scope = _scope.get()
+    return scope is None or scope.pinned or scope.written or _primary.get()
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class ReplicaRouter:
+    """Envia as leituras do catálogo às réplicas, respeitando transações e read-your-writes"""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower not in REPLICA_MODELS:
+            return None
+        replicas = replica_aliases()
+        if not replicas or is_pinned() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in replicas:
+            return instance._state.db
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None and model._meta.label_lower not in PIN_EXEMPT_MODELS:
+            scope.written = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # As réplicas recebem o esquema pela replicação do principal
+        return db not in replica_aliases()
+
+
+def count_query(execute, sql, params, many, context):
+    """execute_wrapper instalado em toda conexão: conta as consultas por alias"""
+    alias = context['connection'].alias
+    with _totals_lock:
+        _totals[alias] += 1
+    for counter in _counters.get():
+        counter[alias] += 1
+    return execute(sql, params, many, context)
+
+
+def query_counts():
+    """Retorna o total de consultas por alias desde o início do processo"""
+    with _totals_lock:
+        return dict(_totals)
+
+
+@contextmanager
+def count_queries():
+    """Conta as consultas feitas dentro do bloco, por alias"""
+    counter = Counter()
+    token = _counters.set((*_counters.get(), counter))
+    try:
+        yield counter
+    finally:
+        _counters.reset(token)
+
+
+def pin_cookie_active(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE_NAME, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def set_pin_cookie(response, request):
+    seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+    response.set_cookie(
+        PIN_COOKIE_NAME, f'{time.time() + seconds:.0f}', max_age=seconds,
+        httponly=True, samesite='Lax', secure=request.is_secure(),
+    )
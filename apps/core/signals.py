@@ -0,0 +1,58 @@
+import logging
+
+from celery.signals import task_postrun, task_prerun, worker_process_shutdown
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .connections import connection_stats
+from .querybudget import record_query
+from .routers import count_query, pin_scope
+
+logger = logging.getLogger(__name__)
+
+_task_scopes = {}
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    """Conta as consultas de toda conexão nova por alias (ver routers.query_counts)"""
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_query)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """Entrega as consultas aos registros de orçamento ativos (ver querybudget.record_queries)"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@task_prerun.connect
+def open_task_pin_scope(task_id=None, **kwargs):
+    """Cada tarefa do Celery lê do principal
+
+    As tarefas costumam ser agendadas no commit da escrita que as motivou e
+    rodariam antes de a réplica alcançar: uma imagem recém-enviada não seria
+    encontrada, por exemplo.
+    """
+    scope = pin_scope(pinned=True)
+    scope.__enter__()
+    _task_scopes[task_id] = scope
+
+
+@task_postrun.connect
+def close_task_pin_scope(task_id=None, **kwargs):
+    scope = _task_scopes.pop(task_id, None)
+    if scope is not None:
+        scope.__exit__(None, None, None)
+
+
+@worker_process_shutdown.connect
+def log_connection_stats(**kwargs):
+    """Registra no log do worker as conexões abertas e reaproveitadas durante a vida do processo
+
+    O reuso entre tarefas vem do fixup Django do Celery, que chama
+    close_if_unusable_or_obsolete antes e depois de cada tarefa.
+    """
+    for alias, stats in connection_stats().items():
+        logger.info('Conexões %s: %s', alias, ', '.join(f'{key}={value:g}' for key, value in sorted(stats.items())))
@@ -0,0 +1,47 @@
+"""Utilitários para os testes do projeto"""
+import threading
+from contextlib import contextmanager
+
+from django.db import connections
+
+from .querybudget import QueryBudgetExceeded, get_budget, record_queries
+
+
+@contextmanager
+def query_budget(url_name=None, budget=None, threshold=None):
+    """Falha se o bloco passar do orçamento de consultas ou repetir um formato de SQL (N+1)
+
+    O orçamento vem de QUERY_BUDGETS pelo nome da URL, ou de ``budget``::
+
+        with query_budget('products:list'):
+            client.get(reverse('products:list'))
+    """
+    if budget is None and url_name is not None:
+        budget = get_budget(url_name)
+    with record_queries(capture_stack=True) as log:
+        yield log
+    problems = log.violations(budget, threshold)
+    if problems:
+        raise QueryBudgetExceeded(f'{url_name or "bloco"}: ' + '; '.join(problems))
+
+
+def run_concurrently(func, threads):
+    """Roda ``func`` em ``threads`` threads liberadas ao mesmo tempo por uma barreira
+
+    Cada thread usa a sua própria conexão com o banco e a fecha ao terminar.
+    Exige um teste com ``django_db(transaction=True)``.
+    """
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        try:
+            barrier.wait()
+            func()
+        finally:
+            connections.close_all()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
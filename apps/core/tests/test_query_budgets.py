@@ -0,0 +1,95 @@
+from decimal import Decimal
+
+import pytest
+from django.conf import settings
+from django.urls import reverse
+
+from apps.core.querybudget import QueryBudgetExceeded
+from apps.core.testing import query_budget
+from apps.orders.factories import make_order
+from apps.products.factories import make_product
+from apps.products.models import Brand, Category, Product, ProductImage
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def catalog():
+    """Catálogo com produtos de duas categorias e marcas, com imagens, alguns em destaque e promoção"""
+    categories = [Category.objects.create(name=f'Categoria {index}', slug=f'categoria-{index}') for index in range(2)]
+    brands = [Brand.objects.create(name=f'Marca {index}', slug=f'marca-{index}') for index in range(2)]
+    products = []
+    for index in range(30):
+        product = make_product(
+            name=f'Halteres {index}', category=categories[index % 2], brand=brands[index % 2],
+            price=Decimal('100.00'), sale_price=Decimal('80.00') if index % 5 == 0 else None,
+            is_featured=index % 7 == 0,
+        )
+        image = f'products/halteres-{index}.jpg'
+        ProductImage.objects.create(product=product, image=image, derivatives={'source': image}, is_main=True)
+        products.append(product)
+    return products
+
+
+@pytest.fixture
+def order(client, catalog, customer):
+    """Três itens no carrinho do cliente e um pedido"""
+    for product in catalog[:3]:
+        client.post(reverse('cart:add', args=[product.pk]))
+    return make_order(customer, product=catalog[0])
+
+
+def page_urls(catalog, order):
+    product = catalog[0]
+    return {
+        'core:home': reverse('core:home'),
+        'products:list': reverse('products:list'),
+        'products:category': reverse('products:category', args=[product.category.slug]),
+        'products:brand': reverse('products:brand', args=[product.brand.slug]),
+        'products:detail': reverse('products:detail', args=[product.slug]),
+        'products:search': reverse('products:search') + '?q=halteres',
+        'cart:view': reverse('cart:view'),
+        'orders:list': reverse('orders:list'),
+        'orders:detail': reverse('orders:detail', args=[order.pk]),
+        'orders:status': reverse('orders:status', args=[order.pk]),
+        'accounts:profile': reverse('accounts:profile'),
+    }
+
+
+@pytest.mark.parametrize('url_name', [
+    'core:home', 'products:list', 'products:category', 'products:brand', 'products:detail', 'products:search',
+    'cart:view', 'orders:list', 'orders:detail', 'orders:status', 'accounts:profile',
+])
+def test_warm_pages_stay_within_budget(client, catalog, order, url_name):
+    """A segunda requisição, com caches, índices e menu aquecidos, cabe no orçamento de QUERY_BUDGETS"""
+    url = page_urls(catalog, order)[url_name]
+    assert client.get(url).status_code == 200
+    with query_budget(url_name):
+        response = client.get(url)
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('url_name', ['cart:add', 'cart:update', 'cart:remove', 'cart:clear'])
+def test_warm_cart_changes_stay_within_budget(client, catalog, order, url_name):
+    args = [] if url_name == 'cart:clear' else [catalog[0].pk]
+    # Aquece o caminho de alteração do carrinho antes da requisição medida
+    client.post(reverse('cart:add', args=[catalog[5].pk]))
+    with query_budget(url_name):
+        response = client.post(reverse(url_name, args=args), {'quantity': 2})
+    assert response.status_code == 302
+
+
+def test_budgets_cover_every_measured_endpoint():
+    assert set(settings.QUERY_BUDGETS) == {
+        'core:home', 'products:list', 'products:category', 'products:brand', 'products:detail', 'products:search',
+        'cart:view', 'cart:add', 'cart:update', 'cart:remove', 'cart:clear', 'orders:list', 'orders:detail',
+        'orders:status', 'accounts:profile',
+    }
+
+
+def test_query_budget_detects_n_plus_one(catalog):
+    with pytest.raises(QueryBudgetExceeded, match='N\\+1'):
+        with query_budget(budget=100):
+            [product.category.name for product in Product.objects.all()]
+    with query_budget(budget=1):
+        [product.category.name for product in Product.objects.select_related('category')]
@@ -0,0 +1,68 @@
+import pytest
+from django.db import DEFAULT_DB_ALIAS
+
+from apps.core.routers import ReplicaRouter, pin_scope, read_from_primary
+from apps.core.signals import close_task_pin_scope, open_task_pin_scope
+from apps.products.facets import build_facet_index
+from apps.products.factories import make_product
+from apps.products.importer import CatalogImporter
+from apps.products.models import Product
+from apps.products.search import build_search_index
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture(autouse=True)
+def replica(settings):
+    # Alias sem conexão configurada: qualquer leitura enviada à réplica falha
+    settings.DATABASE_REPLICAS = ['replica']
+    return 'replica'
+
+
+def read_alias():
+    return ReplicaRouter().db_for_read(Product)
+
+
+def test_requests_read_catalog_from_replica(replica):
+    with pin_scope() as scope:
+        assert read_alias() == replica
+        scope.written = True
+        assert read_alias() == DEFAULT_DB_ALIAS
+
+
+def test_reads_outside_requests_use_primary():
+    assert read_alias() == DEFAULT_DB_ALIAS
+
+
+def test_read_from_primary_keeps_request_scope():
+    with pin_scope() as scope:
+        with read_from_primary():
+            assert read_alias() == DEFAULT_DB_ALIAS
+            make_product()
+        assert scope.written
+
+
+def test_celery_tasks_read_from_primary():
+    open_task_pin_scope(task_id='tarefa')
+    try:
+        assert read_alias() == DEFAULT_DB_ALIAS
+    finally:
+        close_task_pin_scope(task_id='tarefa')
+
+
+def test_index_syncs_read_from_primary_during_requests():
+    product = make_product(name='Anilha Primaria')
+    with pin_scope():
+        assert build_search_index().search('anilha') == ([str(product.pk)], 1)
+        assert len(build_facet_index()) == 1
+
+
+def test_importer_reads_from_primary_during_requests():
+    make_product(name='Existente', sku='SKU-1')
+    rows = [{'sku': 'SKU-1', 'name': 'Existente', 'category': 'Cardio', 'brand': 'Marca', 'price': '10.00'},
+            {'sku': 'SKU-2', 'name': 'Existente', 'category': 'Cardio', 'brand': 'Marca', 'price': '12.00'}]
+    with pin_scope():
+        importer = CatalogImporter()
+        assert importer.run(rows) == 2
+    assert (importer.created, importer.updated) == (1, 1)
+    assert Product.objects.filter(name='Existente').values('slug').distinct().count() == 2
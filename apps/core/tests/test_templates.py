@@ -0,0 +1,70 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.cache import cache
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from apps.accounts.models import User
+from apps.products import cache as catalog_cache
+from apps.products.models import Category
+
+pytestmark = pytest.mark.django_db
+
+HEADER_TEMPLATES = ['partials/_header.html', 'partials/_footer.html']
+
+# Com o cache vazio a árvore de categorias do menu é montada uma vez para cabeçalho e rodapé
+COLD_CATEGORY_QUERIES = 1
+
+
+@pytest.fixture(params=['anonimo', 'cliente'])
+def header_request(request):
+    if request.param == 'anonimo':
+        user = AnonymousUser()
+    else:
+        user = User.objects.create_user(username='cliente', email='cliente@example.com')
+    http_request = RequestFactory().get('/')
+    http_request.user = user
+    http_request.session = SessionBase()
+    return http_request
+
+
+@pytest.fixture(autouse=True)
+def categories(monkeypatch):
+    Category.objects.bulk_create([Category(name=f'Categoria {index}', slug=f'categoria-{index}') for index in range(5)])
+    # Descarta a cópia da árvore guardada no processo: o teste começa com tudo frio
+    monkeypatch.setattr(catalog_cache, '_category_tree', (None, None))
+
+
+def render_header(request):
+    with CaptureQueriesContext(connection) as queries:
+        html = ''.join(render_to_string(name, request=request) for name in HEADER_TEMPLATES)
+    return html, queries
+
+
+def test_header_and_footer_render_without_queries_when_cached(header_request):
+    render_header(header_request)
+    html, queries = render_header(header_request)
+    assert 'Categoria 4' in html
+    assert len(queries) == 0, [query['sql'] for query in queries]
+
+
+def test_categories_are_not_loaded_while_fragments_are_cached(header_request, monkeypatch):
+    render_header(header_request)
+    monkeypatch.setattr(catalog_cache, '_category_tree', (None, None))
+    html, queries = render_header(header_request)
+    assert 'Categoria 4' in html
+    assert len(queries) == 0, [query['sql'] for query in queries]
+
+
+def test_categories_are_loaded_once_on_cold_cache(header_request, monkeypatch):
+    render_header(header_request)
+    cache.clear()
+    monkeypatch.setattr(catalog_cache, '_category_tree', (None, None))
+
+    html, queries = render_header(header_request)
+    assert 'Categoria 4' in html
+    category_queries = [query['sql'] for query in queries if 'products_category' in query['sql']]
+    assert len(category_queries) <= COLD_CATEGORY_QUERIES, category_queries
@@ -0,0 +1,33 @@
+import pytest
+from django.db import transaction
+
+from apps.core.transactions import on_commit_once
+
+
+class Boom(Exception):
+    pass
+
+
+@pytest.mark.django_db(transaction=True)
+def test_callback_runs_once_per_committed_transaction():
+    calls = []
+    with transaction.atomic():
+        for _ in range(3):
+            on_commit_once('key', lambda: calls.append(1))
+        assert calls == []
+    assert calls == [1]
+
+    with transaction.atomic():
+        on_commit_once('key', lambda: calls.append(2))
+    assert calls == [1, 2]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rolled_back_savepoint_releases_the_key():
+    calls = []
+    with transaction.atomic():
+        with pytest.raises(Boom), transaction.atomic():
+            on_commit_once('key', lambda: calls.append('desfeito'))
+            raise Boom
+        on_commit_once('key', lambda: calls.append('confirmado'))
+    assert calls == ['confirmado']
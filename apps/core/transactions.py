@@ -0,0 +1,43 @@
+"""Callbacks de commit agendados uma única vez por transação
+
+Várias alterações na mesma transação (itens de um carrinho, reservas de
+produtos) pedem o mesmo trabalho após o commit. on_commit_once() agenda o
+callback na primeira vez e ignora os pedidos seguintes com a mesma chave.
+
+As chaves pendentes ficam em um registro por conexão que guarda apenas uma
+referência fraca ao callback agendado. O callback remove a sua chave ao rodar;
+num rollback, inclusive de um savepoint, o Django descarta o callback e a chave
+sai do registro junto com ele, então a próxima transação volta a agendar.
+"""
+import threading
+import weakref
+
+from django.db import transaction
+
+# conexão -> {chave: callback agendado}
+_pending = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def on_commit_once(key, func=None, using=None):
+    """Agenda ``func`` para depois do commit, a menos que ``key`` já esteja agendada nesta transação
+
+    Retorna False se a chave já estava agendada. Sem ``func`` só marca a chave,
+    para trabalho feito na hora uma única vez por transação.
+    """
+    connection = transaction.get_connection(using)
+    with _lock:
+        pending = _pending.get(connection)
+        if pending is None:
+            pending = _pending[connection] = weakref.WeakValueDictionary()
+    if pending.get(key) is not None:
+        return False
+
+    def callback():
+        pending.pop(key, None)
+        if func is not None:
+            func()
+
+    pending[key] = callback
+    transaction.on_commit(callback, using=using)
+    return True
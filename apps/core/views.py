@@ -1,6 +1,14 @@
+import ipaddress
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 from django.views.generic import TemplateView
 
+from apps.products.fragments import get_home_block
+
+from . import metrics
+
 
 class HomeView(TemplateView):
     """View para a página inicial"""
@@ -13,4 +21,26 @@ class HomeView(TemplateView):
 
 def home_view(request):
     """View simples para a página inicial"""
-    return render(request, 'home.html')
+    context = {
+        'featured_block': get_home_block(request, 'featured'),
+        'on_sale_block': get_home_block(request, 'on_sale'),
+    }
+    return render(request, 'home.html', context)
+
+
+def _internal_request(request):
+    """Só conexões diretas de METRICS_ALLOWED_NETWORKS; o que passa pelo nginx traz X-Forwarded-For"""
+    if 'HTTP_X_FORWARDED_FOR' in request.META:
+        return False
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network) for network in settings.METRICS_ALLOWED_NETWORKS)
+
+
+def metrics_view(request):
+    """Métricas de todos os workers no formato do Prometheus, só para a rede interna"""
+    if not _internal_request(request):
+        raise Http404
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.template import engines
+from django.template.loader import get_template
+from django.template.utils import get_app_template_dirs
+
+
+def template_names():
+    """Retorna os nomes de todos os templates do projeto (diretórios de templates e apps locais)"""
+    base_dir = Path(settings.BASE_DIR).resolve()
+    directories = [Path(directory) for directory in engines['django'].engine.dirs]
+    directories += [Path(directory) for directory in get_app_template_dirs('templates')
+                    if base_dir in Path(directory).resolve().parents]
+
+    names = set()
+    for directory in directories:
+        for path in directory.rglob('*.html'):
+            names.add(path.relative_to(directory).as_posix())
+    return sorted(names)
+
+
+def precompile_templates():
+    """Compila todos os templates do projeto para o cache do loader e retorna quantos foram carregados
+
+    Chamado no boot de cada worker em produção, para que a primeira requisição
+    de cada página não pague a leitura e o parse dos arquivos.
+    """
+    names = template_names()
+    for name in names:
+        get_template(name)
+    return len(names)
@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+
+from apps.accounts.models import Address
+
+from .models import Order, OrderItem, OrderSummary
+from .tasks import process_order
+
+ORDER_NUMBER_ATTEMPTS = 3
+
+
+class CheckoutError(Exception):
+    pass
+
+
+def format_address(address):
+    """Texto do endereço gravado no pedido"""
+    return f"{address.street}, {address.city}/{address.state} - CEP {address.zip_code}"
+
+
+def place_order(user, cart, idempotency_key, address, coupon=None):
+    """Grava o pedido a partir do carrinho e agenda o processamento
+
+    Só faz o trabalho rápido (validar e gravar); estoque, cupom, pagamento e
+    e-mail rodam nas tarefas de apps.orders.tasks. Um segundo envio com a mesma
+    chave de idempotência retorna o pedido já criado. Um ``address`` ainda não
+    gravado é cadastrado na mesma transação do pedido, reaproveitando um
+    endereço igual do usuário. Retorna (pedido, criado).
+    """
+    existing = Order.objects.filter(user=user, idempotency_key=idempotency_key).first()
+    if existing is not None:
+        return existing, False
+
+    lines = cart.lines()
+    if not lines:
+        raise CheckoutError('Seu carrinho está vazio.')
+
+    subtotal = sum((line['total_price'] for line in lines), Decimal('0.00'))
+    discount = Decimal('0.00')
+    if coupon is not None:
+        valid, message = coupon.is_valid(subtotal)
+        if not valid:
+            raise CheckoutError(message)
+        discount = Decimal(coupon.calculate_discount(subtotal)).quantize(Decimal('0.01'))
+
+    for attempt in range(ORDER_NUMBER_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                if address.pk is None:
+                    _save_address(user, address)
+                order = Order.objects.create(
+                    user=user,
+                    idempotency_key=idempotency_key,
+                    coupon=coupon,
+                    shipping_address=format_address(address),
+                    subtotal=subtotal,
+                    discount=discount,
+                    total=subtotal - discount,
+                    item_count=sum(line['quantity'] for line in lines),
+                )
+                OrderItem.objects.bulk_create([
+                    OrderItem(
+                        order=order,
+                        product=line['product'],
+                        product_name=line['product'].name,
+                        sku=line['product'].sku or '',
+                        quantity=line['quantity'],
+                        unit_price=line['unit_price'],
+                    )
+                    for line in lines
+                ])
+                OrderSummary.from_order(order).save(force_insert=True)
+                cart.clear()
+                transaction.on_commit(lambda: process_order.delay(str(order.pk)))
+            return order, True
+        except IntegrityError:
+            # Envio duplicado concorrente: o outro request criou o pedido primeiro
+            existing = Order.objects.filter(user=user, idempotency_key=idempotency_key).first()
+            if existing is not None:
+                return existing, False
+            # Senão foi colisão do número aleatório do pedido: tenta com outro
+    raise CheckoutError('Não foi possível registrar o pedido. Tente novamente.')
+
+
+def _save_address(user, address):
+    """Cadastra o endereço informado no checkout, a menos que o usuário já tenha um igual"""
+    fields = {name: getattr(address, name) for name in ('street', 'city', 'state', 'zip_code')}
+    if not Address.objects.filter(user=user, **fields).exists():
+        # Uma nova instância: se a transação for desfeita, ``address`` continua sem pk para a próxima tentativa
+        Address.objects.create(user=user, **fields)
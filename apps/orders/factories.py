@@ -0,0 +1,62 @@
+import random
+import uuid
+from decimal import Decimal
+
+from apps.products.factories import make_product, product_pool
+from apps.products.models import Product
+
+from .models import Order, OrderItem, OrderSummary
+
+SEED_STATUSES = [Order.CONFIRMED, Order.CONFIRMED, Order.CONFIRMED, Order.PAID, Order.FAILED]
+
+
+def seed_orders(users, orders=2, max_items=4, batch_size=1000, seed=0, stdout=None):
+    """Cria ``orders`` pedidos, com itens e resumo, para cada usuário da lista que ainda não tem pedidos"""
+    rng = random.Random(seed)
+    products = {
+        product['pk']: product
+        for product in Product.objects.filter(pk__in=product_pool(1000)).values('pk', 'name', 'sku', 'price')
+    }
+    if not products:
+        return 0
+    pool = list(products)
+    with_orders = set(Order.objects.values_list('user_id', flat=True).distinct())
+    pending = [user_id for user_id in users if user_id not in with_orders]
+    created = 0
+    for start in range(0, len(pending), batch_size):
+        order_objs, item_objs = [], []
+        for user_id in pending[start:start + batch_size]:
+            for _ in range(orders):
+                lines = [(products[pk], rng.randint(1, 3)) for pk in rng.sample(pool, rng.randint(1, max_items))]
+                subtotal = sum((product['price'] * quantity for product, quantity in lines), Decimal('0'))
+                order = Order(
+                    user_id=user_id, idempotency_key=uuid.uuid4(), status=rng.choice(SEED_STATUSES),
+                    shipping_address='Rua do Benchmark, 1 - São Paulo/SP', subtotal=subtotal, total=subtotal,
+                    item_count=sum(quantity for _, quantity in lines),
+                )
+                order_objs.append(order)
+                item_objs += [
+                    OrderItem(order=order, product_id=product['pk'], product_name=product['name'],
+                              sku=product['sku'] or '', quantity=quantity, unit_price=product['price'])
+                    for product, quantity in lines
+                ]
+        Order.objects.bulk_create(order_objs)
+        OrderItem.objects.bulk_create(item_objs)
+        OrderSummary.objects.bulk_create([OrderSummary.from_order(order) for order in order_objs])
+        created += len(order_objs)
+        if stdout:
+            stdout.write(f'{created} pedidos')
+    return created
+
+
+def make_order(user, items=1, product=None):
+    """Cria um pedido com ``items`` itens de R$ 10 do mesmo produto para os testes"""
+    order = Order.objects.create(user=user, idempotency_key=uuid.uuid4(), shipping_address='Rua A, 100',
+                                 subtotal=Decimal('10.00') * items, total=Decimal('10.00') * items, item_count=items)
+    product = product or make_product()
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product=product, product_name=f'Item {index}', sku=f'SKU-{index}', quantity=1,
+                  unit_price=Decimal('10.00'))
+        for index in range(items)
+    ])
+    return order
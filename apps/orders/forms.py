@@ -0,0 +1,44 @@
+from django import forms
+
+from apps.accounts.models import Address
+
+
+class CheckoutForm(forms.Form):
+    """Formulário de finalização do pedido"""
+    idempotency_key = forms.UUIDField(widget=forms.HiddenInput)
+    address = forms.ModelChoiceField(queryset=Address.objects.none(), required=False, empty_label=None,
+                                     widget=forms.RadioSelect, label='Endereço de entrega')
+    street = forms.CharField(label='Rua', max_length=255, required=False)
+    city = forms.CharField(label='Cidade', max_length=100, required=False)
+    state = forms.CharField(label='Estado', max_length=2, required=False)
+    zip_code = forms.CharField(label='CEP', max_length=10, required=False)
+    coupon_code = forms.CharField(label='Cupom', max_length=50, required=False)
+
+    def __init__(self, user, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+        self.fields['address'].queryset = Address.objects.filter(user=user).order_by('-created_at')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('address'):
+            missing = [name for name in ('street', 'city', 'state', 'zip_code') if not cleaned_data.get(name)]
+            for name in missing:
+                self.add_error(name, 'Informe o endereço de entrega.')
+        return cleaned_data
+
+    def shipping_address(self):
+        """Retorna o endereço escolhido, ou o novo endereço informado ainda sem gravar
+
+        O novo endereço só é gravado por place_order, junto com o pedido.
+        """
+        address = self.cleaned_data.get('address')
+        if address is None:
+            address = Address(
+                user=self.user,
+                street=self.cleaned_data['street'],
+                city=self.cleaned_data['city'],
+                state=self.cleaned_data['state'].upper(),
+                zip_code=self.cleaned_data['zip_code'],
+            )
+        return address
@@ -0,0 +1,81 @@
+import statistics
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.products.models import Brand, Category, Product
+from apps.orders.models import Order, OrderItem
+
+
+class Command(BaseCommand):
+    help = 'Mede a vazão de gravação de pedidos (pedido + itens em uma transação) com threads concorrentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=2000)
+        parser.add_argument('--items', type=int, default=4, help='Itens por pedido')
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--keep', action='store_true', help='Mantém os pedidos e produtos de teste ao final')
+
+    def handle(self, *args, **options):
+        run = uuid.uuid4().hex[:8]
+        user = get_user_model().objects.create_user(
+            username=f'bench-{run}', email=f'bench-{run}@example.com', password=None,
+        )
+        category, _ = Category.objects.get_or_create(name='Benchmark', defaults={'slug': 'benchmark'})
+        brand, _ = Brand.objects.get_or_create(name='Benchmark', defaults={'slug': 'benchmark'})
+        products = Product.objects.bulk_create([
+            Product(name=f'Produto de benchmark {index}', slug=f'benchmark-{run}-{index}', description='',
+                    sku=f'BENCH-{run}-{index}', category=category, brand=brand, price=Decimal('19.90'))
+            for index in range(options['items'])
+        ])
+
+        per_thread = options['orders'] // options['threads']
+        latencies = [[] for _ in range(options['threads'])]
+
+        def worker(slot):
+            try:
+                for _ in range(per_thread):
+                    started = time.perf_counter()
+                    with transaction.atomic():
+                        order = Order.objects.create(
+                            user=user, idempotency_key=uuid.uuid4(), shipping_address='Rua do Benchmark, 1',
+                            subtotal=Decimal('19.90') * len(products), total=Decimal('19.90') * len(products),
+                            item_count=len(products),
+                        )
+                        OrderItem.objects.bulk_create([
+                            OrderItem(order=order, product=product, product_name=product.name, sku=product.sku,
+                                      quantity=1, unit_price=product.price)
+                            for product in products
+                        ])
+                    latencies[slot].append(time.perf_counter() - started)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(slot,)) for slot in range(options['threads'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        samples = sorted(latency for slot in latencies for latency in slot)
+        total = len(samples)
+        p50 = statistics.median(samples) * 1000
+        p99 = samples[min(int(total * 0.99), total - 1)] * 1000
+        self.stdout.write(
+            f'{total} pedidos ({total * len(products)} itens) em {elapsed:.2f}s ({total / elapsed:.0f} pedidos/s) '
+            f'com {options["threads"]} threads; latência p50 {p50:.1f}ms, p99 {p99:.1f}ms'
+        )
+
+        if not options['keep']:
+            orders = Order.objects.filter(user=user)
+            OrderItem.objects.filter(order__in=orders).delete()
+            orders.delete()
+            Product.objects.filter(pk__in=[product.pk for product in products]).delete()
+            user.delete()
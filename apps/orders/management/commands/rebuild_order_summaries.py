@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from apps.orders.models import Order, OrderSummary
+
+
+class Command(BaseCommand):
+    help = 'Grava o resumo dos pedidos que ainda não têm um (ex.: pedidos criados antes do resumo existir)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        missing = Order.objects.filter(summary__isnull=True).order_by('pk')
+        created = 0
+        while True:
+            batch = list(missing[:options['batch_size']])
+            if not batch:
+                break
+            OrderSummary.objects.bulk_create([OrderSummary.from_order(order) for order in batch])
+            created += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'{created} resumos de pedido gravados'))
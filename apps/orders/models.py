@@ -1,7 +1,167 @@
+import os
+import time
+import uuid
+
+from django.conf import settings
 from django.db import models
+from django.urls import reverse
+from django.utils import timezone
+
+ORDER_NUMBER_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+
+def time_ordered_uuid():
+    """Retorna um UUID cujos primeiros 48 bits são o instante em milissegundos (layout do UUIDv7)
+
+    Pedidos novos entram sempre no fim do índice da chave primária em vez de em
+    páginas aleatórias, como aconteceria com uuid4.
+    """
+    value = (int(time.time() * 1000) << 80) | int.from_bytes(os.urandom(10), 'big')
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # versão 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # variante RFC 4122
+    return uuid.UUID(int=value)
+
+
+def generate_order_number():
+    """Gera o número exibido ao cliente: data + 8 caracteres aleatórios (40 bits)
+
+    Não depende de sequência nem de contador no banco, então inserções
+    concorrentes não disputam nenhuma linha.
+    """
+    value = int.from_bytes(os.urandom(5), 'big')
+    suffix = ''.join(ORDER_NUMBER_ALPHABET[(value >> shift) & 31] for shift in range(35, -1, -5))
+    return f"{timezone.now():%y%m%d}-{suffix}"
 
 
-# Modelos básicos para orders - implementação futura
 class Order(models.Model):
-    # Implementar futuramente
-    pass
+    """Modelo para pedidos"""
+    PENDING = 'pending'
+    RESERVED = 'reserved'
+    PAID = 'paid'
+    CONFIRMED = 'confirmed'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Processando'),
+        (RESERVED, 'Aguardando pagamento'),
+        (PAID, 'Pagamento aprovado'),
+        (CONFIRMED, 'Confirmado'),
+        (FAILED, 'Não concluído'),
+    ]
+    FINAL_STATUSES = (CONFIRMED, FAILED)
+
+    id = models.UUIDField(primary_key=True, default=time_ordered_uuid, editable=False)
+    number = models.CharField('Número', max_length=20, unique=True, default=generate_order_number, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='orders')
+    idempotency_key = models.UUIDField('Chave de Idempotência', editable=False)
+    status = models.CharField('Status', max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    coupon = models.ForeignKey('cart.Coupon', on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
+    coupon_redeemed = models.BooleanField(default=False, editable=False)
+    shipping_address = models.TextField('Endereço de Entrega')
+    subtotal = models.DecimalField('Subtotal', max_digits=12, decimal_places=2)
+    discount = models.DecimalField('Desconto', max_digits=12, decimal_places=2, default=0)
+    total = models.DecimalField('Total', max_digits=12, decimal_places=2)
+    item_count = models.PositiveIntegerField('Quantidade de Itens', default=0)
+    payment_reference = models.CharField('Referência do Pagamento', max_length=64, blank=True)
+    failure_reason = models.CharField('Motivo', max_length=255, blank=True)
+    confirmation_sent_at = models.DateTimeField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Pedido'
+        verbose_name_plural = 'Pedidos'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='order_idempotency_key_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Pedido {self.number}"
+
+    def get_absolute_url(self):
+        return reverse('orders:detail', kwargs={'order_id': self.pk})
+
+    @property
+    def is_final(self):
+        return self.status in self.FINAL_STATUSES
+
+
+class OrderItem(models.Model):
+    """Modelo para itens do pedido
+
+    Nome, SKU e preço são copiados do produto na compra, então o histórico não
+    consulta Product e não muda quando o catálogo muda.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey('products.Product', on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='order_items')
+    product_name = models.CharField('Produto', max_length=255)
+    sku = models.CharField('SKU', max_length=64, blank=True)
+    quantity = models.PositiveIntegerField('Quantidade')
+    unit_price = models.DecimalField('Preço Unitário', max_digits=10, decimal_places=2)
+
+    class Meta:
+        verbose_name = 'Item do Pedido'
+        verbose_name_plural = 'Itens do Pedido'
+
+    def __str__(self):
+        return f"{self.quantity}x {self.product_name}"
+
+    @property
+    def total_price(self):
+        """Retorna o preço total do item"""
+        return self.unit_price * self.quantity
+
+
+class OrderSummary(models.Model):
+    """Resumo desnormalizado do pedido para o histórico do cliente
+
+    Gravado na mesma transação que cria o pedido e atualizado a cada mudança de
+    status, então as listagens leem só o índice (user, created_at) sem agregar
+    itens nem juntar tabelas.
+    """
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='order_summaries',
+                             db_index=False)
+    number = models.CharField('Número', max_length=20)
+    status = models.CharField('Status', max_length=10, choices=Order.STATUS_CHOICES)
+    item_count = models.PositiveIntegerField('Quantidade de Itens')
+    total = models.DecimalField('Total', max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Resumo do Pedido'
+        verbose_name_plural = 'Resumos dos Pedidos'
+        indexes = [
+            # No PostgreSQL o INCLUDE torna o índice de cobertura: a listagem não lê a tabela
+            models.Index(fields=['user', '-created_at', '-order'], name='order_summary_history_idx',
+                         include=['number', 'status', 'item_count', 'total']),
+        ]
+
+    def __str__(self):
+        return f"Resumo do pedido {self.number}"
+
+    @classmethod
+    def from_order(cls, order):
+        return cls(
+            order=order,
+            user_id=order.user_id,
+            number=order.number,
+            status=order.status,
+            item_count=order.item_count,
+            total=order.total,
+            created_at=order.created_at,
+        )
+
+    @classmethod
+    def set_status(cls, order_id, status):
+        cls.objects.filter(order_id=order_id).update(status=status)
+
+    def get_absolute_url(self):
+        return reverse('orders:detail', kwargs={'order_id': self.order_id})
+
+    @property
+    def is_final(self):
+        return self.status in Order.FINAL_STATUSES
@@ -0,0 +1,48 @@
+"""Integração com o gateway de pagamento
+
+O gateway usado é definido por PAYMENT_GATEWAY. Toda autorização leva uma
+chave de idempotência (o id do pedido), então repetir a chamada depois de uma
+falha de rede não cobra o cliente duas vezes.
+"""
+import time
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class PaymentDeclined(Exception):
+    """Pagamento recusado: o pedido não deve ser tentado de novo"""
+
+
+class PaymentError(Exception):
+    """Falha temporária de comunicação: a etapa pode ser repetida"""
+
+
+class LocalGateway:
+    """Gateway local para desenvolvimento e testes
+
+    Aprova qualquer valor até PAYMENT_LOCAL_LIMIT (sem limite quando vazio) e
+    espera PAYMENT_LOCAL_DELAY segundos para simular a latência do gateway real.
+    """
+
+    def __init__(self):
+        limit = getattr(settings, 'PAYMENT_LOCAL_LIMIT', None)
+        self.limit = Decimal(str(limit)) if limit else None
+        self.delay = getattr(settings, 'PAYMENT_LOCAL_DELAY', 0)
+
+    def authorize(self, amount, idempotency_key):
+        """Autoriza e captura ``amount`` e retorna a referência do pagamento"""
+        if self.delay:
+            time.sleep(self.delay)
+        if self.limit is not None and amount > self.limit:
+            raise PaymentDeclined('Pagamento recusado pela operadora')
+        return f'local-{uuid.uuid5(uuid.NAMESPACE_OID, str(idempotency_key)).hex}'
+
+    def void(self, reference):
+        """Estorna um pagamento autorizado"""
+
+
+def get_gateway():
+    return import_string(getattr(settings, 'PAYMENT_GATEWAY', 'apps.orders.payments.LocalGateway'))()
@@ -0,0 +1,158 @@
+"""Etapas do processamento de um pedido depois do checkout
+
+Cada etapa só age se o pedido estiver no status esperado e muda o status na
+mesma transação em que faz o trabalho, então pode ser repetida (retry do
+Celery, tarefa duplicada) sem efeito duplicado:
+
+    pending -> reserved -> paid -> confirmed
+                  \\-----------\\--> failed
+"""
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+
+from apps.cart.utils import merge_cart_items
+from apps.products.inventory import (
+    InsufficientStock, ReservationExpired, commit_reservation, release_reservation, reserve_stock,
+)
+from apps.products.models import StockReservation
+from .models import Order, OrderSummary
+from .payments import PaymentDeclined, get_gateway
+
+
+class OrderFailed(Exception):
+    pass
+
+
+def reserve_order(order_id):
+    """Reserva o estoque dos itens e consome o cupom do pedido"""
+    with transaction.atomic():
+        order = Order.objects.select_for_update().select_related('coupon').filter(
+            pk=order_id, status=Order.PENDING,
+        ).first()
+        if order is None:
+            return
+
+        try:
+            with transaction.atomic():
+                # Ordem fixa dos produtos para que dois pedidos não se bloqueiem mutuamente
+                for item in order.items.select_related('product').order_by('product_id'):
+                    if item.product is None:
+                        raise OrderFailed(f'O produto {item.product_name} não está mais disponível')
+                    reserve_stock(item.product, item.quantity, order=order)
+                if order.coupon_id and not order.coupon.redeem():
+                    raise OrderFailed('O cupom atingiu o limite de uso')
+        except InsufficientStock:
+            reason = 'Um dos produtos não tem mais estoque suficiente'
+        except OrderFailed as exc:
+            reason = str(exc)
+        else:
+            order.status = Order.RESERVED
+            order.coupon_redeemed = bool(order.coupon_id)
+            order.save(update_fields=['status', 'coupon_redeemed', 'updated_at'])
+            OrderSummary.set_status(order.pk, order.status)
+            return
+
+    fail_order(order_id, reason)
+
+
+def authorize_payment(order_id):
+    """Cobra o pedido no gateway; falhas temporárias (PaymentError) sobem para o retry da tarefa"""
+    order = Order.objects.filter(pk=order_id, status=Order.RESERVED).only('id', 'total').first()
+    if order is None:
+        return
+
+    try:
+        reference = get_gateway().authorize(order.total, order.pk)
+    except PaymentDeclined as exc:
+        fail_order(order_id, str(exc))
+        return
+
+    with transaction.atomic():
+        updated = Order.objects.filter(pk=order_id, status=Order.RESERVED).update(
+            status=Order.PAID, payment_reference=reference, updated_at=timezone.now(),
+        )
+        if updated:
+            OrderSummary.set_status(order_id, Order.PAID)
+    if not updated:
+        # O pedido falhou enquanto o gateway respondia (ex.: reserva vencida)
+        get_gateway().void(reference)
+
+
+def confirm_order(order_id):
+    """Baixa definitivamente o estoque reservado e confirma o pedido"""
+    with transaction.atomic():
+        order = Order.objects.select_for_update().filter(pk=order_id, status=Order.PAID).first()
+        if order is None:
+            return
+
+        try:
+            with transaction.atomic():
+                reservations = list(order.reservations.all())
+                for reservation in reservations:
+                    if reservation.status != StockReservation.ACTIVE:
+                        raise ReservationExpired(reservation.pk)
+                    commit_reservation(reservation)
+        except ReservationExpired:
+            pass
+        else:
+            order.status = Order.CONFIRMED
+            order.save(update_fields=['status', 'updated_at'])
+            OrderSummary.set_status(order.pk, order.status)
+            return
+
+    fail_order(order_id, 'A reserva de estoque expirou antes da confirmação do pagamento')
+
+
+def send_order_confirmation(order_id):
+    """Envia o e-mail de confirmação uma única vez"""
+    order = Order.objects.select_related('user').filter(
+        pk=order_id, status=Order.CONFIRMED, confirmation_sent_at__isnull=True,
+    ).first()
+    if order is None:
+        return
+
+    with transaction.atomic():
+        claimed = Order.objects.filter(pk=order_id, confirmation_sent_at__isnull=True).update(
+            confirmation_sent_at=timezone.now(),
+        )
+        if not claimed:
+            return
+        # Se o envio falhar a marcação é desfeita e o retry tenta de novo
+        send_mail(
+            f'Pedido {order.number} confirmado',
+            f'Olá {order.user.first_name}, recebemos o pagamento do seu pedido de R$ {order.total}.',
+            getattr(settings, 'DEFAULT_FROM_EMAIL', None),
+            [order.user.email],
+        )
+
+
+def fail_order(order_id, reason):
+    """Marca o pedido como não concluído e desfaz reservas, cupom e pagamento"""
+    with transaction.atomic():
+        order = Order.objects.select_for_update().select_related('coupon').filter(pk=order_id).exclude(
+            status__in=Order.FINAL_STATUSES,
+        ).first()
+        if order is None:
+            return
+
+        for reservation in order.reservations.filter(status=StockReservation.ACTIVE):
+            release_reservation(reservation)
+        if order.coupon_redeemed and order.coupon_id:
+            order.coupon.release()
+            order.coupon_redeemed = False
+
+        order.status = Order.FAILED
+        order.failure_reason = reason[:255]
+        order.save(update_fields=['status', 'failure_reason', 'coupon_redeemed', 'updated_at'])
+        OrderSummary.set_status(order.pk, order.status)
+
+        # Os itens voltam para o carrinho para o cliente tentar de novo
+        merge_cart_items(order.user, dict(
+            order.items.filter(product__isnull=False).values_list('product_id', 'quantity')
+        ))
+
+        if order.payment_reference:
+            reference = order.payment_reference
+            transaction.on_commit(lambda: get_gateway().void(reference))
@@ -0,0 +1,46 @@
+from celery import chain, shared_task
+from django.db import OperationalError
+
+from . import pipeline
+from .payments import PaymentError
+
+
+@shared_task
+def process_order(order_id):
+    """Encadeia as etapas do pedido; cada uma ignora pedidos que não estão no status esperado"""
+    order_id = str(order_id)
+    chain(
+        reserve_order.si(order_id),
+        authorize_payment.si(order_id),
+        confirm_order.si(order_id),
+        send_order_confirmation.si(order_id),
+    ).delay()
+
+
+@shared_task(autoretry_for=(OperationalError,), max_retries=3, retry_backoff=True)
+def reserve_order(order_id):
+    pipeline.reserve_order(order_id)
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=10)
+def authorize_payment(self, order_id):
+    try:
+        pipeline.authorize_payment(order_id)
+    except PaymentError as exc:
+        if self.request.retries >= self.max_retries:
+            pipeline.fail_order(order_id, 'Não foi possível processar o pagamento')
+            return
+        raise self.retry(exc=exc)
+
+
+@shared_task(autoretry_for=(OperationalError,), max_retries=3, retry_backoff=True)
+def confirm_order(order_id):
+    pipeline.confirm_order(order_id)
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=60)
+def send_order_confirmation(self, order_id):
+    try:
+        pipeline.send_order_confirmation(order_id)
+    except OSError as exc:
+        raise self.retry(exc=exc)
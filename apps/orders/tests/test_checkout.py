@@ -0,0 +1,89 @@
+import uuid
+from decimal import Decimal
+
+import pytest
+from django.core import mail
+from django.urls import reverse
+
+from apps.accounts.models import Address
+from apps.cart.factories import make_coupon
+from apps.cart.models import CartItem, Coupon
+from apps.orders.models import Order
+from apps.products.factories import make_product
+from apps.products.models import Product, StockReservation
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+SHIPPING = {'street': 'Rua A, 100', 'city': 'São Paulo', 'state': 'sp', 'zip_code': '01000-000'}
+
+
+@pytest.fixture
+def product(client, customer):
+    """Produto com 5 unidades, 2 delas no carrinho do cliente"""
+    product = make_product(price=Decimal('10.00'), stock_quantity=5)
+    client.post(reverse('cart:add', args=[product.pk]), {'quantity': 2})
+    return product
+
+
+def test_checkout_confirms_order_end_to_end(client, product):
+    response = client.get(reverse('orders:checkout'))
+    assert response.status_code == 200
+    make_coupon(code='DEZ', description='R$ 5 de desconto', discount_value=5, usage_limit=1)
+    data = {'idempotency_key': response.context['form'].initial['idempotency_key'], 'coupon_code': 'DEZ',
+            **SHIPPING}
+
+    response = client.post(reverse('orders:checkout'), data)
+    assert response.status_code == 303
+    order = Order.objects.get()
+    assert order.status == Order.CONFIRMED, order.failure_reason
+    assert order.total == Decimal('15.00') and order.payment_reference
+    product.refresh_from_db()
+    assert (product.stock_quantity, product.reserved_quantity) == (3, 0)
+    assert Coupon.objects.get().used_count == 1
+    assert len(mail.outbox) == 1
+    assert not CartItem.objects.exists()
+
+    status = client.get(reverse('orders:status', args=[order.pk])).json()
+    assert status['status'] == Order.CONFIRMED
+
+
+def test_duplicate_submit_returns_same_order(client, product):
+    data = {'idempotency_key': uuid.uuid4(), **SHIPPING}
+    first = client.post(reverse('orders:checkout'), data)
+    second = client.post(reverse('orders:checkout'), data)
+    assert second.status_code == 303 and second['Location'] == first['Location']
+    assert Order.objects.count() == 1
+    assert Address.objects.count() == 1
+
+
+def test_new_address_is_saved_only_with_an_order(client, product):
+    CartItem.objects.all().delete()
+    response = client.post(reverse('orders:checkout'), {'idempotency_key': uuid.uuid4(), **SHIPPING})
+    assert response.status_code == 302
+    assert not Address.objects.exists()
+
+    for _ in range(2):
+        client.post(reverse('cart:add', args=[product.pk]), {'quantity': 1})
+        client.post(reverse('orders:checkout'), {'idempotency_key': uuid.uuid4(), **SHIPPING})
+    assert Order.objects.count() == 2
+    assert Address.objects.count() == 1
+
+
+def test_declined_payment_releases_stock_and_restores_cart(client, settings, customer, product):
+    settings.PAYMENT_LOCAL_LIMIT = '10'
+    address = Address.objects.create(user=customer, street='Rua B', city='Campinas', state='SP', zip_code='13000')
+
+    response = client.post(reverse('orders:checkout'), {'idempotency_key': uuid.uuid4(), 'address': address.pk})
+    assert response.status_code == 303
+    order = Order.objects.get()
+    assert order.status == Order.FAILED and 'recusado' in order.failure_reason
+    product.refresh_from_db()
+    assert (product.stock_quantity, product.reserved_quantity) == (5, 0)
+    assert not StockReservation.objects.filter(status=StockReservation.ACTIVE).exists()
+    assert CartItem.objects.get().quantity == 2
+
+
+def test_out_of_stock_fails_order(client, product):
+    Product.objects.filter(pk=product.pk).update(stock_quantity=1)
+    client.post(reverse('orders:checkout'), {'idempotency_key': uuid.uuid4(), **SHIPPING})
+    assert Order.objects.get().status == Order.FAILED
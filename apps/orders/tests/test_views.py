@@ -0,0 +1,33 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.accounts.models import User
+from apps.orders.factories import make_order
+from apps.orders.models import generate_order_number, time_ordered_uuid
+
+pytestmark = pytest.mark.django_db
+
+# Sessão, usuário, pedido e itens (uma consulta para todos); cabeçalho e menu vêm do cache
+ORDER_PAGE_QUERIES = 4
+
+
+@pytest.mark.parametrize('items', [1, 20])
+def test_order_page_renders_in_fixed_number_of_queries(client, customer, items):
+    order = make_order(customer, items)
+    client.get(order.get_absolute_url())
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(order.get_absolute_url())
+    assert response.status_code == 200
+    assert f'Item {items - 1}' in response.content.decode()
+    assert len(queries) == ORDER_PAGE_QUERIES, [query['sql'] for query in queries]
+
+
+def test_order_page_of_another_user_is_not_found(client, customer):
+    other = User.objects.create_user(username='outro', email='outro@example.com')
+    assert client.get(make_order(other, 1).get_absolute_url()).status_code == 404
+
+
+def test_order_ids_are_time_ordered_and_numbers_unique():
+    assert all(time_ordered_uuid().version == 7 for _ in range(5))
+    assert len({generate_order_number() for _ in range(1000)}) == 1000
@@ -7,4 +7,5 @@ urlpatterns = [
     path('', views.order_list, name='list'),
     path('checkout/', views.checkout, name='checkout'),
     path('<uuid:order_id>/', views.order_detail, name='detail'),
+    path('<uuid:order_id>/status/', views.order_status, name='status'),
 ]
@@ -1,14 +1,113 @@
-from django.shortcuts import render
-from django.http import HttpResponse
+import uuid
 
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.cache import never_cache
 
+from apps.cart.models import Coupon
+from apps.cart.storage import get_cart
+from apps.products.pagination import InvalidCursor, paginate_keyset
+from .checkout import CheckoutError, place_order
+from .forms import CheckoutForm
+from .models import Order, OrderSummary
+
+ORDERS_PER_PAGE = 20
+
+RECENT_ORDERS = 5
+
+
+def recent_orders(user, limit=RECENT_ORDERS):
+    """Retorna os últimos pedidos do usuário a partir do resumo, para o widget do perfil"""
+    return list(OrderSummary.objects.filter(user=user).order_by('-created_at', '-order')[:limit])
+
+
+@login_required
 def order_list(request):
-    return HttpResponse("Lista de pedidos - Em desenvolvimento")
+    try:
+        page = paginate_keyset(OrderSummary.objects.filter(user=request.user), request.GET.get('cursor'),
+                               ORDERS_PER_PAGE)
+    except InvalidCursor:
+        raise Http404('Página inválida')
+    return render(request, 'orders/order_list.html', {'page': page})
 
 
+@login_required
 def checkout(request):
-    return HttpResponse("Checkout - Em desenvolvimento")
+    cart = get_cart(request)
+
+    if request.method == 'POST':
+        form = CheckoutForm(request.user, request.POST)
+        # Reenvio do mesmo formulário: devolve o pedido já criado sem validar de novo
+        existing = _order_for_key(request.user, request.POST.get('idempotency_key'))
+        if existing is not None:
+            return _see_other(existing)
+
+        if form.is_valid():
+            coupon = None
+            code = form.cleaned_data['coupon_code'].strip()
+            if code:
+                coupon = Coupon.get_cached(code)
+                if coupon is None:
+                    form.add_error('coupon_code', 'Cupom não encontrado.')
+            if form.is_valid():
+                try:
+                    order, _ = place_order(request.user, cart, form.cleaned_data['idempotency_key'],
+                                           form.shipping_address(), coupon)
+                except CheckoutError as exc:
+                    messages.error(request, str(exc))
+                    return redirect('cart:view')
+                return _see_other(order)
+    else:
+        form = CheckoutForm(request.user, initial={'idempotency_key': uuid.uuid4()})
 
+    lines = cart.lines()
+    if not lines:
+        messages.info(request, 'Seu carrinho está vazio.')
+        return redirect('cart:view')
 
+    context = {
+        'form': form,
+        'lines': lines,
+        'summary': cart.get_summary(lines),
+    }
+    return render(request, 'orders/checkout.html', context)
+
+
+@login_required
 def order_detail(request, order_id):
-    return HttpResponse(f"Detalhes do pedido: {order_id} - Em desenvolvimento")
+    order = get_object_or_404(Order.objects.filter(user=request.user), pk=order_id)
+    context = {
+        'order': order,
+        'items': order.items.all(),
+    }
+    return render(request, 'orders/order_detail.html', context)
+
+
+@never_cache
+@login_required
+def order_status(request, order_id):
+    order = Order.objects.filter(pk=order_id, user=request.user).values('status', 'failure_reason').first()
+    if order is None:
+        return JsonResponse({'error': 'not found'}, status=404)
+    return JsonResponse({
+        'status': order['status'],
+        'label': dict(Order.STATUS_CHOICES)[order['status']],
+        'final': order['status'] in Order.FINAL_STATUSES,
+        'failure_reason': order['failure_reason'],
+    })
+
+
+def _see_other(order):
+    response = redirect(order)
+    response.status_code = 303
+    return response
+
+
+def _order_for_key(user, key):
+    try:
+        key = uuid.UUID(str(key))
+    except ValueError:
+        return None
+    return Order.objects.filter(user=user, idempotency_key=key).first()
@@ -0,0 +1,173 @@
+import threading
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+
+CATEGORY_TREE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Por quanto tempo os ids removidos ficam disponíveis para os outros processos
+DELETED_LOG_TIMEOUT = 60 * 60 * 24
+
+# Acima dessa defasagem de versões é mais barato reconstruir o índice
+DELETED_LOG_MAX_GAP = 1000
+
+# Cada sincronização relê também as linhas alteradas um pouco antes da anterior: uma transação
+# que gravou updated_at antes do início da sincronização mas só confirmou depois não fica de fora
+SYNC_OVERLAP = timedelta(minutes=5)
+
+# Cópia local do menu de categorias neste processo: (versão, árvore)
+_category_tree = (None, None)
+
+
+def version_cache_key(namespace):
+    return f'catalog:version:{namespace}'
+
+
+def get_version(namespace):
+    """Retorna a versão atual de um conjunto de dados do catálogo"""
+    key = version_cache_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+async def aget_version(namespace):
+    """Versão assíncrona de get_version, para as views async"""
+    key = version_cache_key(namespace)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, 1, None)
+        version = await cache.aget(key, 1)
+    return version
+
+
+def bump_version(namespace):
+    """Incrementa a versão, invalidando todos os caches derivados dela"""
+    key = version_cache_key(namespace)
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+        version = cache.incr(key)
+    return version
+
+
+class LocalIndex:
+    """Estrutura em memória mantida por processo e sincronizada pela versão do catálogo
+
+    ``build`` cria o índice completo. O índice precisa implementar ``sync()``,
+    que aplica os produtos alterados desde a última sincronização (menos
+    SYNC_OVERLAP), e ``remove(doc_id)``. Alterações feitas neste processo são
+    aplicadas com ``apply()`` quando a transação é confirmada, incrementando a
+    versão para os demais; ids removidos ficam registrados por versão para que
+    os outros processos também os descartem.
+    """
+
+    def __init__(self, namespace, build):
+        self.namespace = namespace
+        self._build = build
+        self._index = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Retorna o índice deste processo em dia com a versão atual"""
+        version = get_version(self.namespace)
+        if self._index is not None and self._version == version:
+            return self._index
+
+        with self._lock:
+            if self._index is None or (
+                self._version is not None and version - self._version > DELETED_LOG_MAX_GAP
+            ):
+                self._index = self._build()
+            elif self._version is not None and version > self._version:
+                keys = [self._deleted_key(v) for v in range(self._version + 1, version + 1)]
+                for doc_id in cache.get_many(keys).values():
+                    self._index.remove(doc_id)
+            if self._version != version:
+                self._index.sync()
+                self._version = version
+        return self._index
+
+    def apply(self, change, deleted_id=None):
+        """Aplica uma alteração ao índice local e avisa os demais processos após o commit
+
+        Incrementar a versão antes do commit faria outro processo sincronizar
+        sem enxergar a linha e marcar o índice como em dia; com rollback, nada
+        é aplicado.
+        """
+        transaction.on_commit(lambda: self._apply(change, deleted_id))
+
+    def _apply(self, change, deleted_id):
+        with self._lock:
+            if self._index is not None:
+                change(self._index)
+            previous = self._version
+            version = bump_version(self.namespace)
+            if deleted_id is not None:
+                cache.set(self._deleted_key(version), deleted_id, DELETED_LOG_TIMEOUT)
+            # Só considera o índice em dia se nenhum outro processo alterou o catálogo nesse meio tempo
+            if previous is not None and version == previous + 1:
+                self._version = version
+
+    def reset(self):
+        """Descarta o índice local; o próximo get() o reconstrói"""
+        with self._lock:
+            self._index = None
+            self._version = None
+
+    def _deleted_key(self, version):
+        return f'catalog:{self.namespace}:deleted:{version}'
+
+
+def get_category_tree():
+    """Retorna a árvore de categorias ativas sem consultar o banco enquanto o catálogo não mudar"""
+    global _category_tree
+    version = get_version('categories')
+    local_version, tree = _category_tree
+    if local_version == version:
+        return tree
+
+    key = f'catalog:categories:tree:{version}'
+    packed = cache.get(key)
+    if packed is None:
+        packed = _pack_category_tree()
+        cache.set(key, packed, CATEGORY_TREE_CACHE_TIMEOUT)
+
+    tree = _unpack(packed)
+    _category_tree = (version, tree)
+    return tree
+
+
+def _pack_category_tree():
+    """Monta a árvore em formato compacto: [nome, slug, filhos]"""
+    from .models import Category
+
+    fields = ['id', 'name', 'slug']
+    hierarchical = any(field.name == 'parent' for field in Category._meta.fields)
+    if hierarchical:
+        fields.append('parent_id')
+
+    nodes = {}
+    roots = []
+    rows = list(Category.objects.filter(is_active=True).order_by('name').values_list(*fields))
+    for row in rows:
+        nodes[row[0]] = [row[1], row[2], []]
+    for row in rows:
+        parent_id = row[3] if hierarchical else None
+        if parent_id in nodes:
+            nodes[parent_id][2].append(nodes[row[0]])
+        elif parent_id is None:
+            roots.append(nodes[row[0]])
+    return roots
+
+
+def _unpack(packed):
+    return [
+        {'name': name, 'slug': slug, 'children': _unpack(children)}
+        for name, slug, children in packed
+    ]
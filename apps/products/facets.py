@@ -0,0 +1,326 @@
+"""Contagem de filtros do catálogo com bitsets em memória
+
+Cada valor de filtro (marca, categoria, faixa de preço, em estoque, em
+promoção, destaque) guarda um inteiro Python usado como bitset sobre os
+ordinais dos produtos ativos. As contagens de todos os filtros, para qualquer
+combinação selecionada, saem de operações AND/OR e popcount nesses inteiros,
+sem consultas ao banco.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from itertools import chain
+
+from django.utils import timezone
+
+from apps.core.routers import read_from_primary
+
+from .cache import SYNC_OVERLAP, LocalIndex
+
+PRICE_BUCKETS = (
+    ('ate-100', None, Decimal('100')),
+    ('100-250', Decimal('100'), Decimal('250')),
+    ('250-500', Decimal('250'), Decimal('500')),
+    ('500-1000', Decimal('500'), Decimal('1000')),
+    ('acima-1000', Decimal('1000'), None),
+)
+
+FACETS = ('category', 'brand', 'price', 'in_stock', 'on_sale', 'featured')
+
+
+def price_bucket(price):
+    """Retorna a faixa de preço de um valor"""
+    for label, low, high in PRICE_BUCKETS:
+        if (low is None or price >= low) and (high is None or price < high):
+            return label
+    return None
+
+
+def facet_values(category_id, brand_id, price, sale_price, available_quantity, is_featured):
+    """Retorna os pares (filtro, valor) de um produto"""
+    current_price = sale_price if sale_price else price
+    return (
+        ('category', category_id),
+        ('brand', brand_id),
+        ('price', price_bucket(current_price)),
+        ('in_stock', available_quantity > 0),
+        ('on_sale', bool(sale_price and sale_price < price)),
+        ('featured', bool(is_featured)),
+    )
+
+
+def bitset(ordinals):
+    """Monta um inteiro com os bits dos ordinais informados ligados"""
+    if not ordinals:
+        return 0
+    buffer = bytearray((max(ordinals) >> 3) + 1)
+    for ordinal in ordinals:
+        buffer[ordinal >> 3] |= 1 << (ordinal & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+class FacetIndex:
+    """Bitsets por valor de filtro sobre os produtos ativos"""
+
+    # Linhas aplicadas por lote durante a sincronização
+    SYNC_BATCH_SIZE = 50000
+
+    def __init__(self):
+        self.bits = {facet: {} for facet in FACETS}
+        self.all = 0
+        self.ordinals = {}
+        self.doc_values = {}
+        self.free = []
+        self.next_ordinal = 0
+        self.synced_at = None
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def add(self, doc_id, *fields):
+        """Indexa (ou reindexa) um produto ativo; ver facet_values() para os campos"""
+        self.update(added=[(doc_id, fields)])
+
+    def remove(self, doc_id):
+        """Remove um produto; o ordinal é reaproveitado em inclusões futuras"""
+        self.update(removed=[doc_id])
+
+    def update(self, added=(), removed=()):
+        """Aplica um lote de inclusões e remoções com uma operação por bitset
+
+        Cada alteração de um inteiro grande copia o bitset inteiro, então as
+        alterações são agrupadas por valor de filtro antes de aplicadas.
+        """
+        cleared = defaultdict(list)
+        gone = []
+        for doc_id in chain(removed, (doc_id for doc_id, _ in added)):
+            ordinal = self.ordinals.pop(doc_id, None)
+            if ordinal is None:
+                continue
+            for key in self.doc_values.pop(ordinal):
+                cleared[key].append(ordinal)
+            gone.append(ordinal)
+        if gone:
+            for (facet, value), ordinals in cleared.items():
+                self.bits[facet][value] &= ~bitset(ordinals)
+            self.all &= ~bitset(gone)
+            self.free.extend(gone)
+
+        marked = defaultdict(list)
+        new = []
+        for doc_id, fields in added:
+            ordinal = self.free.pop() if self.free else self._new_ordinal()
+            values = facet_values(*fields)
+            for key in values:
+                marked[key].append(ordinal)
+            self.ordinals[doc_id] = ordinal
+            self.doc_values[ordinal] = values
+            new.append(ordinal)
+        if new:
+            for (facet, value), ordinals in marked.items():
+                facet_bits = self.bits[facet]
+                facet_bits[value] = facet_bits.get(value, 0) | bitset(ordinals)
+            self.all |= bitset(new)
+
+    def counts(self, filters=None, scope=None):
+        """Retorna {filtro: {valor: quantidade}} para os filtros selecionados
+
+        ``filters`` mapeia filtro -> valores selecionados (OR dentro do filtro,
+        AND entre filtros). A contagem de cada filtro ignora a própria seleção,
+        para que o cliente veja quantos produtos cada alternativa traria.
+        ``scope`` restringe a base, por exemplo à categoria da página.
+        """
+        filters = {facet: values for facet, values in (filters or {}).items() if values}
+        base = self.all
+        for facet, values in (scope or {}).items():
+            base &= self._union(facet, values)
+
+        selected = {facet: self._union(facet, values) for facet, values in filters.items()}
+        result = {}
+        for facet in FACETS:
+            facet_base = base
+            for other, bits in selected.items():
+                if other != facet:
+                    facet_base &= bits
+            result[facet] = {
+                value: count
+                for value, bits in self.bits[facet].items()
+                if (count := (bits & facet_base).bit_count())
+            }
+        return result
+
+    @read_from_primary()
+    def sync(self):
+        """Aplica as alterações de produtos feitas desde a última sincronização"""
+        from .models import Product, available_quantity_expression
+
+        started_at = timezone.now()
+        queryset = Product.objects.annotate(available=available_quantity_expression())
+        if self.synced_at is not None:
+            queryset = queryset.filter(updated_at__gte=self.synced_at - SYNC_OVERLAP)
+        rows = queryset.values_list('id', 'is_active', 'category_id', 'brand_id', 'price', 'sale_price',
+                                    'available', 'is_featured')
+
+        added, removed = [], []
+        for pk, is_active, *fields in rows.iterator(chunk_size=5000):
+            if is_active:
+                added.append((str(pk), fields))
+            else:
+                removed.append(str(pk))
+            if len(added) + len(removed) >= self.SYNC_BATCH_SIZE:
+                self.update(added, removed)
+                added, removed = [], []
+        self.update(added, removed)
+        self.synced_at = started_at
+
+    def _union(self, facet, values):
+        bits = 0
+        facet_bits = self.bits[facet]
+        for value in values:
+            bits |= facet_bits.get(value, 0)
+        return bits
+
+    def _new_ordinal(self):
+        ordinal = self.next_ordinal
+        self.next_ordinal += 1
+        return ordinal
+
+
+def build_facet_index():
+    """Constrói um índice completo a partir do banco"""
+    index = FacetIndex()
+    index.sync()
+    return index
+
+
+facet_index = LocalIndex('facets', build_facet_index)
+
+
+def get_facet_counts(filters=None, scope=None):
+    """Retorna as contagens de todos os filtros do catálogo"""
+    return facet_index.get().counts(filters, scope)
+
+
+def index_product_facets(product):
+    """Atualiza o produto no índice local e avisa os demais processos"""
+    def change(index):
+        if product.is_active:
+            index.add(str(product.pk), product.category_id, product.brand_id, product.price,
+                      product.sale_price, product.available_quantity, product.is_featured)
+        else:
+            index.remove(str(product.pk))
+
+    facet_index.apply(change)
+
+
+def unindex_product_facets(product):
+    """Remove o produto do índice local e avisa os demais processos"""
+    doc_id = str(product.pk)
+    facet_index.apply(lambda index: index.remove(doc_id), deleted_id=doc_id)
+
+
+# Parâmetros da URL de cada filtro da listagem
+FILTER_PARAMS = {
+    'brand': 'marca',
+    'price': 'preco',
+    'in_stock': 'estoque',
+    'on_sale': 'promocao',
+    'featured': 'destaque',
+}
+
+FILTER_LABELS = {
+    'brand': 'Marca',
+    'price': 'Preço',
+    'in_stock': 'Disponibilidade',
+    'on_sale': 'Ofertas',
+    'featured': 'Destaques',
+}
+
+FLAG_LABELS = {
+    'in_stock': 'Em estoque',
+    'on_sale': 'Em promoção',
+    'featured': 'Destaque',
+}
+
+PRICE_LABELS = {
+    'ate-100': 'Até R$ 100',
+    '100-250': 'R$ 100 a R$ 250',
+    '250-500': 'R$ 250 a R$ 500',
+    '500-1000': 'R$ 500 a R$ 1.000',
+    'acima-1000': 'Acima de R$ 1.000',
+}
+
+
+def parse_filters(params):
+    """Lê os filtros selecionados dos parâmetros da requisição"""
+    filters = {}
+    brands = {int(value) for value in params.getlist(FILTER_PARAMS['brand']) if value.isdigit()}
+    if brands:
+        filters['brand'] = brands
+    prices = {value for value in params.getlist(FILTER_PARAMS['price']) if value in PRICE_LABELS}
+    if prices:
+        filters['price'] = prices
+    for facet in FLAG_LABELS:
+        if params.get(FILTER_PARAMS[facet]) == '1':
+            filters[facet] = {True}
+    return filters
+
+
+def filter_queryset(queryset, filters):
+    """Aplica ao queryset de produtos os mesmos filtros usados nas contagens"""
+    from django.db.models import F, Q
+
+    from .models import available_quantity_expression, current_price_expression
+
+    if 'brand' in filters:
+        queryset = queryset.filter(brand_id__in=filters['brand'])
+    if 'price' in filters:
+        condition = Q()
+        for label, low, high in PRICE_BUCKETS:
+            if label in filters['price']:
+                bucket = Q()
+                if low is not None:
+                    bucket &= Q(listing_price__gte=low)
+                if high is not None:
+                    bucket &= Q(listing_price__lt=high)
+                condition |= bucket
+        queryset = queryset.annotate(listing_price=current_price_expression()).filter(condition)
+    if 'in_stock' in filters:
+        queryset = queryset.alias(available=available_quantity_expression()).filter(available__gt=0)
+    if 'on_sale' in filters:
+        queryset = queryset.filter(sale_price__isnull=False, sale_price__lt=F('price'))
+    if 'featured' in filters:
+        queryset = queryset.filter(is_featured=True)
+    return queryset
+
+
+def build_sidebar(counts, filters, brand_names, exclude=()):
+    """Monta os grupos de filtros exibidos na lateral da listagem"""
+    groups = []
+    for facet, param in FILTER_PARAMS.items():
+        if facet in exclude:
+            continue
+        selected = filters.get(facet, set())
+        if facet == 'brand':
+            options = [
+                (brand_id, brand_names[brand_id], count)
+                for brand_id, count in counts['brand'].items() if brand_id in brand_names
+            ]
+            options.sort(key=lambda option: option[1])
+        elif facet == 'price':
+            options = [
+                (label, PRICE_LABELS[label], counts['price'][label])
+                for label, _, _ in PRICE_BUCKETS if label in counts['price']
+            ]
+        else:
+            options = [('1', FLAG_LABELS[facet], counts[facet][True])] if True in counts[facet] else []
+            selected = {'1'} if selected else set()
+        if options:
+            groups.append({
+                'param': param,
+                'label': FILTER_LABELS[facet],
+                'options': [
+                    {'value': value, 'label': label, 'count': count, 'selected': value in selected}
+                    for value, label, count in options
+                ],
+            })
+    return groups
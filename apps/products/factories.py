@@ -0,0 +1,128 @@
+import random
+import uuid
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.text import slugify
+from PIL import Image
+
+from .images import generate_derivatives
+from .models import Brand, Category, Product, ProductImage
+
+CATEGORY_NAMES = ['Musculação', 'Cardio', 'Acessórios', 'Suplementos', 'Roupas', 'Yoga', 'Lutas', 'Ciclismo']
+PRODUCT_WORDS = ['Halteres', 'Esteira', 'Bicicleta', 'Anilha', 'Barra', 'Kettlebell', 'Colchonete', 'Luva',
+                 'Corda', 'Elástico', 'Banco', 'Whey', 'Creatina', 'Camiseta', 'Tênis', 'Garrafa']
+PRODUCT_ADJECTIVES = ['Premium', 'Pro', 'Ajustável', 'Compacto', 'Profissional', 'Emborrachado', 'Elétrica',
+                      'Dobrável', 'Reforçado', 'Leve']
+
+
+def seed_catalog(products, categories=len(CATEGORY_NAMES), brands=50, batch_size=5000, seed=0, stdout=None):
+    """Cria um catálogo sintético com bulk_create em lotes"""
+    rng = random.Random(seed)
+
+    category_objs = []
+    for index in range(categories):
+        base = CATEGORY_NAMES[index % len(CATEGORY_NAMES)]
+        name = base if index < len(CATEGORY_NAMES) else f'{base} {index}'
+        category_objs.append(Category(name=name, slug=slugify(name)))
+    Category.objects.bulk_create(category_objs, ignore_conflicts=True)
+    category_ids = list(Category.objects.values_list('id', flat=True))
+
+    Brand.objects.bulk_create(
+        [Brand(name=f'Marca {index}', slug=f'marca-{index}') for index in range(brands)],
+        ignore_conflicts=True,
+    )
+    brand_ids = list(Brand.objects.values_list('id', flat=True))
+
+    offset = Product.objects.count()
+    created = 0
+    while created < products:
+        batch = []
+        for _ in range(min(batch_size, products - created)):
+            number = offset + created + len(batch)
+            name = f'{rng.choice(PRODUCT_WORDS)} {rng.choice(PRODUCT_ADJECTIVES)} {number}'
+            price = Decimal(rng.randrange(1990, 499990)) / 100
+            batch.append(Product(
+                name=name,
+                slug=slugify(name),
+                description=f'{name} para treinos em casa ou na academia.',
+                category_id=rng.choice(category_ids),
+                brand_id=rng.choice(brand_ids),
+                price=price,
+                sale_price=(price * Decimal('0.8')).quantize(Decimal('0.01')) if rng.random() < 0.2 else None,
+                stock_quantity=rng.choice([0, 5, 20, 100]),
+                weight=Decimal(rng.randrange(100, 50000)) / 1000,
+                is_featured=rng.random() < 0.02,
+            ))
+        Product.objects.bulk_create(batch)
+        created += len(batch)
+        if stdout:
+            stdout.write(f'{created}/{products} produtos criados')
+    return created
+
+
+BENCH_IMAGE_COLORS = ['#c0392b', '#2980b9', '#27ae60', '#8e44ad', '#f39c12', '#16a085', '#2c3e50', '#d35400']
+
+
+def bench_image_sources():
+    """Grava no storage as imagens de origem dos produtos sintéticos (e suas versões), uma vez"""
+    sources = []
+    for index, color in enumerate(BENCH_IMAGE_COLORS):
+        name = f'products/bench/bench-{index}.jpg'
+        if not default_storage.exists(name):
+            buffer = BytesIO()
+            Image.new('RGB', (1200, 1200), color).save(buffer, 'JPEG', quality=85)
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+        sources.append((name, generate_derivatives(name)))
+    return sources
+
+
+def seed_images(per_product=1, batch_size=5000, stdout=None):
+    """Cria imagens para os produtos que não têm nenhuma, apontando para as imagens de origem compartilhadas
+
+    As linhas já saem com as versões redimensionadas preenchidas: o catálogo
+    sintético é exibido como um catálogo com o pipeline de imagens em dia.
+    """
+    sources = bench_image_sources()
+    created = 0
+    last = None
+    while True:
+        pending = Product.objects.filter(images__isnull=True).order_by('pk')
+        if last is not None:
+            pending = pending.filter(pk__gt=last)
+        ids = list(pending.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return created
+        images = []
+        for number, product_id in enumerate(ids, start=created):
+            for position in range(per_product):
+                name, derivatives = sources[(number + position) % len(sources)]
+                images.append(ProductImage(product_id=product_id, image=name, derivatives=derivatives,
+                                           is_main=position == 0))
+        ProductImage.objects.bulk_create(images)
+        created += len(ids)
+        last = ids[-1]
+        if stdout:
+            stdout.write(f'{created} produtos com imagens')
+
+
+def product_pool(size=5000):
+    """Ids dos produtos ativos mais recentes, de onde os carrinhos e pedidos sintéticos sorteiam itens"""
+    return list(Product.objects.active().order_by('-created_at', '-id').values_list('pk', flat=True)[:size])
+
+
+def make_product(**fields):
+    """Cria um produto com valores padrão para os testes; categoria e marca são compartilhadas"""
+    number = Product.objects.count() + 1
+    name = fields.pop('name', f'Produto {number}')
+    if 'category' not in fields:
+        fields['category'] = Category.objects.get_or_create(slug='categoria-teste', defaults={'name': 'Categoria'})[0]
+    if 'brand' not in fields:
+        fields['brand'] = Brand.objects.get_or_create(slug='marca-teste', defaults={'name': 'Marca'})[0]
+    fields.setdefault('slug', f'{slugify(name)}-{uuid.uuid4().hex[:8]}')
+    fields.setdefault('description', f'{name} para testes.')
+    fields.setdefault('price', Decimal('10.00'))
+    fields.setdefault('stock_quantity', 10)
+    return Product.objects.create(name=name, **fields)
@@ -0,0 +1,92 @@
+"""Blocos de produtos da página inicial renderizados uma vez e guardados no cache
+
+O HTML de cada bloco fica em ``catalog:fragment:<bloco>:<versão do catálogo>``.
+Quando o catálogo muda, a versão anterior continua sendo servida enquanto uma
+tarefa renderiza a nova em segundo plano, então nenhum visitante paga o custo
+da renderização. O token CSRF dos formulários de carrinho é trocado por um
+marcador no cache e substituído a cada requisição.
+"""
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .cache import get_version
+from .facets import filter_queryset
+from .models import Product
+
+HOME_BLOCK_SIZE = 8
+
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Tempo máximo de uma renderização em segundo plano antes de outra poder ser agendada
+REFRESH_LOCK_TIMEOUT = 60
+
+CSRF_PLACEHOLDER = '__csrf_token__'
+
+HOME_BLOCKS = {
+    'featured': {'featured': {True}},
+    'on_sale': {'on_sale': {True}},
+}
+
+
+def fragment_cache_key(name, version):
+    return f'catalog:fragment:{name}:{version}'
+
+
+def latest_fragment_key(name):
+    return f'catalog:fragment:{name}:latest'
+
+
+def render_home_block(name):
+    """Renderiza o bloco com os produtos atuais, sem depender da requisição"""
+    products = filter_queryset(Product.objects.active(), HOME_BLOCKS[name]).for_listing().order_by('-created_at')
+    return render_to_string('products/_home_block.html', {
+        'products': products[:HOME_BLOCK_SIZE],
+        'csrf_placeholder': CSRF_PLACEHOLDER,
+    })
+
+
+def refresh_home_block(name, version=None):
+    """Renderiza e grava o bloco para a versão atual do catálogo
+
+    O bloco mais recente só é substituído por uma versão maior: uma tarefa
+    atrasada de uma versão antiga não sobrescreve o que outra já gravou.
+    """
+    version = version or get_version('catalog')
+    html = render_home_block(name)
+    cache.set(fragment_cache_key(name, version), html, FRAGMENT_CACHE_TIMEOUT)
+    latest = cache.get(latest_fragment_key(name))
+    if latest is None or latest[0] < version:
+        cache.set(latest_fragment_key(name), (version, html), FRAGMENT_CACHE_TIMEOUT)
+    return html
+
+
+def warm_home_blocks(version=None):
+    """Renderiza todos os blocos para a versão informada ou a atual (usado no deploy)"""
+    version = version or get_version('catalog')
+    for name in HOME_BLOCKS:
+        refresh_home_block(name, version)
+
+
+def schedule_home_refresh(version=None):
+    """Agenda a renderização dos blocos uma única vez por versão do catálogo"""
+    from .tasks import refresh_home_fragments
+
+    version = version or get_version('catalog')
+    if cache.add(f'catalog:fragment:refresh:{version}', True, REFRESH_LOCK_TIMEOUT):
+        refresh_home_fragments.delay(version)
+
+
+def get_home_block(request, name):
+    """Retorna o HTML do bloco para a requisição, da versão atual ou da anterior enquanto a nova é gerada"""
+    version = get_version('catalog')
+    html = cache.get(fragment_cache_key(name, version))
+    if html is None:
+        latest = cache.get(latest_fragment_key(name))
+        if latest is not None:
+            html = latest[1]
+            schedule_home_refresh(version)
+        else:
+            html = refresh_home_block(name, version)
+    return mark_safe(html.replace(CSRF_PLACEHOLDER, get_token(request)))
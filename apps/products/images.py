@@ -0,0 +1,67 @@
+"""Geração de versões redimensionadas das imagens de produtos
+
+Cada ProductImage ganha as versões 'thumb', 'card' e 'zoom' em WebP e JPEG,
+gravadas no storage padrão. O JPEG original é decodificado já reduzido
+(Image.draft) e o redimensionamento usa reducing_gap, então o pico de memória
+depende do tamanho final e não da resolução da foto enviada.
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Maior lado, em pixels, de cada versão
+DERIVATIVE_SIZES = {
+    'thumb': 160,
+    'card': 480,
+    'zoom': 1600,
+}
+
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+DERIVATIVES_DIR = 'products/derivatives'
+
+
+def derivative_name(source_name, size, fmt):
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    return f'{DERIVATIVES_DIR}/{stem}-{size}.{fmt}'
+
+
+def _open_reduced(source_name, max_edge):
+    """Abre a imagem decodificando diretamente em escala reduzida quando o formato permite"""
+    with default_storage.open(source_name, 'rb') as fp:
+        image = Image.open(fp)
+        image.draft('RGB', (max_edge, max_edge))
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_edge, max_edge), Image.LANCZOS, reducing_gap=3.0)
+    return image
+
+
+def generate_derivatives(source_name):
+    """Gera todas as versões de uma imagem e retorna o mapa gravado em ProductImage.derivatives"""
+    derivatives = {'source': source_name}
+    for size, max_edge in DERIVATIVE_SIZES.items():
+        image = _open_reduced(source_name, max_edge)
+        entry = {'width': image.width, 'height': image.height}
+        for fmt, (pil_format, save_options) in DERIVATIVE_FORMATS.items():
+            output = image
+            if pil_format == 'JPEG' and output.mode != 'RGB':
+                output = output.convert('RGB')
+            elif output.mode not in ('RGB', 'RGBA'):
+                output = output.convert('RGBA' if 'A' in output.getbands() else 'RGB')
+            buffer = BytesIO()
+            output.save(buffer, pil_format, **save_options)
+
+            name = derivative_name(source_name, size, fmt)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            entry[fmt] = default_storage.save(name, ContentFile(buffer.getvalue()))
+        derivatives[size] = entry
+        image.close()
+    return derivatives
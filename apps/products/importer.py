@@ -0,0 +1,257 @@
+"""Importação em massa do catálogo a partir de arquivos CSV ou JSONL
+
+As linhas são lidas em fluxo e gravadas em lotes (bulk_create para produtos
+novos, UPDATE via executemany para os existentes), um lote por transação. O
+SKU identifica o produto: linhas com SKU já cadastrado atualizam o produto
+existente, o que torna a reimportação de um lote idempotente. Após cada lote confirmado, a posição é gravada no arquivo de
+checkpoint para que uma importação interrompida possa ser retomada.
+
+O estoque de um produto existente nunca fica abaixo das suas reservas ativas.
+Produtos com o estoque dividido em contadores (apps.products.inventory)
+mantêm o estoque atual, que só muda pelos contadores.
+"""
+import csv
+import json
+import os
+import secrets
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from apps.core.routers import read_from_primary
+
+from .cache import bump_version
+from .models import Brand, Category, Product
+
+REQUIRED_COLUMNS = ('sku', 'name', 'category', 'brand', 'price')
+
+UPDATE_FIELDS = ['name', 'description', 'category', 'brand', 'price', 'sale_price', 'weight', 'is_active',
+                 'is_featured', 'updated_at']
+
+SLUG_MAX_LENGTH = Product._meta.get_field('slug').max_length
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+def read_rows(path, fmt=None):
+    """Lê o arquivo linha a linha, sem carregá-lo inteiro em memória"""
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as fp:
+        if fmt == 'csv':
+            yield from csv.DictReader(fp)
+        else:
+            for line in fp:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _decimal(value, field, required=False):
+    if value in (None, ''):
+        if required:
+            raise InvalidRow(f'{field} é obrigatório')
+        return None
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        raise InvalidRow(f'{field} inválido: {value!r}')
+
+
+def _bool(value, default):
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'sim', 's', 'yes')
+
+
+class CatalogImporter:
+    @read_from_primary()
+    def __init__(self, chunk_size=2000, checkpoint_path=None, stdout=None):
+        self.chunk_size = chunk_size
+        self.checkpoint_path = checkpoint_path
+        self.stdout = stdout
+        self.categories = dict(Category.objects.values_list('name', 'id'))
+        self.brands = dict(Brand.objects.values_list('name', 'id'))
+        self.created = 0
+        self.updated = 0
+        self.errors = 0
+
+    @read_from_primary()
+    def run(self, rows, resume=False):
+        """Importa as linhas e retorna o total processado"""
+        skip = self._read_checkpoint() if resume else 0
+        position = 0
+        chunk = []
+        start = time.perf_counter()
+        for row in rows:
+            position += 1
+            if position <= skip:
+                continue
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk, position, start, skip)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk, position, start, skip)
+
+        # As gravações em lote não disparam sinais: avisa os índices do catálogo
+        for namespace in ('catalog', 'search', 'facets', 'categories'):
+            bump_version(namespace)
+        self._remove_checkpoint()
+        return position - skip
+
+    def _import_chunk(self, rows, position, start, skip):
+        products = {}
+        for row in rows:
+            try:
+                product = self._build(row)
+                # Se o SKU se repete no lote, a última linha prevalece
+                products[product.sku] = product
+            except (ValueError, KeyError, AttributeError) as exc:
+                self.errors += 1
+                sku = row.get('sku') if isinstance(row, dict) else None
+                self._log(f'Linha ignorada ({exc}): {sku!r}')
+
+        existing = dict(Product.objects.filter(sku__in=products).values_list('sku', 'id'))
+        to_create, to_update = [], []
+        for product in products.values():
+            if product.sku in existing:
+                product.pk = existing[product.sku]
+                to_update.append(product)
+            else:
+                to_create.append(product)
+        self._allocate_slugs(to_create)
+
+        with transaction.atomic(using=router.db_for_write(Product)):
+            Product.objects.bulk_create(to_create)
+            self._bulk_update(to_update)
+        self._write_checkpoint(position)
+
+        self.created += len(to_create)
+        self.updated += len(to_update)
+        elapsed = time.perf_counter() - start
+        self._log(f'{position} linhas ({self.created} criadas, {self.updated} atualizadas, '
+                  f'{self.errors} erros) - {(position - skip) / elapsed:.0f} linhas/s')
+
+    def _bulk_update(self, products):
+        """Atualiza os produtos com um UPDATE parametrizado por linha via executemany
+
+        bulk_update monta um CASE WHEN por campo com todas as linhas do lote,
+        o que fica quadrático em lotes grandes.
+        """
+        if not products:
+            return
+        connection = connections[router.db_for_write(Product)]
+        fields = [Product._meta.get_field(name) for name in UPDATE_FIELDS]
+        pk_field = Product._meta.pk
+        quote = connection.ops.quote_name
+        stock, reserved, shards = (
+            quote(Product._meta.get_field(name).column)
+            for name in ('stock_quantity', 'reserved_quantity', 'stock_shard_count')
+        )
+        sql = 'UPDATE {} SET {}, {} WHERE {} = %s'.format(
+            quote(Product._meta.db_table),
+            ', '.join(f'{quote(field.column)} = %s' for field in fields),
+            f'{stock} = CASE WHEN {shards} > 0 THEN {stock} WHEN %s > {reserved} THEN %s ELSE {reserved} END',
+            quote(pk_field.column),
+        )
+        params = [
+            [field.get_db_prep_save(getattr(product, field.attname), connection) for field in fields]
+            + [product.stock_quantity, product.stock_quantity]
+            + [pk_field.get_db_prep_save(product.pk, connection)]
+            for product in products
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+
+    def _build(self, row):
+        missing = [column for column in REQUIRED_COLUMNS if not row.get(column)]
+        if missing:
+            raise InvalidRow(f'colunas obrigatórias vazias: {", ".join(missing)}')
+        return Product(
+            sku=str(row['sku']).strip(),
+            name=row['name'].strip(),
+            description=row.get('description') or '',
+            category_id=self._resolve(Category, self.categories, row['category'].strip()),
+            brand_id=self._resolve(Brand, self.brands, row['brand'].strip()),
+            price=_decimal(row['price'], 'price', required=True),
+            sale_price=_decimal(row.get('sale_price'), 'sale_price'),
+            stock_quantity=int(row.get('stock_quantity') or 0),
+            weight=_decimal(row.get('weight'), 'weight'),
+            is_active=_bool(row.get('is_active'), True),
+            is_featured=_bool(row.get('is_featured'), False),
+            slug=row.get('slug') or '',
+            updated_at=timezone.now(),
+        )
+
+    def _resolve(self, model, names, name):
+        """Retorna o id da categoria ou marca, criando-a na primeira ocorrência"""
+        pk = names.get(name)
+        if pk is None:
+            obj, _ = model.objects.get_or_create(name=name, defaults={'slug': self._unique_slug(model, name)})
+            pk = names[name] = obj.pk
+        return pk
+
+    def _unique_slug(self, model, name):
+        base = slugify(name) or 'item'
+        slug, suffix = base, 2
+        while model.objects.filter(slug=slug).exists():
+            slug = f'{base}-{suffix}'
+            suffix += 1
+        return slug
+
+    def _allocate_slugs(self, products):
+        """Atribui slugs únicos ao lote inteiro com poucas consultas
+
+        O primeiro produto de cada nome recebe o slug base; os demais recebem
+        um sufixo aleatório curto. Os candidatos são conferidos no banco em uma
+        consulta por rodada, e só os raros conflitos voltam para a rodada seguinte.
+        """
+        taken = set()
+        pending = []
+        for product in products:
+            product.slug = (product.slug or slugify(product.name) or 'produto')[:SLUG_MAX_LENGTH - 7]
+            pending.append(product)
+
+        while pending:
+            candidates = {}
+            for product in pending:
+                candidates.setdefault(product.slug, []).append(product)
+            in_use = set(Product.objects.filter(slug__in=candidates).values_list('slug', flat=True)) | taken
+
+            pending = []
+            for slug, owners in candidates.items():
+                if slug not in in_use:
+                    taken.add(slug)
+                    owners = owners[1:]
+                for product in owners:
+                    base = product._slug_base = getattr(product, '_slug_base', slug)
+                    product.slug = f'{base}-{secrets.token_hex(3)}'
+                    pending.append(product)
+
+    def _read_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path) as fp:
+            return json.load(fp)['rows']
+
+    def _write_checkpoint(self, position):
+        if not self.checkpoint_path:
+            return
+        tmp_path = f'{self.checkpoint_path}.tmp'
+        with open(tmp_path, 'w') as fp:
+            json.dump({'rows': position}, fp)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _remove_checkpoint(self):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def _log(self, message):
+        if self.stdout:
+            self.stdout.write(message)
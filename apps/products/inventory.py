@@ -0,0 +1,260 @@
+"""Reservas de estoque sem disputa pela linha do produto
+
+Reservar estoque é um UPDATE condicional (só decrementa se houver saldo), então
+não há leitura seguida de escrita nem SELECT ... FOR UPDATE durante o checkout.
+O saldo livre é ``stock_quantity - reserved_quantity``.
+
+Para produtos muito disputados o estoque livre pode ser dividido em
+StockShard: cada reserva decrementa um contador sorteado, espalhando os locks
+entre várias linhas. Nesse modo ``stock_quantity`` e ``reserved_quantity`` são
+recalculados a partir dos contadores por reconcile_sharded_stock(), chamado
+pela varredura periódica.
+
+``stock_quantity`` não é gravado por Product.save(): reposições e ajustes
+passam por adjust_stock(), que soma a diferença no banco sem sobrescrever as
+baixas feitas desde a leitura do produto.
+
+As páginas só exibem se o produto tem ou não saldo livre. Uma alteração que
+zera o saldo, ou que o traz de volta do zero, toca ``updated_at`` e, após o
+commit, incrementa as versões 'catalog' e 'facets'; as demais reservas e baixas
+não invalidam nenhum cache.
+"""
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from apps.core.transactions import on_commit_once
+
+from .cache import bump_version
+from .models import Product, StockReservation, StockShard
+
+
+class InsufficientStock(Exception):
+    pass
+
+
+class ReservationExpired(Exception):
+    pass
+
+
+def reservation_ttl():
+    return timedelta(seconds=getattr(settings, 'STOCK_RESERVATION_TTL', 15 * 60))
+
+
+def reserve_stock(product, quantity, cart=None, order=None, ttl=None):
+    """Reserva ``quantity`` unidades ou levanta InsufficientStock"""
+    shard = None
+    with transaction.atomic():
+        if product.stock_shard_count:
+            shard = _take_from_shards(product, quantity)
+        else:
+            _change_available(product.pk, -quantity, reserved_quantity=F('reserved_quantity') + quantity)
+
+        return StockReservation.objects.create(
+            product=product,
+            cart=cart,
+            order=order,
+            quantity=quantity,
+            shard=shard,
+            expires_at=timezone.now() + (ttl or reservation_ttl()),
+        )
+
+
+def adjust_stock(product, delta):
+    """Soma ``delta`` unidades ao estoque (negativo para baixas); levanta InsufficientStock se faltar saldo"""
+    if not delta:
+        return
+    with transaction.atomic():
+        # A divisão em contadores é lida do banco: a instância recebida pode estar desatualizada
+        count = Product.objects.filter(pk=product.pk).values_list('stock_shard_count', flat=True).get()
+        if not count:
+            _change_available(product.pk, delta, stock_quantity=F('stock_quantity') + delta)
+        elif delta < 0:
+            # O produto é recalculado a partir dos contadores por reconcile_sharded_stock()
+            shards = list(StockShard.objects.select_for_update().filter(product_id=product.pk, available__gt=0))
+            if sum(shard.available for shard in shards) < -delta:
+                raise InsufficientStock(product.pk)
+            remaining = -delta
+            for shard in shards:
+                taken = min(shard.available, remaining)
+                StockShard.objects.filter(pk=shard.pk).update(available=F('available') - taken)
+                remaining -= taken
+                if not remaining:
+                    break
+        else:
+            for index in range(count):
+                share = delta // count + (index < delta % count)
+                if share:
+                    StockShard.objects.filter(product_id=product.pk, index=index).update(
+                        available=F('available') + share,
+                    )
+
+
+def commit_reservation(reservation):
+    """Confirma a reserva, baixando o estoque definitivamente"""
+    with transaction.atomic():
+        updated = StockReservation.objects.filter(
+            pk=reservation.pk, status=StockReservation.ACTIVE,
+        ).update(status=StockReservation.COMMITTED)
+        if not updated:
+            raise ReservationExpired(reservation.pk)
+
+        # O saldo livre não muda. Em produtos com contadores o estoque já saiu do contador na reserva
+        Product.objects.filter(pk=reservation.product_id, stock_shard_count=0).update(
+            stock_quantity=F('stock_quantity') - reservation.quantity,
+            reserved_quantity=F('reserved_quantity') - reservation.quantity,
+        )
+    reservation.status = StockReservation.COMMITTED
+
+
+def release_reservation(reservation):
+    """Cancela a reserva e devolve as unidades ao estoque livre"""
+    with transaction.atomic():
+        updated = StockReservation.objects.filter(
+            pk=reservation.pk, status=StockReservation.ACTIVE,
+        ).update(status=StockReservation.RELEASED)
+        if updated:
+            _return_stock({(reservation.product_id, reservation.shard): reservation.quantity})
+    reservation.status = StockReservation.RELEASED
+
+
+def sweep_expired_reservations(batch_size=1000):
+    """Libera em lotes as reservas vencidas e retorna quantas foram liberadas"""
+    released = 0
+    while True:
+        with transaction.atomic():
+            queryset = StockReservation.objects.filter(
+                status=StockReservation.ACTIVE, expires_at__lt=timezone.now(),
+            ).order_by('expires_at')
+            if connection.features.has_select_for_update_skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            rows = list(queryset.values_list('pk', 'product_id', 'shard', 'quantity')[:batch_size])
+            if not rows:
+                break
+
+            StockReservation.objects.filter(pk__in=[row[0] for row in rows]).update(
+                status=StockReservation.RELEASED,
+            )
+            totals = defaultdict(int)
+            for _, product_id, shard, quantity in rows:
+                totals[(product_id, shard)] += quantity
+            _return_stock(totals)
+        released += len(rows)
+    return released
+
+
+def set_stock_shards(product, count):
+    """Divide o estoque livre do produto em ``count`` contadores (0 desfaz a divisão)"""
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        active = StockReservation.objects.filter(product=product, status=StockReservation.ACTIVE)
+        reserved = active.aggregate(total=Sum('quantity'))['total'] or 0
+        if product.stock_shard_count:
+            available = product.stock_shards.aggregate(total=Sum('available'))['total'] or 0
+        else:
+            available = product.stock_quantity - product.reserved_quantity
+
+        product.stock_shards.all().delete()
+        active.update(shard=None)
+        StockShard.objects.bulk_create([
+            StockShard(product=product, index=index, available=available // count + (index < available % count))
+            for index in range(count)
+        ])
+        _set_stock(product.pk, (product.stock_quantity, product.reserved_quantity), available + reserved, reserved,
+                   stock_shard_count=count)
+
+
+def reconcile_sharded_stock():
+    """Recalcula estoque e reservas dos produtos com contadores"""
+    for product_id in Product.objects.filter(stock_shard_count__gt=0).values_list('pk', flat=True):
+        with transaction.atomic():
+            available = StockShard.objects.filter(product_id=product_id).aggregate(
+                total=Sum('available'))['total'] or 0
+            reserved = StockReservation.objects.filter(
+                product_id=product_id, status=StockReservation.ACTIVE,
+            ).aggregate(total=Sum('quantity'))['total'] or 0
+            current = Product.objects.select_for_update().filter(pk=product_id).values_list(
+                'stock_quantity', 'reserved_quantity').first()
+            if current is not None and current != (available + reserved, reserved):
+                _set_stock(product_id, current, available + reserved, reserved)
+
+
+def _take_from_shards(product, quantity):
+    """Decrementa um contador com saldo, começando por um sorteado"""
+    count = product.stock_shard_count
+    start = random.randrange(count)
+    for offset in range(count):
+        index = (start + offset) % count
+        updated = StockShard.objects.filter(
+            product_id=product.pk, index=index, available__gte=quantity,
+        ).update(available=F('available') - quantity)
+        if updated:
+            return index
+    raise InsufficientStock(product.pk)
+
+
+def _return_stock(totals):
+    """Devolve quantidades ao contador de origem ou ao saldo do produto"""
+    sharded = dict(
+        Product.objects.filter(pk__in={product_id for product_id, _ in totals}, stock_shard_count__gt=0)
+        .values_list('pk', 'stock_shard_count')
+    )
+    for (product_id, shard), quantity in totals.items():
+        if product_id in sharded:
+            index = shard if shard is not None and shard < sharded[product_id] else 0
+            StockShard.objects.filter(product_id=product_id, index=index).update(
+                available=F('available') + quantity,
+            )
+        else:
+            _change_available(product_id, quantity, reserved_quantity=F('reserved_quantity') - quantity)
+
+
+def _change_available(product_id, delta, **changes):
+    """Aplica ``changes``, que alteram o saldo livre em ``delta``, com UPDATEs condicionais
+
+    O primeiro UPDATE só casa se o saldo não passar pelo zero e não toca nada
+    além de ``changes``; o segundo cobre a virada e marca o produto. Levanta
+    InsufficientStock se o saldo não comporta uma redução.
+    """
+    products = Product.objects.filter(pk=product_id)
+    if delta < 0:
+        steady = products.filter(stock_quantity__gt=F('reserved_quantity') - delta)
+        flipping = products.filter(stock_quantity=F('reserved_quantity') - delta)
+    else:
+        steady = products.filter(stock_quantity__gt=F('reserved_quantity'))
+        flipping = products.filter(stock_quantity__lte=F('reserved_quantity'))
+    while True:
+        if steady.update(**changes):
+            return
+        if flipping.update(**changes, updated_at=timezone.now()):
+            _stock_changed()
+            return
+        # Nenhum dos dois casou: sem saldo, ou o saldo mudou entre os UPDATEs
+        if not products.filter(stock_quantity__gte=F('reserved_quantity') - min(delta, 0)).exists():
+            raise InsufficientStock(product_id)
+
+
+def _set_stock(product_id, current, stock_quantity, reserved_quantity, **changes):
+    """Grava estoque e reservas recalculados, marcando o produto se o saldo livre virou"""
+    changes.update(stock_quantity=stock_quantity, reserved_quantity=reserved_quantity)
+    flipped = (current[0] > current[1]) != (stock_quantity > reserved_quantity)
+    if flipped:
+        changes['updated_at'] = timezone.now()
+    Product.objects.filter(pk=product_id).update(**changes)
+    if flipped:
+        _stock_changed()
+
+
+def _stock_changed():
+    """Avisa, uma vez por transação, os caches que exibem a disponibilidade dos produtos"""
+    on_commit_once('products:stock_versions', _bump_stock_versions)
+
+
+def _bump_stock_versions():
+    for namespace in ('catalog', 'facets'):
+        bump_version(namespace)
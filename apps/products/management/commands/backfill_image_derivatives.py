@@ -0,0 +1,56 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from celery import group
+from django.core.management.base import BaseCommand
+
+from apps.products.models import ProductImage
+from apps.products.tasks import generate_image_derivatives
+
+
+class Command(BaseCommand):
+    help = 'Gera as versões redimensionadas das imagens de produtos já cadastradas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Threads usadas com --local')
+        parser.add_argument('--local', action='store_true',
+                            help='Processa neste processo em vez de enfileirar no Celery')
+        parser.add_argument('--all', action='store_true',
+                            help='Regera também imagens que já possuem versões')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        start = time.perf_counter()
+        processed = 0
+        last_pk = 0
+
+        executor = ThreadPoolExecutor(options['workers']) if options['local'] else None
+        try:
+            while True:
+                batch = list(
+                    ProductImage.objects.filter(pk__gt=last_pk).exclude(image='')
+                    .order_by('pk').values_list('pk', 'image', 'derivatives')[:batch_size]
+                )
+                if not batch:
+                    break
+                last_pk = batch[-1][0]
+                ids = [pk for pk, image, derivatives in batch
+                       if options['all'] or derivatives.get('source') != image]
+                if options['all']:
+                    ProductImage.objects.filter(pk__in=ids).update(derivatives={})
+
+                if executor:
+                    list(executor.map(generate_image_derivatives, ids))
+                else:
+                    group(generate_image_derivatives.s(pk) for pk in ids).apply_async()
+                processed += len(ids)
+                self.stdout.write(f'{processed} imagens {"processadas" if executor else "enfileiradas"}')
+        finally:
+            if executor:
+                executor.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{processed} imagens em {time.perf_counter() - start:.1f}s'
+        ))
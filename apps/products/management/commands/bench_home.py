@@ -0,0 +1,57 @@
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from apps.core.views import home_view
+from apps.products.cache import get_version
+from apps.products.fragments import HOME_BLOCKS, fragment_cache_key, latest_fragment_key, warm_home_blocks
+
+
+class Command(BaseCommand):
+    help = 'Compara o tempo de renderização da página inicial com e sem o cache de fragmentos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+
+        def request():
+            req = factory.get('/')
+            req.user = AnonymousUser()
+            req.session = SessionBase()
+            return req
+
+        def drop_fragments():
+            version = get_version('catalog')
+            cache.delete_many([key for name in HOME_BLOCKS
+                               for key in (fragment_cache_key(name, version), latest_fragment_key(name))])
+
+        home_view(request())  # aquece templates e caches não relacionados
+        for label, before in (('sem cache de fragmentos', drop_fragments), ('com cache de fragmentos', None)):
+            if before is None:
+                warm_home_blocks()
+            timings = []
+            queries = 0
+            for _ in range(options['requests']):
+                if before:
+                    before()
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    home_view(request())
+                    timings.append(time.perf_counter() - started)
+                queries += len(ctx)
+            timings.sort()
+            self.stdout.write(
+                f'{label}: p50 {statistics.median(timings) * 1000:.2f}ms, '
+                f'p95 {timings[int(len(timings) * 0.95) - 1] * 1000:.2f}ms, '
+                f'{queries / len(timings):.1f} consultas por página'
+            )
+        reset_queries()
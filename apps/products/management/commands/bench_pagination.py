@@ -0,0 +1,50 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.products.factories import seed_catalog
+from apps.products.models import Product
+from apps.products.pagination import encode_cursor, paginate_keyset
+
+
+class Command(BaseCommand):
+    help = 'Compara a latência da paginação por OFFSET e por cursor na listagem de produtos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1_000_000,
+                            help='Quantidade mínima de produtos na tabela (completa com dados sintéticos)')
+        parser.add_argument('--per-page', type=int, default=24)
+        parser.add_argument('--pages', default='1,10,100,500,2000')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        missing = options['products'] - Product.objects.count()
+        if missing > 0:
+            self.stdout.write(f'Semeando {missing} produtos...')
+            seed_catalog(missing, stdout=self.stdout)
+
+        per_page = options['per_page']
+        queryset = Product.objects.active().for_listing().order_by('-created_at', '-id')
+
+        self.stdout.write(f'{"página":>8} {"offset (ms)":>12} {"cursor (ms)":>12}')
+        for page in [int(value) for value in options['pages'].split(',')]:
+            offset = (page - 1) * per_page
+            cursor = None
+            if offset:
+                boundary = queryset.values_list('created_at', 'id')[offset - 1:offset]
+                if not boundary:
+                    break
+                cursor = encode_cursor(*boundary[0])
+
+            offset_ms = self._measure(lambda: list(queryset[offset:offset + per_page]), options['repeat'])
+            cursor_ms = self._measure(lambda: paginate_keyset(queryset, cursor, per_page), options['repeat'])
+            self.stdout.write(f'{page:>8} {offset_ms:>12.2f} {cursor_ms:>12.2f}')
+
+    def _measure(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
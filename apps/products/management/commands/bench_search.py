@@ -0,0 +1,61 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+
+from apps.products.factories import CATEGORY_NAMES, PRODUCT_ADJECTIVES, PRODUCT_WORDS
+from apps.products.search import SearchIndex
+
+QUERIES = ['halteres', 'esteira elétrica', 'musculacao', 'whey premium', 'bicicleta dobravel',
+           'luvas', 'kettlebell profissional', 'marca 7 corda']
+
+
+class Command(BaseCommand):
+    help = 'Mede construção, persistência e latência de consulta do índice de busca com dados sintéticos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100000,1000000')
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        for size in [int(value) for value in options['sizes'].split(',')]:
+            self._run(size, options['repeat'])
+
+    def _run(self, size, repeat):
+        rng = random.Random(size)
+        index = SearchIndex()
+        start = time.perf_counter()
+        for number in range(size):
+            name = f'{rng.choice(PRODUCT_WORDS)} {rng.choice(PRODUCT_ADJECTIVES)} {number}'
+            index.add(str(uuid.UUID(int=rng.getrandbits(128))), name,
+                      f'{name} para treinos em casa ou na academia.',
+                      f'Marca {rng.randrange(50)}', rng.choice(CATEGORY_NAMES))
+        build_s = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'index.pickle')
+            start = time.perf_counter()
+            index.save(path)
+            save_s = time.perf_counter() - start
+            start = time.perf_counter()
+            SearchIndex.load(path)
+            load_s = time.perf_counter() - start
+
+        timings = []
+        for _ in range(repeat):
+            for query in QUERIES:
+                start = time.perf_counter()
+                index.search(query, 0, 24)
+                timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+
+        self.stdout.write(
+            f'{size} produtos: construção {build_s:.1f}s, gravação {save_s:.1f}s, carga {load_s:.1f}s | '
+            f'consulta p50 {statistics.median(timings):.2f}ms '
+            f'p95 {timings[int(len(timings) * 0.95) - 1]:.2f}ms '
+            f'p99 {timings[int(len(timings) * 0.99) - 1]:.2f}ms'
+        )
@@ -0,0 +1,76 @@
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from apps.products.inventory import (
+    InsufficientStock, commit_reservation, reconcile_sharded_stock, reserve_stock, set_stock_shards,
+)
+from apps.products.models import Brand, Category, Product, StockReservation
+
+
+class Command(BaseCommand):
+    help = 'Dispara reservas concorrentes contra um produto e verifica que não há venda além do estoque'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--stock', type=int, default=2000)
+        parser.add_argument('--shards', type=int, default=0,
+                            help='Divide o estoque em N contadores (produto muito disputado)')
+        parser.add_argument('--keep', action='store_true', help='Mantém o produto de teste ao final')
+
+    def handle(self, *args, **options):
+        category, _ = Category.objects.get_or_create(name='Benchmark', defaults={'slug': 'benchmark'})
+        brand, _ = Brand.objects.get_or_create(name='Benchmark', defaults={'slug': 'benchmark'})
+        product = Product.objects.create(
+            name='Produto de benchmark', slug=f'benchmark-{uuid.uuid4().hex[:12]}', description='',
+            category=category, brand=brand, price=Decimal('10.00'), stock_quantity=options['stock'],
+        )
+        if options['shards']:
+            set_stock_shards(product, options['shards'])
+            product.refresh_from_db()
+
+        committed = [0] * options['threads']
+        conflicts = [0] * options['threads']
+
+        def worker(slot):
+            try:
+                while True:
+                    try:
+                        reservation = reserve_stock(product, 1)
+                        commit_reservation(reservation)
+                        committed[slot] += 1
+                    except InsufficientStock:
+                        return
+                    except OperationalError:
+                        conflicts[slot] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(slot,)) for slot in range(options['threads'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        reconcile_sharded_stock()
+        product.refresh_from_db()
+        total = sum(committed)
+        committed_rows = StockReservation.objects.filter(
+            product=product, status=StockReservation.COMMITTED).count()
+        self.stdout.write(
+            f'{total} reservas confirmadas em {elapsed:.2f}s ({total / elapsed:.0f}/s) com '
+            f'{options["threads"]} threads, {sum(conflicts)} conflitos de lock; '
+            f'estoque final {product.stock_quantity}, reservado {product.reserved_quantity}'
+        )
+        ok = total == committed_rows == options['stock'] and product.stock_quantity == 0
+        if not options['keep']:
+            product.delete()
+        if not ok:
+            raise CommandError('Estoque inconsistente: houve venda além do disponível ou unidades perdidas')
+        self.stdout.write(self.style.SUCCESS('Nenhuma venda além do estoque'))
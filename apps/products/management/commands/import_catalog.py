@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.products.importer import CatalogImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Importa produtos de um arquivo CSV ou JSONL em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Formato do arquivo (padrão: pela extensão)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--checkpoint',
+                            help='Arquivo de checkpoint (padrão: <path>.checkpoint)')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continua a partir do último lote confirmado')
+
+    def handle(self, *args, **options):
+        importer = CatalogImporter(
+            chunk_size=options['chunk_size'],
+            checkpoint_path=options['checkpoint'] or f'{options["path"]}.checkpoint',
+            stdout=self.stdout,
+        )
+        start = time.perf_counter()
+        total = importer.run(read_rows(options['path'], options['format']), resume=options['resume'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} linhas em {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} linhas/s): '
+            f'{importer.created} criados, {importer.updated} atualizados, {importer.errors} erros'
+        ))
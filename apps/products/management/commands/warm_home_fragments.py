@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.fragments import HOME_BLOCKS, warm_home_blocks
+
+
+class Command(BaseCommand):
+    help = 'Renderiza os blocos de produtos da página inicial no cache (executar no deploy)'
+
+    def handle(self, *args, **options):
+        warm_home_blocks()
+        self.stdout.write(self.style.SUCCESS(f'{len(HOME_BLOCKS)} blocos da página inicial no cache'))
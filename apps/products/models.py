@@ -1,3 +1,4 @@
+from django.core.files.storage import default_storage
 from django.db import models
 from django.urls import reverse
 from django.utils.text import slugify
@@ -48,26 +49,76 @@ class Brand(models.Model):
         super().save(*args, **kwargs)
 
 
+def current_price_expression(prefix=''):
+    """Expressão SQL equivalente a Product.current_price"""
+    sale_price = f'{prefix}sale_price'
+    return models.Case(
+        models.When(
+            models.Q(**{f'{sale_price}__isnull': False}) & ~models.Q(**{sale_price: 0}),
+            then=models.F(sale_price),
+        ),
+        default=models.F(f'{prefix}price'),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+def available_quantity_expression(prefix=''):
+    """Expressão SQL do saldo livre de Product.available_quantity (sem o limite em zero)"""
+    return models.F(f'{prefix}stock_quantity') - models.F(f'{prefix}reserved_quantity')
+
+
+class ProductQuerySet(models.QuerySet):
+    def active(self):
+        """Retorna apenas produtos ativos"""
+        return self.filter(is_active=True)
+
+    def for_listing(self):
+        """Carrega categoria, marca e imagem principal sem consultas por produto"""
+        return self.select_related('category', 'brand').prefetch_related(
+            models.Prefetch(
+                'images',
+                queryset=ProductImage.objects.filter(is_main=True),
+                to_attr='main_images',
+            )
+        )
+
+
 class Product(models.Model):
     """Modelo principal de produtos"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField('Nome', max_length=255)
     slug = models.SlugField(max_length=255, unique=True)
+    sku = models.CharField('SKU', max_length=50, unique=True, null=True, blank=True)
     description = models.TextField('Descrição')
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     brand = models.ForeignKey(Brand, on_delete=models.CASCADE, related_name='products')
     price = models.DecimalField('Preço', max_digits=10, decimal_places=2)
     sale_price = models.DecimalField('Preço Promocional', max_digits=10, decimal_places=2, null=True, blank=True)
     stock_quantity = models.PositiveIntegerField('Quantidade em Estoque', default=0)
+    reserved_quantity = models.PositiveIntegerField('Quantidade Reservada', default=0, editable=False)
+    stock_shard_count = models.PositiveSmallIntegerField('Contadores de Estoque', default=0, editable=False)
+    weight = models.DecimalField('Peso (kg)', max_digits=5, decimal_places=3, null=True, blank=True)
     is_active = models.BooleanField('Ativo', default=True)
     is_featured = models.BooleanField('Destaque', default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    # Alterados apenas por apps.products.inventory; reposições passam por adjust_stock()
+    INVENTORY_FIELDS = ('stock_quantity', 'reserved_quantity', 'stock_shard_count')
+
     class Meta:
         verbose_name = 'Produto'
         verbose_name_plural = 'Produtos'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='product_listing_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='product_category_listing_idx'),
+            models.Index(fields=['brand', '-created_at', '-id'], name='product_brand_listing_idx'),
+            # Sincronização incremental dos índices de busca e de filtros
+            models.Index(fields=['updated_at'], name='product_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -75,10 +126,18 @@ class Product(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            # Os campos mantidos por UPDATEs atômicos em apps.products.inventory não são regravados
+            # com o valor lido antes, que pode ter mudado desde então
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.INVENTORY_FIELDS and field.attname not in deferred
+            ]
         super().save(*args, **kwargs)
 
     def get_absolute_url(self):
-        return reverse('products:detail', kwargs={'slug': self.slug})
+        return reverse('products:detail', kwargs={'product_slug': self.slug})
 
     @property
     def current_price(self):
@@ -97,16 +156,30 @@ class Product(models.Model):
             return int(((self.price - self.sale_price) / self.price) * 100)
         return 0
 
+    @property
+    def main_image(self):
+        """Retorna a imagem principal do produto"""
+        images = getattr(self, 'main_images', None)
+        if images is None:
+            images = self.images.filter(is_main=True)[:1]
+        return images[0] if images else None
+
+    @property
+    def available_quantity(self):
+        """Retorna o estoque livre, descontadas as reservas ativas"""
+        return max(self.stock_quantity - self.reserved_quantity, 0)
+
     @property
     def is_in_stock(self):
         """Verifica se o produto está em estoque"""
-        return self.stock_quantity > 0
+        return self.available_quantity > 0
 
 
 class ProductImage(models.Model):
     """Modelo para imagens dos produtos"""
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField('Imagem', upload_to='products/')
+    derivatives = models.JSONField('Versões Redimensionadas', default=dict, blank=True, editable=False)
     is_main = models.BooleanField('Imagem Principal', default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -117,3 +190,90 @@ class ProductImage(models.Model):
 
     def __str__(self):
         return f"Imagem de {self.product.name}"
+
+    @property
+    def has_derivatives(self):
+        return self.derivatives.get('source') == self.image.name
+
+    def derivative_url(self, size, fmt='jpeg'):
+        """Retorna a URL de uma versão redimensionada, ou da imagem original enquanto ela não existe"""
+        if self.has_derivatives and size in self.derivatives:
+            return default_storage.url(self.derivatives[size][fmt])
+        return self.image.url
+
+    def srcset(self, fmt='jpeg'):
+        """Retorna o atributo srcset com todas as versões no formato informado"""
+        if not self.has_derivatives:
+            return ''
+        return ', '.join(
+            f"{default_storage.url(entry[fmt])} {entry['width']}w"
+            for size, entry in self.derivatives.items()
+            if size != 'source'
+        )
+
+    @property
+    def srcset_webp(self):
+        return self.srcset('webp')
+
+    @property
+    def srcset_jpeg(self):
+        return self.srcset('jpeg')
+
+    @property
+    def thumb_url(self):
+        return self.derivative_url('thumb')
+
+    @property
+    def card_url(self):
+        return self.derivative_url('card')
+
+    @property
+    def zoom_url(self):
+        return self.derivative_url('zoom')
+
+
+class StockReservation(models.Model):
+    """Reserva temporária de estoque feita durante o checkout"""
+    ACTIVE = 'active'
+    COMMITTED = 'committed'
+    RELEASED = 'released'
+    STATUS_CHOICES = [
+        (ACTIVE, 'Ativa'),
+        (COMMITTED, 'Confirmada'),
+        (RELEASED, 'Liberada'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    cart = models.ForeignKey('cart.Cart', on_delete=models.SET_NULL, null=True, blank=True, related_name='reservations')
+    order = models.ForeignKey('orders.Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='reservations')
+    quantity = models.PositiveIntegerField('Quantidade')
+    shard = models.PositiveSmallIntegerField('Contador', null=True, blank=True)
+    status = models.CharField('Status', max_length=10, choices=STATUS_CHOICES, default=ACTIVE)
+    expires_at = models.DateTimeField('Expira em')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Reserva de Estoque'
+        verbose_name_plural = 'Reservas de Estoque'
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='reservation_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity}x {self.product_id} ({self.get_status_display()})"
+
+
+class StockShard(models.Model):
+    """Parte do estoque disponível de um produto muito disputado"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_shards')
+    index = models.PositiveSmallIntegerField('Índice')
+    available = models.PositiveIntegerField('Disponível', default=0)
+
+    class Meta:
+        verbose_name = 'Contador de Estoque'
+        verbose_name_plural = 'Contadores de Estoque'
+        unique_together = ['product', 'index']
+
+    def __str__(self):
+        return f"{self.product_id} #{self.index}: {self.available}"
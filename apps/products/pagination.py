@@ -0,0 +1,86 @@
+import base64
+import binascii
+import uuid
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+PRODUCTS_PER_PAGE = 24
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    """Página de resultados obtida por cursor (created_at, id)"""
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(created_at, pk):
+    """Codifica a posição de um item em um cursor opaco para a URL"""
+    raw = f'{created_at.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decodifica um cursor gerado por encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.split('|', 1)
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            raise ValueError(cursor)
+        return created_at, uuid.UUID(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def paginate_keyset(queryset, cursor=None, per_page=PRODUCTS_PER_PAGE):
+    """Pagina em ordem decrescente de (created_at, pk) sem OFFSET
+
+    O custo de qualquer página é o de uma busca no índice a partir do cursor,
+    independente da profundidade.
+    """
+    items = list(_keyset_queryset(queryset, cursor)[:per_page + 1])
+    return _keyset_page(items, per_page)
+
+
+async def apaginate_keyset(queryset, cursor=None, per_page=PRODUCTS_PER_PAGE):
+    """Versão assíncrona de paginate_keyset, para as views async"""
+    items = [item async for item in _keyset_queryset(queryset, cursor)[:per_page + 1]]
+    return _keyset_page(items, per_page)
+
+
+def _keyset_queryset(queryset, cursor):
+    queryset = queryset.order_by('-created_at', '-pk')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        # O created_at__lte redundante permite uma varredura de intervalo no índice
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk),
+            created_at__lte=created_at,
+        )
+    return queryset
+
+
+def _keyset_page(items, per_page):
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.pk)
+    return KeysetPage(items, next_cursor)
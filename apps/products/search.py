@@ -0,0 +1,279 @@
+"""Busca de produtos em memória com índice invertido
+
+O índice cobre nome, descrição, marca e categoria dos produtos ativos. Os
+termos passam por normalização de acentos e um stemming leve em português,
+então "musculação" encontra "musculacao" e "halteres" encontra "halter".
+
+Cada processo mantém sua própria cópia do índice (ver LocalIndex), carregada
+do disco (SEARCH_INDEX_PATH) ou construída do banco. Os sinais de Product
+atualizam a cópia local e incrementam a versão 'search' no cache; os demais
+processos aplicam as alterações feitas desde a última sincronização na
+próxima busca. Um índice carregado do disco descarta os produtos apagados
+depois da gravação.
+"""
+import heapq
+import math
+import os
+import pickle
+import re
+import tempfile
+import unicodedata
+from array import array
+from collections import defaultdict
+from operator import itemgetter
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.core.routers import read_from_primary
+
+from .cache import SYNC_OVERLAP, LocalIndex
+
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'brand': 2.0,
+    'category': 2.0,
+    'description': 1.0,
+}
+
+STOPWORDS = frozenset("""
+a ao aos as com da das de do dos e em na nas no nos o os ou para pela pelas pelo pelos por
+que se sem sua suas seu seus um uma umas uns
+""".split())
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Sufixos de plural mais comuns, já sem acentos, e suas formas no singular
+PLURAL_SUFFIXES = (
+    ('oes', 'ao'),
+    ('aes', 'ao'),
+    ('ais', 'al'),
+    ('eis', 'el'),
+    ('ois', 'ol'),
+    ('res', 'r'),
+    ('zes', 'z'),
+    ('ses', 's'),
+    ('ns', 'm'),
+)
+
+# Fração de documentos removidos a partir da qual o índice é compactado
+COMPACT_RATIO = 0.25
+
+
+def fold(text):
+    """Converte para minúsculas e remove acentos"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def stem(token):
+    """Reduz plurais à forma singular"""
+    if len(token) <= 3:
+        return token
+    for suffix, replacement in PLURAL_SUFFIXES:
+        if token.endswith(suffix):
+            return token[:-len(suffix)] + replacement
+    if token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Divide o texto em termos normalizados"""
+    return [
+        stem(token) for token in TOKEN_RE.findall(fold(text or ''))
+        if token not in STOPWORDS and len(token) > 1
+    ]
+
+
+class SearchIndex:
+    """Índice invertido com listas de postings compactas (ordinal, peso)"""
+
+    def __init__(self):
+        self.postings = {}
+        self.doc_ids = []
+        self.ordinals = {}
+        self.removed = 0
+        self.synced_at = None
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def add(self, doc_id, name='', description='', brand='', category=''):
+        """Indexa (ou reindexa) um produto"""
+        self.remove(doc_id)
+
+        weights = defaultdict(float)
+        for field, text in (('name', name), ('description', description), ('brand', brand), ('category', category)):
+            for term in tokenize(text):
+                weights[term] += FIELD_WEIGHTS[field]
+
+        ordinal = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self.ordinals[doc_id] = ordinal
+        for term, weight in weights.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = (array('I'), array('f'))
+            postings[0].append(ordinal)
+            postings[1].append(weight)
+
+    def remove(self, doc_id):
+        """Remove um produto do índice; as postings são descartadas na compactação"""
+        ordinal = self.ordinals.pop(doc_id, None)
+        if ordinal is None:
+            return
+        self.doc_ids[ordinal] = None
+        self.removed += 1
+        if self.removed > len(self.doc_ids) * COMPACT_RATIO:
+            self.compact()
+
+    def compact(self):
+        """Reconstrói as postings sem os documentos removidos"""
+        remap = {}
+        doc_ids = []
+        for ordinal, doc_id in enumerate(self.doc_ids):
+            if doc_id is not None:
+                remap[ordinal] = len(doc_ids)
+                doc_ids.append(doc_id)
+
+        postings = {}
+        for term, (ordinals, weights) in self.postings.items():
+            new_ordinals, new_weights = array('I'), array('f')
+            for ordinal, weight in zip(ordinals, weights):
+                new_ordinal = remap.get(ordinal)
+                if new_ordinal is not None:
+                    new_ordinals.append(new_ordinal)
+                    new_weights.append(weight)
+            if new_ordinals:
+                postings[term] = (new_ordinals, new_weights)
+
+        self.postings = postings
+        self.doc_ids = doc_ids
+        self.ordinals = {doc_id: ordinal for ordinal, doc_id in enumerate(doc_ids)}
+        self.removed = 0
+
+    def search(self, query, offset=0, limit=24):
+        """Retorna (ids da página, total de resultados) ordenados por relevância
+
+        Todos os termos da consulta precisam aparecer no produto. A pontuação
+        soma peso do campo x idf de cada termo.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return [], 0
+
+        lists = []
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is None:
+                return [], 0
+            lists.append(postings)
+        lists.sort(key=lambda postings: len(postings[0]))
+
+        total_docs = max(len(self.ordinals), 1)
+        ordinals, weights = lists[0]
+        idf = math.log(1 + total_docs / len(ordinals))
+        doc_ids = self.doc_ids
+        scores = {
+            ordinal: weight * idf
+            for ordinal, weight in zip(ordinals, weights)
+            if doc_ids[ordinal] is not None
+        }
+        for ordinals, weights in lists[1:]:
+            if not scores:
+                break
+            idf = math.log(1 + total_docs / len(ordinals))
+            matched = {}
+            for ordinal, weight in zip(ordinals, weights):
+                score = scores.get(ordinal)
+                if score is not None:
+                    matched[ordinal] = score + weight * idf
+            scores = matched
+
+        top = heapq.nlargest(offset + limit, scores.items(), key=itemgetter(1))
+        return [doc_ids[ordinal] for ordinal, _ in top[offset:]], len(scores)
+
+    @read_from_primary()
+    def sync(self):
+        """Aplica as alterações de produtos feitas desde a última sincronização"""
+        from .models import Product
+
+        started_at = timezone.now()
+        queryset = Product.objects.all()
+        if self.synced_at is not None:
+            queryset = queryset.filter(updated_at__gte=self.synced_at - SYNC_OVERLAP)
+        rows = queryset.values_list('id', 'is_active', 'name', 'description', 'brand__name', 'category__name')
+        for pk, is_active, name, description, brand, category in rows.iterator(chunk_size=5000):
+            if is_active:
+                self.add(str(pk), name, description, brand, category)
+            else:
+                self.remove(str(pk))
+        self.synced_at = started_at
+
+    @read_from_primary()
+    def prune(self):
+        """Remove os produtos apagados ou desativados desde que o índice foi gravado em disco"""
+        from .models import Product
+
+        active = {str(pk) for pk in Product.objects.filter(is_active=True).values_list('id', flat=True)}
+        for doc_id in [doc_id for doc_id in self.ordinals if doc_id not in active]:
+            self.remove(doc_id)
+
+    def save(self, path):
+        """Grava o índice em disco de forma atômica"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile('wb', dir=directory, delete=False) as tmp:
+            pickle.dump(self, tmp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp.name, path)
+
+    @classmethod
+    def load(cls, path):
+        """Carrega um índice gravado por save(), ou None se não existir"""
+        try:
+            with open(path, 'rb') as fp:
+                return pickle.load(fp)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+
+def build_search_index():
+    """Constrói um índice completo a partir do banco"""
+    index = SearchIndex()
+    index.sync()
+    return index
+
+
+def load_search_index():
+    """Carrega o índice gravado em disco, sem os produtos apagados desde então, ou constrói do banco"""
+    index = SearchIndex.load(settings.SEARCH_INDEX_PATH)
+    if index is None:
+        return build_search_index()
+    index.prune()
+    return index
+
+
+search_index = LocalIndex('search', load_search_index)
+
+
+def search_products(query, offset=0, limit=24):
+    """Busca produtos e retorna (ids da página, total de resultados)"""
+    return search_index.get().search(query, offset, limit)
+
+
+def index_product(product):
+    """Atualiza o produto no índice local e avisa os demais processos"""
+    def change(index):
+        if product.is_active:
+            index.add(str(product.pk), product.name, product.description, product.brand.name, product.category.name)
+        else:
+            index.remove(str(product.pk))
+
+    search_index.apply(change)
+
+
+def unindex_product(product):
+    """Remove o produto do índice local e avisa os demais processos"""
+    doc_id = str(product.pk)
+    search_index.apply(lambda index: index.remove(doc_id), deleted_id=doc_id)
@@ -0,0 +1,75 @@
+from functools import partial
+
+from django.db.models.signals import post_delete, post_save
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import bump_version
+from .models import Brand, Category, Product, ProductImage
+from .facets import index_product_facets, unindex_product_facets
+from .search import index_product, unindex_product
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_version(sender, instance, **kwargs):
+    """Invalida o menu de categorias quando o catálogo muda"""
+    transaction.on_commit(partial(bump_version, 'categories'))
+
+
+@receiver(post_save, sender=Product)
+def update_catalog_indexes(sender, instance, **kwargs):
+    index_product(instance)
+    index_product_facets(instance)
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_catalog_indexes(sender, instance, **kwargs):
+    unindex_product(instance)
+    unindex_product_facets(instance)
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Category)
+def touch_related_products(sender, instance, created, **kwargs):
+    """Marca os produtos como alterados quando o nome da marca ou categoria muda"""
+    if created:
+        return
+    Product.objects.filter(**{sender._meta.model_name: instance}).update(updated_at=timezone.now())
+    transaction.on_commit(partial(bump_version, 'search'))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_catalog_version(sender, instance, **kwargs):
+    """Invalida listagens e validadores HTTP derivados da versão do catálogo, após o commit
+
+    Antes do commit, outra requisição poderia guardar a listagem antiga sob a versão nova.
+    """
+    transaction.on_commit(partial(bump_version, 'catalog'))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def refresh_home_blocks(sender, instance, **kwargs):
+    """Renderiza de novo os blocos da página inicial quando um produto em destaque ou promoção muda"""
+    if instance.is_featured or instance.is_on_sale:
+        from .fragments import schedule_home_refresh
+
+        transaction.on_commit(schedule_home_refresh)
+
+
+@receiver(post_save, sender=ProductImage)
+def schedule_image_derivatives(sender, instance, **kwargs):
+    """Gera as versões redimensionadas em segundo plano após o upload"""
+    if instance.image and not instance.has_derivatives:
+        from .tasks import generate_image_derivatives
+
+        transaction.on_commit(lambda: generate_image_derivatives.delay(instance.pk))
@@ -0,0 +1,43 @@
+from celery import shared_task
+from django.utils import timezone
+
+from .cache import bump_version
+from .fragments import warm_home_blocks
+from .images import generate_derivatives
+from .inventory import reconcile_sharded_stock, sweep_expired_reservations
+from .models import Product, ProductImage
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def generate_image_derivatives(self, image_id):
+    """Gera as versões redimensionadas de uma imagem de produto"""
+    image = ProductImage.objects.filter(pk=image_id).values('image', 'product_id', 'derivatives').first()
+    if image is None or not image['image']:
+        return
+    if image['derivatives'].get('source') == image['image']:
+        return
+
+    try:
+        derivatives = generate_derivatives(image['image'])
+    except OSError as exc:
+        raise self.retry(exc=exc)
+
+    # A imagem pode ter sido trocada enquanto as versões eram geradas
+    updated = ProductImage.objects.filter(pk=image_id, image=image['image']).update(derivatives=derivatives)
+    if updated:
+        Product.objects.filter(pk=image['product_id']).update(updated_at=timezone.now())
+        bump_version('catalog')
+
+
+@shared_task
+def sweep_stock_reservations():
+    """Libera reservas vencidas e recalcula os produtos com contadores"""
+    released = sweep_expired_reservations()
+    reconcile_sharded_stock()
+    return released
+
+
+@shared_task
+def refresh_home_fragments(version=None):
+    """Renderiza os blocos da página inicial para a versão do catálogo que pediu a renderização"""
+    warm_home_blocks(version)
@@ -0,0 +1,45 @@
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+
+from apps.products.cache import bump_version, get_version
+from apps.products.factories import make_product
+from apps.products.fragments import (
+    CSRF_PLACEHOLDER, fragment_cache_key, latest_fragment_key, refresh_home_block, schedule_home_refresh,
+)
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def test_home_blocks_follow_catalog_changes(client):
+    product = make_product(name='Halteres Destaque', is_featured=True)
+    response = client.get(reverse('core:home'))
+    html = response.content.decode()
+    assert 'Halteres Destaque' in html
+    assert CSRF_PLACEHOLDER not in html and 'csrfmiddlewaretoken' in html
+
+    product.name = 'Halteres Renovados'
+    product.save()
+    assert 'Halteres Renovados' in client.get(reverse('core:home')).content.decode()
+
+
+def test_scheduled_refresh_renders_requested_version():
+    make_product(name='Kettlebell Destaque', is_featured=True)
+    cache.clear()
+    version = get_version('catalog')
+    bump_version('catalog')
+
+    schedule_home_refresh(version)
+
+    assert 'Kettlebell Destaque' in cache.get(fragment_cache_key('featured', version))
+
+
+def test_late_refresh_does_not_replace_newer_latest_block():
+    make_product(name='Corda Destaque', is_featured=True)
+    old = get_version('catalog')
+    new = bump_version('catalog')
+    refresh_home_block('featured', new)
+
+    refresh_home_block('featured', old)
+
+    assert cache.get(latest_fragment_key('featured'))[0] == new
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from apps.products.factories import make_product
+from apps.products.importer import CatalogImporter, read_rows
+from apps.products.inventory import reserve_stock
+from apps.products.models import Product
+
+pytestmark = pytest.mark.django_db
+
+
+def row(sku, **fields):
+    return {'sku': sku, 'name': f'Produto {sku}', 'category': 'Acessórios', 'brand': 'Treina', 'price': '10.00',
+            'stock_quantity': 5, **fields}
+
+
+def write_jsonl(path, rows):
+    path.write_text(''.join(json.dumps(item) + '\n' for item in rows), encoding='utf-8')
+    return str(path)
+
+
+def test_reimport_updates_products_by_sku():
+    CatalogImporter().run([row('A1'), row('A2')])
+    CatalogImporter().run([row('A1', name='Corda Nova', price='12.50')])
+
+    assert Product.objects.count() == 2
+    product = Product.objects.get(sku='A1')
+    assert (product.name, str(product.price), product.slug) == ('Corda Nova', '12.50', 'produto-a1')
+
+
+def test_same_names_get_unique_slugs():
+    make_product(name='Corda', slug='corda')
+    CatalogImporter(chunk_size=2).run([row(f'C{number}', name='Corda') for number in range(5)])
+
+    slugs = list(Product.objects.filter(sku__startswith='C').values_list('slug', flat=True))
+    assert len(set(slugs)) == 5 and 'corda' not in slugs
+    assert all(slug.startswith('corda-') for slug in slugs)
+
+
+def test_stock_update_keeps_active_reservations():
+    CatalogImporter().run([row('R1', stock_quantity=5)])
+    reserve_stock(Product.objects.get(sku='R1'), 3)
+
+    CatalogImporter().run([row('R1', stock_quantity=1)])
+    product = Product.objects.get(sku='R1')
+    assert (product.stock_quantity, product.reserved_quantity) == (3, 3)
+
+
+def test_malformed_lines_are_skipped(tmp_path):
+    path = tmp_path / 'catalogo.jsonl'
+    path.write_text('["lista"]\n' + json.dumps(row('M1', price='')) + '\n' + json.dumps(row('M2')) + '\n')
+    importer = CatalogImporter()
+
+    assert importer.run(read_rows(str(path))) == 3
+    assert importer.errors == 2
+    assert list(Product.objects.values_list('sku', flat=True)) == ['M2']
+
+
+def test_interrupted_import_resumes_after_last_chunk(tmp_path, monkeypatch):
+    path = write_jsonl(tmp_path / 'catalogo.jsonl', [row(f'K{number}') for number in range(5)])
+    checkpoint = str(tmp_path / 'catalogo.checkpoint')
+    original = CatalogImporter._import_chunk
+
+    def fail_on_third_chunk(self, rows, position, start, skip):
+        if position > 4:
+            raise RuntimeError('queda')
+        original(self, rows, position, start, skip)
+
+    monkeypatch.setattr(CatalogImporter, '_import_chunk', fail_on_third_chunk)
+    with pytest.raises(RuntimeError):
+        CatalogImporter(chunk_size=2, checkpoint_path=checkpoint).run(read_rows(path))
+    assert Product.objects.count() == 4
+
+    monkeypatch.setattr(CatalogImporter, '_import_chunk', original)
+    importer = CatalogImporter(chunk_size=2, checkpoint_path=checkpoint)
+    assert importer.run(read_rows(path), resume=True) == 1
+    assert (importer.created, importer.updated) == (1, 0)
+    assert Product.objects.count() == 5
@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+import pytest
+from django.conf import settings
+from django.db import transaction
+
+from apps.products.cache import get_version
+from apps.products.facets import facet_index, filter_queryset, get_facet_counts
+from apps.products.factories import make_product
+from apps.products.inventory import reserve_stock
+from apps.products.models import Product
+from apps.products.search import build_search_index, load_search_index, search_index, search_products
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+class Rollback(Exception):
+    pass
+
+
+def test_rolled_back_change_does_not_bump_versions():
+    search_index.get()
+    versions = {namespace: get_version(namespace) for namespace in ('catalog', 'search', 'facets')}
+    with pytest.raises(Rollback), transaction.atomic():
+        make_product(name='Kettlebell Fantasma')
+        raise Rollback
+    assert {namespace: get_version(namespace) for namespace in versions} == versions
+    assert search_products('fantasma') == ([], 0)
+
+
+def test_versions_are_bumped_after_commit():
+    search_index.get()
+    facet_index.get()
+    with transaction.atomic():
+        product = make_product(name='Kettlebell Confirmado')
+        version = get_version('search')
+    assert get_version('search') > version
+    assert search_products('confirmado') == ([str(product.pk)], 1)
+    assert get_facet_counts()['category'] == {product.category_id: 1}
+
+
+def test_sync_sees_rows_committed_after_previous_sync():
+    product = make_product(name='Halteres Atrasados')
+    index = build_search_index()
+    # Linha gravada antes do início da sincronização por uma transação que só confirmou depois dela
+    late = make_product(name='Halteres Tardios')
+    Product.objects.filter(pk=late.pk).update(updated_at=index.synced_at - timedelta(seconds=1))
+    index.sync()
+    ids, total = index.search('halteres')
+    assert total == 2 and set(ids) == {str(product.pk), str(late.pk)}
+
+
+def test_index_loaded_from_disk_drops_deleted_products():
+    kept = make_product(name='Corda Mantida')
+    deleted = make_product(name='Corda Apagada')
+    build_search_index().save(settings.SEARCH_INDEX_PATH)
+    deleted.delete()
+
+    index = load_search_index()
+    assert index.search('corda') == ([str(kept.pk)], 1)
+
+
+def test_in_stock_filter_counts_only_free_stock():
+    available = make_product(stock_quantity=3)
+    sold_out = make_product(stock_quantity=2)
+    assert get_facet_counts()['in_stock'] == {True: 2}
+
+    reserve_stock(sold_out, 2)
+    assert get_facet_counts()['in_stock'] == {True: 1, False: 1}
+    assert list(filter_queryset(Product.objects.all(), {'in_stock': {True}})) == [available]
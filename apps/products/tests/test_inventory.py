@@ -0,0 +1,131 @@
+from datetime import timedelta
+
+import pytest
+
+from apps.core.testing import run_concurrently
+from apps.products.cache import get_version
+from apps.products.factories import make_product
+from apps.products.inventory import (
+    InsufficientStock, ReservationExpired, adjust_stock, commit_reservation, reconcile_sharded_stock, release_reservation,
+    reserve_stock, set_stock_shards, sweep_expired_reservations,
+)
+from apps.products.models import Product
+
+
+def reserve_concurrently(product, threads, attempts):
+    """Dispara reservas de uma unidade em várias threads e retorna quantas foram aceitas"""
+    accepted = []
+
+    def reserve():
+        for _ in range(attempts):
+            try:
+                reserve_stock(product, 1)
+            except InsufficientStock:
+                continue
+            accepted.append(1)
+
+    run_concurrently(reserve, threads)
+    return len(accepted)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_reservations_never_oversell():
+    product = make_product(stock_quantity=10)
+    assert reserve_concurrently(product, threads=8, attempts=4) == 10
+    product.refresh_from_db()
+    assert (product.stock_quantity, product.reserved_quantity) == (10, 10)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_reservations_never_oversell_sharded_stock():
+    product = make_product(stock_quantity=10)
+    set_stock_shards(product, 4)
+    product.refresh_from_db()
+    assert reserve_concurrently(product, threads=8, attempts=4) == 10
+    reconcile_sharded_stock()
+    product.refresh_from_db()
+    assert (product.stock_quantity, product.reserved_quantity) == (10, 10)
+
+
+@pytest.mark.django_db
+def test_reserve_commit_and_sweep():
+    product = make_product(stock_quantity=3)
+    expired = reserve_stock(product, 2, ttl=timedelta(seconds=-1))
+    with pytest.raises(InsufficientStock):
+        reserve_stock(product, 2)
+    assert sweep_expired_reservations() == 1
+    with pytest.raises(ReservationExpired):
+        commit_reservation(expired)
+
+    commit_reservation(reserve_stock(product, 3))
+    product.refresh_from_db()
+    assert (product.stock_quantity, product.reserved_quantity) == (0, 0)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_only_availability_flips_touch_product_and_bump_versions():
+    product = make_product(stock_quantity=3)
+
+    def state():
+        versions = tuple(get_version(namespace) for namespace in ('catalog', 'facets'))
+        return Product.objects.get(pk=product.pk).updated_at, versions
+
+    before = state()
+    commit_reservation(reserve_stock(product, 1))
+    partial = reserve_stock(product, 1)
+    release_reservation(partial)
+    assert state() == before
+
+    last = reserve_stock(product, 2)
+    sold_out = state()
+    assert sold_out[0] > before[0] and all(new > old for new, old in zip(sold_out[1], before[1]))
+
+    release_reservation(last)
+    back = state()
+    assert back[0] > sold_out[0] and all(new > old for new, old in zip(back[1], sold_out[1]))
+
+
+@pytest.mark.django_db
+def test_full_save_keeps_reserved_quantity():
+    product = make_product(stock_quantity=5)
+    stale = Product.objects.get(pk=product.pk)
+    reserve_stock(product, 2)
+    set_stock_shards(product, 2)
+
+    stale.name = 'Nome Novo'
+    stale.save()
+
+    product.refresh_from_db()
+    assert (product.name, product.reserved_quantity, product.stock_shard_count) == ('Nome Novo', 2, 2)
+
+
+@pytest.mark.django_db
+def test_stale_save_keeps_committed_sale():
+    product = make_product(stock_quantity=5)
+    stale = Product.objects.get(pk=product.pk)
+    commit_reservation(reserve_stock(product, 2))
+
+    stale.price = stale.price + 1
+    stale.save()
+
+    product.refresh_from_db()
+    assert (product.price, product.stock_quantity, product.reserved_quantity) == (stale.price, 3, 0)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('shards', [0, 3])
+def test_restock_adds_to_current_stock(shards):
+    product = make_product(stock_quantity=2)
+    if shards:
+        set_stock_shards(product, shards)
+    stale = Product.objects.get(pk=product.pk)
+    commit_reservation(reserve_stock(stale, 1))
+
+    adjust_stock(stale, 10)
+    reconcile_sharded_stock()
+    product.refresh_from_db()
+    assert product.available_quantity == 11
+
+    adjust_stock(product, -11)
+    with pytest.raises(InsufficientStock):
+        adjust_stock(product, -1)
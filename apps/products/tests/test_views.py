@@ -0,0 +1,33 @@
+import pytest
+from django.urls import reverse
+
+from apps.products.factories import make_product
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('url_name', ['products:list', 'products:detail'])
+def test_cached_page_is_revalidated_after_anonymous_cart_change(client, settings, url_name):
+    settings.CART_STORAGE = 'cookie'
+    product = make_product()
+    url = reverse(url_name, kwargs={'product_slug': product.slug} if url_name == 'products:detail' else None)
+
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response['ETag']
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    client.post(reverse('cart:add', args=[product.pk]))
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+@pytest.mark.parametrize('url_name', ['products:list', 'products:detail'])
+def test_personalized_pages_are_validated_by_etag_only(client, url_name):
+    product = make_product()
+    url = reverse(url_name, kwargs={'product_slug': product.slug} if url_name == 'products:detail' else None)
+
+    response = client.get(url)
+    assert response.has_header('ETag') and not response.has_header('Last-Modified')
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT').status_code == 200
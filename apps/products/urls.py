@@ -1,12 +1,16 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, views_async
 
 app_name = 'products'
 
+# No deploy ASGI as páginas do catálogo são servidas pelas views async
+catalog = views_async if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
-    path('', views.product_list, name='list'),
-    path('categoria/<slug:category_slug>/', views.products_by_category, name='category'),
-    path('marca/<slug:brand_slug>/', views.products_by_brand, name='brand'),
-    path('buscar/', views.product_search, name='search'),
-    path('<slug:product_slug>/', views.product_detail, name='detail'),
+    path('', catalog.product_list, name='list'),
+    path('categoria/<slug:category_slug>/', catalog.products_by_category, name='category'),
+    path('marca/<slug:brand_slug>/', catalog.products_by_brand, name='brand'),
+    path('buscar/', catalog.product_search, name='search'),
+    path('<slug:product_slug>/', catalog.product_detail, name='detail'),
 ]
@@ -1,22 +1,140 @@
-from django.shortcuts import render
-from django.http import HttpResponse
+import hashlib
+import uuid
 
+from django.db.models import Count, Max
+from django.shortcuts import render, get_object_or_404
+from django.http import Http404
+from django.views.decorators.http import condition
 
+from apps.cart.storage import cart_badge
+
+from .facets import build_sidebar, filter_queryset, get_facet_counts, parse_filters
+from .models import Brand, Category, Product
+from .pagination import PRODUCTS_PER_PAGE, InvalidCursor, paginate_keyset
+from .cache import get_version
+from .search import search_products
+
+
+def _viewer_fingerprint(request):
+    """Partes da página que variam por visitante (usuário e resumo do carrinho)
+
+    Entram no ETag. As páginas não enviam Last-Modified: uma data não reflete a
+    troca de carrinho ou de usuário, e um If-Modified-Since sozinho devolveria
+    304 com o cabeçalho antigo.
+    """
+    user = getattr(request, 'user', None)
+    user_id = user.pk if user is not None and user.is_authenticated else ''
+    badge = cart_badge(request)
+    return f'{user_id}:{badge["total_items"]}:{badge["total_price"]}'
+
+
+def _make_etag(*parts):
+    return hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _listing_etag(request, *args, **kwargs):
+    """ETag das listagens: versão do catálogo, parâmetros da URL e visitante, sem consultar o banco"""
+    return _make_etag('listing', get_version('catalog'), request.get_full_path(), _viewer_fingerprint(request))
+
+
+def _product_validators(request, product_slug):
+    """Busca, em uma única consulta indexada, o estado do produto que afeta a página"""
+    if not hasattr(request, '_product_validators'):
+        request._product_validators = (
+            Product.objects.active()
+            .filter(slug=product_slug)
+            .order_by()
+            .annotate(images_updated_at=Max('images__created_at'), images_count=Count('images'))
+            .values('pk', 'updated_at', 'price', 'sale_price', 'images_updated_at', 'images_count')
+            .first()
+        )
+    return request._product_validators
+
+
+def _product_etag(request, product_slug):
+    validators = _product_validators(request, product_slug)
+    if validators is None:
+        return None
+    return _make_etag('product', *validators.values(), _viewer_fingerprint(request))
+
+
+def _render_listing(request, queryset, extra_context=None, scope=None):
+    filters = parse_filters(request.GET)
+    try:
+        page = paginate_keyset(filter_queryset(queryset, filters).for_listing(), request.GET.get('cursor'))
+    except InvalidCursor:
+        raise Http404('Página inválida')
+
+    counts = get_facet_counts(filters, scope)
+    brand_names = dict(Brand.objects.filter(pk__in=counts['brand']).values_list('id', 'name'))
+    params = request.GET.copy()
+    params.pop('cursor', None)
+
+    context = {
+        'page': page,
+        'products': page.object_list,
+        'facets': build_sidebar(counts, filters, brand_names, exclude=scope or ()),
+        'filter_query': params.urlencode(),
+    }
+    context.update(extra_context or {})
+    return render(request, 'products/product_list.html', context)
+
+
+@condition(etag_func=_listing_etag)
 def product_list(request):
-    return HttpResponse("Lista de produtos - Em desenvolvimento")
+    return _render_listing(request, Product.objects.active())
 
 
+@condition(etag_func=_listing_etag)
 def products_by_category(request, category_slug):
-    return HttpResponse(f"Produtos da categoria: {category_slug} - Em desenvolvimento")
+    category = get_object_or_404(Category, slug=category_slug, is_active=True)
+    return _render_listing(
+        request,
+        Product.objects.active().filter(category=category),
+        {'category': category},
+        scope={'category': {category.pk}},
+    )
 
 
+@condition(etag_func=_listing_etag)
 def products_by_brand(request, brand_slug):
-    return HttpResponse(f"Produtos da marca: {brand_slug} - Em desenvolvimento")
+    brand = get_object_or_404(Brand, slug=brand_slug, is_active=True)
+    return _render_listing(
+        request,
+        Product.objects.active().filter(brand=brand),
+        {'brand': brand},
+        scope={'brand': {brand.pk}},
+    )
 
 
+@condition(etag_func=_listing_etag)
 def product_search(request):
-    return HttpResponse("Busca de produtos - Em desenvolvimento")
+    query = request.GET.get('q', '').strip()
+    try:
+        page_number = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page_number = 1
+
+    products, total = [], 0
+    if query:
+        ids, total = search_products(query, (page_number - 1) * PRODUCTS_PER_PAGE, PRODUCTS_PER_PAGE)
+        found = Product.objects.active().for_listing().in_bulk(ids)
+        products = [found[pk] for pk in map(uuid.UUID, ids) if pk in found]
+
+    return render(request, 'products/search.html', {
+        'query': query,
+        'products': products,
+        'total': total,
+        'page_number': page_number,
+        'has_previous': page_number > 1,
+        'has_next': page_number * PRODUCTS_PER_PAGE < total,
+    })
 
 
+@condition(etag_func=_product_etag)
 def product_detail(request, product_slug):
-    return HttpResponse(f"Detalhes do produto: {product_slug} - Em desenvolvimento")
+    product = get_object_or_404(
+        Product.objects.active().select_related('category', 'brand').prefetch_related('images'),
+        slug=product_slug,
+    )
+    return render(request, 'products/product_detail.html', {'product': product})
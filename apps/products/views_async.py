@@ -0,0 +1,151 @@
+"""Views do catálogo para o deploy ASGI (ASYNC_VIEWS ligado)
+
+Mesmas páginas, ETags e templates de views.py. As consultas usam a interface
+async do ORM e as versões do catálogo vêm do cache async; só os índices locais
+(que podem sincronizar com o banco) e a renderização do template passam por
+uma thread.
+"""
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max
+from django.http import Http404
+from django.shortcuts import render
+
+from apps.cart.storage import acart_badge
+from apps.core.async_utils import async_condition
+
+from .cache import aget_version
+from .facets import build_sidebar, filter_queryset, get_facet_counts, parse_filters
+from .models import Brand, Category, Product
+from .pagination import PRODUCTS_PER_PAGE, InvalidCursor, apaginate_keyset
+from .search import search_products
+from .views import _make_etag
+
+arender = sync_to_async(render)
+
+
+async def _viewer_fingerprint(request):
+    user = getattr(request, 'user', None)
+    user_id = user.pk if user is not None and user.is_authenticated else ''
+    badge = await acart_badge(request)
+    return f'{user_id}:{badge["total_items"]}:{badge["total_price"]}'
+
+
+async def _listing_etag(request, *args, **kwargs):
+    return _make_etag(
+        'listing', await aget_version('catalog'), request.get_full_path(), await _viewer_fingerprint(request),
+    )
+
+
+async def _product_validators(request, product_slug):
+    if not hasattr(request, '_product_validators'):
+        request._product_validators = await (
+            Product.objects.active()
+            .filter(slug=product_slug)
+            .order_by()
+            .annotate(images_updated_at=Max('images__created_at'), images_count=Count('images'))
+            .values('pk', 'updated_at', 'price', 'sale_price', 'images_updated_at', 'images_count')
+            .afirst()
+        )
+    return request._product_validators
+
+
+async def _product_etag(request, product_slug):
+    validators = await _product_validators(request, product_slug)
+    if validators is None:
+        return None
+    return _make_etag('product', *validators.values(), await _viewer_fingerprint(request))
+
+
+async def _aget_or_404(queryset, **kwargs):
+    try:
+        return await queryset.aget(**kwargs)
+    except queryset.model.DoesNotExist:
+        raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+
+
+async def _render_listing(request, queryset, extra_context=None, scope=None):
+    filters = parse_filters(request.GET)
+    try:
+        page = await apaginate_keyset(filter_queryset(queryset, filters).for_listing(), request.GET.get('cursor'))
+    except InvalidCursor:
+        raise Http404('Página inválida')
+
+    counts = await sync_to_async(get_facet_counts)(filters, scope)
+    brand_names = {
+        pk: name async for pk, name in Brand.objects.filter(pk__in=counts['brand']).values_list('id', 'name')
+    }
+    params = request.GET.copy()
+    params.pop('cursor', None)
+
+    context = {
+        'page': page,
+        'products': page.object_list,
+        'facets': build_sidebar(counts, filters, brand_names, exclude=scope or ()),
+        'filter_query': params.urlencode(),
+    }
+    context.update(extra_context or {})
+    return await arender(request, 'products/product_list.html', context)
+
+
+@async_condition(etag_func=_listing_etag)
+async def product_list(request):
+    return await _render_listing(request, Product.objects.active())
+
+
+@async_condition(etag_func=_listing_etag)
+async def products_by_category(request, category_slug):
+    category = await _aget_or_404(Category.objects.filter(is_active=True), slug=category_slug)
+    return await _render_listing(
+        request,
+        Product.objects.active().filter(category=category),
+        {'category': category},
+        scope={'category': {category.pk}},
+    )
+
+
+@async_condition(etag_func=_listing_etag)
+async def products_by_brand(request, brand_slug):
+    brand = await _aget_or_404(Brand.objects.filter(is_active=True), slug=brand_slug)
+    return await _render_listing(
+        request,
+        Product.objects.active().filter(brand=brand),
+        {'brand': brand},
+        scope={'brand': {brand.pk}},
+    )
+
+
+@async_condition(etag_func=_listing_etag)
+async def product_search(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        page_number = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page_number = 1
+
+    products, total = [], 0
+    if query:
+        ids, total = await sync_to_async(search_products)(
+            query, (page_number - 1) * PRODUCTS_PER_PAGE, PRODUCTS_PER_PAGE,
+        )
+        found = await Product.objects.active().for_listing().ain_bulk(ids)
+        products = [found[pk] for pk in map(uuid.UUID, ids) if pk in found]
+
+    return await arender(request, 'products/search.html', {
+        'query': query,
+        'products': products,
+        'total': total,
+        'page_number': page_number,
+        'has_previous': page_number > 1,
+        'has_next': page_number * PRODUCTS_PER_PAGE < total,
+    })
+
+
+@async_condition(etag_func=_product_etag)
+async def product_detail(request, product_slug):
+    product = await _aget_or_404(
+        Product.objects.active().select_related('category', 'brand').prefetch_related('images'),
+        slug=product_slug,
+    )
+    return await arender(request, 'products/product_detail.html', {'product': product})
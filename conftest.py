@@ -0,0 +1,48 @@
+import pytest
+from django.conf import settings as django_settings
+from django.core.cache import cache
+
+from apps.accounts.models import User
+from apps.products.facets import facet_index
+from apps.products.search import search_index
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix, tmp_path_factory):
+    """Banco de testes do SQLite em arquivo
+
+    O banco em memória compartilhado entre threads falha com "database table is
+    locked" em escritas simultâneas; em arquivo, as conexões esperam o lock, e os
+    testes com várias threads exercitam as mesmas garantias do PostgreSQL.
+    """
+    database = django_settings.DATABASES['default']
+    if 'sqlite3' in database['ENGINE']:
+        database.setdefault('TEST', {})['NAME'] = str(tmp_path_factory.mktemp('db') / 'test.sqlite3')
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Cada teste começa com o cache vazio: o LocMemCache sobrevive entre os testes do processo"""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def local_indexes(settings, tmp_path):
+    """Descarta os índices do catálogo deste processo e isola o índice de busca gravado em disco"""
+    settings.SEARCH_INDEX_PATH = str(tmp_path / 'search_index.pickle')
+    search_index.reset()
+    facet_index.reset()
+    yield
+    search_index.reset()
+    facet_index.reset()
+
+
+@pytest.fixture
+def customer(client):
+    """Cliente autenticado no ``client`` do teste"""
+    user = User.objects.create_user(username='cliente', email='cliente@example.com', password='senha',
+                                    first_name='Ana')
+    client.force_login(user)
+    return user
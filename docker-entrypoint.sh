@@ -12,5 +12,11 @@ python manage.py migrate --noinput
 echo "Coletando arquivos estáticos..."
 python manage.py collectstatic --noinput
 
+echo "Construindo índice de busca..."
+python manage.py build_search_index
+
+echo "Aquecendo blocos da página inicial..."
+python manage.py warm_home_fragments
+
 echo "Iniciando servidor Django..."
 exec python manage.py runserver 0.0.0.0:8000
@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'treinamais.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if not settings.DEBUG:
+    from apps.core.warmup import precompile_templates  # noqa: E402
+
+    precompile_templates()
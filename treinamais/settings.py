@@ -47,6 +47,9 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'apps.core.middleware.metrics_middleware',
+    'apps.core.middleware.query_budget_middleware',
+    'apps.core.middleware.replica_pinning_middleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -57,17 +60,26 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'treinamais.urls'
 
+# Em produção os templates são compilados uma vez por processo (carregados no boot do worker)
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'apps.core.backends.templates.DjangoTemplates',
+        'NAME': 'django',  # o alias viria do caminho do backend ('templates')
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS if DEBUG else [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'apps.core.context_processors.cart',
+                'apps.core.context_processors.categories',
             ],
         },
     },
@@ -83,6 +95,30 @@ DATABASES = {
     }
 }
 
+# Réplicas de leitura do catálogo (apps.core.routers). Localmente, DATABASE_REPLICA_PATH aponta
+# para uma cópia do SQLite atualizada com `python manage.py sync_sqlite_replica`
+if env('DATABASE_REPLICA_PATH', default=''):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': env('DATABASE_REPLICA_PATH'),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['apps.core.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=5)  # leituras no principal depois de uma escrita
+
+# Conexões persistentes: reaproveitadas entre requisições e tarefas por até DB_CONN_MAX_AGE
+# segundos, testadas antes do reuso e descartadas depois de erros. Os backends de
+# apps.core.backends medem aberturas, reusos e fechamentos (apps.core.connections)
+INSTRUMENTED_DB_ENGINES = {
+    'django.db.backends.postgresql': 'apps.core.backends.postgresql',
+    'django.db.backends.sqlite3': 'apps.core.backends.sqlite3',
+}
+for database in DATABASES.values():
+    database['ENGINE'] = INSTRUMENTED_DB_ENGINES.get(database['ENGINE'], database['ENGINE'])
+    database['CONN_MAX_AGE'] = env.int('DB_CONN_MAX_AGE', default=60)  # 0 no deploy ASGI
+    database['CONN_HEALTH_CHECKS'] = True
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -125,5 +161,108 @@ AUTH_USER_MODEL = 'accounts.User'
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# Celery
+CELERY_BROKER_URL = env('REDIS_URL', default='memory://')
+CELERY_ACCEPT_CONTENT = ['application/json']
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_BEAT_SCHEDULE = {
+    'sweep-stock-reservations': {
+        'task': 'apps.products.tasks.sweep_stock_reservations',
+        'schedule': 60.0,
+    },
+    'purge-stale-carts': {
+        'task': 'apps.cart.tasks.purge_stale_carts',
+        'schedule': 60.0 * 60,
+    },
+}
+CELERY_TASK_ALWAYS_EAGER = env.bool('CELERY_TASK_ALWAYS_EAGER', default=True)  # Executa tarefas sincronamente em desenvolvimento
+CELERY_TASK_EAGER_PROPAGATES = True
+
+# Estoque
+STOCK_RESERVATION_TTL = env.int('STOCK_RESERVATION_TTL', default=15 * 60)  # segundos
+
+# Carrinho
+CART_STORAGE = env('CART_STORAGE', default='cookie')  # 'cookie' ou 'database' para visitantes anônimos
+CART_ABANDONED_DAYS = env.int('CART_ABANDONED_DAYS', default=30)  # carrinhos anônimos sem alteração são apagados
+CART_PURGE_BATCH_SIZE = env.int('CART_PURGE_BATCH_SIZE', default=500)
+CART_PURGE_PAUSE = env.float('CART_PURGE_PAUSE', default=0.1)  # segundos entre lotes
+
+# Pedidos
+LOGIN_URL = 'accounts:login'
+PAYMENT_GATEWAY = env('PAYMENT_GATEWAY', default='apps.orders.payments.LocalGateway')
+PAYMENT_LOCAL_LIMIT = env('PAYMENT_LOCAL_LIMIT', default='')  # valores acima são recusados pelo gateway local
+PAYMENT_LOCAL_DELAY = env.float('PAYMENT_LOCAL_DELAY', default=0)  # segundos
+
+# Deploy ASGI: catálogo e carrinho servidos por views async (ver docker-compose.asgi.yml)
+ASYNC_VIEWS = env.bool('ASYNC_VIEWS', default=False)
+
+# Orçamento de consultas por endpoint e detecção de N+1 (apps.core.querybudget).
+# Limites do estado estável, medidos com usuário autenticado e carrinho no banco depois da primeira
+# requisição (apps/core/tests/test_query_budgets.py): a primeira de cada processo, com índices, menu
+# e fragmentos fora do cache, pode passar deles e só gera aviso no log
+QUERY_BUDGETS = {
+    'core:home': 2,
+    'products:list': 5,
+    'products:category': 6,
+    'products:brand': 6,
+    'products:detail': 5,
+    'products:search': 4,
+    'cart:view': 6,
+    'cart:add': 12,
+    'cart:update': 10,
+    'cart:remove': 10,
+    'cart:clear': 9,
+    'orders:list': 3,
+    'orders:detail': 4,
+    'orders:status': 3,
+    'accounts:profile': 3,
+}
+QUERY_BUDGET_DEFAULT = None  # endpoints sem orçamento só passam pela detecção de N+1
+QUERY_N_PLUS_ONE_THRESHOLD = 5  # repetições do mesmo formato de SQL em uma requisição
+QUERY_BUDGET_RAISE = env.bool('QUERY_BUDGET_RAISE', default=False)  # ligar nos testes: violação vira erro
+QUERY_BUDGET_SAMPLE_RATE = env.float('QUERY_BUDGET_SAMPLE_RATE', default=0.01)  # fração registrada em produção
+
+# Logs da aplicação (inclui as contagens de consultas amostradas por endpoint)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'apps': {'handlers': ['console'], 'level': env('APPS_LOG_LEVEL', default='INFO')},
+    },
+}
+
+# Métricas Prometheus (apps.core.metrics) em /metrics, só para conexões diretas da rede interna.
+# Com METRICS_DIR cada worker grava seus números em um arquivo do diretório e a coleta soma todos;
+# o diretório deve começar vazio a cada deploy
+METRICS_DIR = env('METRICS_DIR', default='')
+METRICS_FLUSH_INTERVAL = env.float('METRICS_FLUSH_INTERVAL', default=1.0)  # segundos entre gravações de um worker
+METRICS_ALLOWED_NETWORKS = env.list('METRICS_ALLOWED_NETWORKS', default=[
+    '127.0.0.0/8', '::1/128', '10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16',
+])
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # segundos
+
+# Cache com acertos e faltas contados por prefixo de chave: Redis compartilhado entre os processos
+# quando REDIS_CACHE_URL está definido (obrigatório com mais de um worker), senão local do processo
+REDIS_CACHE_URL = env('REDIS_CACHE_URL', default='')
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'apps.core.backends.cache.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'apps.core.backends.cache.LocMemCache',
+        }
+    }
+
 # Email (desenvolvimento)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Busca de produtos
+SEARCH_INDEX_PATH = env('SEARCH_INDEX_PATH', default=str(BASE_DIR / 'var' / 'search_index.pickle'))
@@ -44,6 +44,9 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'apps.core.middleware.metrics_middleware',
+    'apps.core.middleware.query_budget_middleware',
+    'apps.core.middleware.replica_pinning_middleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -54,17 +57,25 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'treinamais.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'apps.core.backends.templates.DjangoTemplates',
+        'NAME': 'django',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS if DEBUG else [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'apps.core.context_processors.cart',
+                'apps.core.context_processors.categories',
             ],
         },
     },
@@ -78,6 +89,21 @@ DATABASES = {
     'default': env.db('DATABASE_URL', default=DATABASE_URL)
 }
 
+for number, url in enumerate(env.list('DATABASE_REPLICA_URLS', default=[]), 1):
+    DATABASES[f'replica{number}'] = {**env.db_url_config(url), 'TEST': {'MIRROR': 'default'}}
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['apps.core.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=5)
+
+INSTRUMENTED_DB_ENGINES = {
+    'django.db.backends.postgresql': 'apps.core.backends.postgresql',
+    'django.db.backends.sqlite3': 'apps.core.backends.sqlite3',
+}
+for database in DATABASES.values():
+    database['ENGINE'] = INSTRUMENTED_DB_ENGINES.get(database['ENGINE'], database['ENGINE'])
+    database['CONN_MAX_AGE'] = env.int('DB_CONN_MAX_AGE', default=60)
+    database['CONN_HEALTH_CHECKS'] = True
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -115,3 +141,88 @@ CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+CELERY_BROKER_URL = env('REDIS_URL', default='redis://redis:6379/0')
+CELERY_ACCEPT_CONTENT = ['application/json']
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_BEAT_SCHEDULE = {
+    'sweep-stock-reservations': {
+        'task': 'apps.products.tasks.sweep_stock_reservations',
+        'schedule': 60.0,
+    },
+    'purge-stale-carts': {
+        'task': 'apps.cart.tasks.purge_stale_carts',
+        'schedule': 60.0 * 60,
+    },
+}
+
+SEARCH_INDEX_PATH = env('SEARCH_INDEX_PATH', default=str(BASE_DIR / 'var' / 'search_index.pickle'))
+
+STOCK_RESERVATION_TTL = env.int('STOCK_RESERVATION_TTL', default=15 * 60)
+
+CART_STORAGE = env('CART_STORAGE', default='cookie')
+CART_ABANDONED_DAYS = env.int('CART_ABANDONED_DAYS', default=30)
+CART_PURGE_BATCH_SIZE = env.int('CART_PURGE_BATCH_SIZE', default=500)
+CART_PURGE_PAUSE = env.float('CART_PURGE_PAUSE', default=0.1)
+
+LOGIN_URL = 'accounts:login'
+PAYMENT_GATEWAY = env('PAYMENT_GATEWAY', default='apps.orders.payments.LocalGateway')
+PAYMENT_LOCAL_LIMIT = env('PAYMENT_LOCAL_LIMIT', default='')
+PAYMENT_LOCAL_DELAY = env.float('PAYMENT_LOCAL_DELAY', default=0)
+
+ASYNC_VIEWS = env.bool('ASYNC_VIEWS', default=False)
+
+QUERY_BUDGETS = {
+    'core:home': 2,
+    'products:list': 5,
+    'products:category': 6,
+    'products:brand': 6,
+    'products:detail': 5,
+    'products:search': 4,
+    'cart:view': 6,
+    'cart:add': 12,
+    'cart:update': 10,
+    'cart:remove': 10,
+    'cart:clear': 9,
+    'orders:list': 3,
+    'orders:detail': 4,
+    'orders:status': 3,
+    'accounts:profile': 3,
+}
+QUERY_BUDGET_DEFAULT = None
+QUERY_N_PLUS_ONE_THRESHOLD = 5
+QUERY_BUDGET_RAISE = env.bool('QUERY_BUDGET_RAISE', default=False)
+QUERY_BUDGET_SAMPLE_RATE = env.float('QUERY_BUDGET_SAMPLE_RATE', default=0.01)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'apps': {'handlers': ['console'], 'level': env('APPS_LOG_LEVEL', default='INFO')},
+    },
+}
+
+METRICS_DIR = env('METRICS_DIR', default='')
+METRICS_FLUSH_INTERVAL = env.float('METRICS_FLUSH_INTERVAL', default=1.0)
+METRICS_ALLOWED_NETWORKS = env.list('METRICS_ALLOWED_NETWORKS', default=[
+    '127.0.0.0/8', '::1/128', '10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16',
+])
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REDIS_CACHE_URL = env('REDIS_CACHE_URL', default=env('REDIS_URL', default=''))
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'apps.core.backends.cache.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'apps.core.backends.cache.LocMemCache',
+        }
+    }
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'treinamais.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if not settings.DEBUG:
+    from apps.core.warmup import precompile_templates  # noqa: E402
+
+    precompile_templates()